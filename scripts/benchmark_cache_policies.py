@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Trace-replay benchmark comparing MemoryCache eviction policies.
+
+Replays a key stream against LRU and W-TinyLFU caches of several sizes: each
+key is looked up and, on a miss, stored. Reports hit ratio and replay rate
+per policy. Recorded traces are text files with one key per line (e.g.
+cache keys logged in production). Without ``--trace``, a synthetic stream
+mixes a Zipf-distributed hot set with crawler-style scans of one-off keys.
+
+Usage:
+    python scripts/benchmark_cache_policies.py [--trace keys.txt ...] [--sizes 500,2000,8000]
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Iterable, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.performance.cache_manager import EVICTION_POLICIES, MemoryCache
+
+_MISSING = object()
+
+
+def synthetic_trace(length: int, hot_keys: int, scan_share: float, seed: int) -> List[str]:
+    """Zipf(1.0) lookups over ``hot_keys`` products, interrupted by scans."""
+    rng = random.Random(seed)
+    weights = list(itertools.accumulate(1.0 / rank for rank in range(1, hot_keys + 1)))
+    total = weights[-1]
+    trace: List[str] = []
+    scan_id = 0
+    while len(trace) < length:
+        if rng.random() < scan_share / 100:
+            # A crawler or batch job walking 100-1000 keys nobody asks for again
+            for _ in range(rng.randint(100, 1000)):
+                trace.append(f"products:scan:{scan_id}")
+                scan_id += 1
+        else:
+            rank = bisect.bisect_left(weights, rng.random() * total)
+            trace.append(f"products:{rank}")
+    return trace[:length]
+
+
+def load_trace(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def replay(trace: Iterable[str], size: int, policy: str) -> Tuple[float, float]:
+    """Hit ratio and lookups per second."""
+    cache = MemoryCache(max_size=size, default_ttl=None, eviction_policy=policy)
+    hits = lookups = 0
+    start = time.perf_counter()
+    for key in trace:
+        lookups += 1
+        if cache.get(key, _MISSING) is _MISSING:
+            cache.set(key, True)
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return hits / lookups, lookups / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cache eviction policies on key traces")
+    parser.add_argument("--trace", action="append", default=[], help="File with one key per line")
+    parser.add_argument("--sizes", default="500,2000,8000", help="Cache sizes to replay")
+    parser.add_argument("--length", type=int, default=300000, help="Synthetic trace length")
+    parser.add_argument("--hot-keys", type=int, default=20000, help="Distinct keys in the synthetic hot set")
+    parser.add_argument("--scan-share", type=float, default=0.2,
+                        help="Percent of synthetic lookups that start a scan")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    traces = [(path, load_trace(path)) for path in args.trace]
+    if not traces:
+        traces = [("synthetic", synthetic_trace(args.length, args.hot_keys, args.scan_share, args.seed))]
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print(f"{'trace':<14} {'size':>6} {'policy':<8} {'hit ratio':>9} {'lookups/s':>11}")
+    for name, trace in traces:
+        for size in sizes:
+            for policy in EVICTION_POLICIES:
+                ratio, rate = replay(trace, size, policy)
+                print(f"{os.path.basename(name)[:14]:<14} {size:>6} {policy:<8} {ratio:>9.2%} {rate:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Thread-scaling benchmark for MemoryCache.
+
+Runs get/set mixes from 1 to 32 worker threads against a single-lock cache
+and a lock-striped one, and reports aggregate throughput and p99 operation
+latency for each. Keys follow a skewed distribution so a few are hot.
+
+Usage:
+    python scripts/benchmark_cache_threads.py [--ops N] [--segments N] [--threads 1,2,4,8,16,32]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.performance.cache_manager import MemoryCache
+
+MIXES = {
+    "read-heavy (95/5)": 0.95,
+    "balanced (50/50)": 0.50,
+    "write-heavy (10/90)": 0.10,
+}
+
+
+def make_workload(ops: int, keyspace: int, read_ratio: float, seed: int) -> List[Tuple[bool, str]]:
+    rng = random.Random(seed)
+    keys = [f"product:{i}" for i in range(keyspace)]
+    workload = []
+    for _ in range(ops):
+        # Pareto-distributed index: a small share of keys gets most traffic
+        index = min(int(rng.paretovariate(1.2)) - 1, keyspace - 1)
+        workload.append((rng.random() < read_ratio, keys[index]))
+    return workload
+
+
+def run(cache: MemoryCache, threads: int, workloads: List[List[Tuple[bool, str]]]) -> Tuple[float, float]:
+    """Aggregate ops/s and p99 latency in microseconds."""
+    barrier = threading.Barrier(threads + 1)
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    value = {"sku": "ABC-123", "compatibility": 0.8}
+
+    def worker(n: int):
+        workload = workloads[n]
+        samples = latencies[n]
+        get, put, clock = cache.get, cache.set, time.perf_counter
+        barrier.wait()
+        for is_read, key in workload:
+            start = clock()
+            if is_read:
+                get(key)
+            else:
+                put(key, value)
+            samples.append(clock() - start)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = sorted(sample for samples in latencies for sample in samples)
+    p99 = merged[int(len(merged) * 0.99)] * 1e6
+    return len(merged) / elapsed, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MemoryCache thread scaling")
+    parser.add_argument("--ops", type=int, default=50000, help="Operations per thread")
+    parser.add_argument("--keyspace", type=int, default=20000)
+    parser.add_argument("--max-size", type=int, default=10000)
+    parser.add_argument("--segments", type=int, default=16, help="Segments of the striped cache")
+    parser.add_argument("--threads", default="1,2,4,8,16,32")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    thread_counts = [int(n) for n in args.threads.split(",")]
+    print(f"{'mix':<20} {'threads':>7} {'segments':>8} {'ops/s':>12} {'p99 us':>9}")
+    for mix, read_ratio in MIXES.items():
+        workloads = [
+            make_workload(args.ops, args.keyspace, read_ratio, args.seed + n) for n in range(max(thread_counts))
+        ]
+        for threads in thread_counts:
+            for segments in (1, args.segments):
+                cache = MemoryCache(args.max_size, default_ttl=300, segments=segments)
+                for _, key in workloads[0][: args.max_size]:
+                    cache.set(key, key)
+                rate, p99 = run(cache, threads, workloads[:threads])
+                print(f"{mix:<20} {threads:>7} {segments:>8} {rate:>12,.0f} {p99:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
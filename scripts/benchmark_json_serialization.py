@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark for API response serialization.
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with
+FastJSONResponse and StreamingJSONResponse on payloads shaped like the
+recommendation, frames catalog and admin export responses.
+
+Usage:
+    python scripts/benchmark_json_serialization.py [--size N] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from src.api.core.serialization import (
+    HAS_ORJSON,
+    FastJSONResponse,
+    iter_json_array,
+)
+
+
+class FrameSpec(BaseModel):
+    width_mm: float
+    bridge_mm: float
+    temple_mm: float
+    material: str
+
+
+class Recommendation(BaseModel):
+    product_id: str
+    name: str
+    brand: str
+    price: float
+    score: float
+    face_shapes: List[str]
+    specs: FrameSpec
+    image_urls: List[str]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+def make_recommendations(size: int) -> Dict[str, Any]:
+    now = datetime(2025, 6, 1, 12, 0, 0)
+    items = [
+        Recommendation(
+            product_id=f"prod-{i:06d}",
+            name=f"Frame {i}",
+            brand=["Ray-Ban", "Oakley", "Warby Parker", "Persol"][i % 4],
+            price=99.0 + (i % 200),
+            score=round(1.0 - (i % 100) / 100, 3),
+            face_shapes=["oval", "round", "square"][: 1 + i % 3],
+            specs=FrameSpec(width_mm=138 + i % 10, bridge_mm=18, temple_mm=145, material="acetate"),
+            image_urls=[f"https://cdn.example.com/frames/{i}/{n}.jpg" for n in range(3)],
+            created_at=now - timedelta(days=i % 365),
+            updated_at=now,
+        )
+        for i in range(size)
+    ]
+    return {"success": True, "data": {"recommendations": items, "total": size}}
+
+
+def make_frames_page(size: int) -> Dict[str, Any]:
+    now = datetime(2025, 6, 1, 12, 0, 0)
+    frames = [
+        {
+            "id": i,
+            "sku": f"SKU-{i:08d}",
+            "name": f"Frame {i}",
+            "brand": {"id": i % 50, "name": f"Brand {i % 50}"},
+            "variants": [
+                {"color": c, "stock": (i * 7 + n) % 40, "price": 120.0 + n}
+                for n, c in enumerate(["black", "tortoise", "clear"])
+            ],
+            "compatibility": {"oval": 0.92, "round": 0.71, "square": 0.64, "heart": 0.8},
+            "updated_at": now - timedelta(minutes=i),
+        }
+        for i in range(size)
+    ]
+    return {"success": True, "data": {"frames": frames, "page": 1, "total": size}}
+
+
+def make_export_rows(size: int) -> List[Dict[str, Any]]:
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "timestamp": start + timedelta(minutes=i),
+            "tenant_id": f"tenant-{i % 120}",
+            "endpoint": "/api/v1/recommendations",
+            "calls": i % 17,
+            "latency_ms": 12.5 + i % 30,
+        }
+        for i in range(size)
+    ]
+
+
+def default_path(content: Any) -> bytes:
+    """What FastAPI does for a dict returned from a handler."""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(content: Any) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def streaming_path(rows: List[Dict[str, Any]]) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in iter_json_array(rows, envelope={"success": True})])
+    return asyncio.run(collect())
+
+
+def bench(func: Callable[[Any], bytes], payload: Any, repeat: int) -> Dict[str, float]:
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": timings[len(timings) // 2], "min_ms": timings[0], "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--size", type=int, default=2000, help="Items per payload")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement")
+    args = parser.parse_args()
+
+    print(f"orjson available: {HAS_ORJSON}")
+    print(f"{'payload':<18} {'path':<22} {'median ms':>10} {'min ms':>10} {'bytes':>10} {'speedup':>8}")
+
+    payloads = {
+        "recommendations": make_recommendations(args.size),
+        "frames_page": make_frames_page(args.size),
+        "admin_export": {"success": True, "data": make_export_rows(args.size * 5)},
+    }
+    for name, payload in payloads.items():
+        baseline = bench(default_path, payload, args.repeat)
+        fast = bench(fast_path, payload, args.repeat)
+        rows = [("jsonable_encoder+json", baseline), ("FastJSONResponse", fast)]
+        if name == "admin_export":
+            rows.append(("StreamingJSONResponse", bench(streaming_path, payload["data"], args.repeat)))
+        for path, result in rows:
+            speedup = baseline["median_ms"] / result["median_ms"] if result["median_ms"] else 0
+            print(
+                f"{name:<18} {path:<22} {result['median_ms']:>10.2f} {result['min_ms']:>10.2f} "
+                f"{result['bytes']:>10} {speedup:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
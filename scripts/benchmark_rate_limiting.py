@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Redis traffic of the rate limiting middleware.
+
+Replays one window of traffic from several workers sharing a Redis server
+and reports Redis round trips per request, plus how many requests a client
+that exceeds its limit actually got through. The baseline checks every
+request with the scripted sliding window; the other rows use local leases
+of different sizes.
+
+Requests are replayed on a simulated clock spread over one window, with a
+reconcile pass every reconcile interval. Runs against fakeredis unless
+--redis-url points at a real server.
+
+Usage:
+    python scripts/benchmark_rate_limiting.py [--workers N] [--clients N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.api.middleware.rate_limiting import RateLimitConfig, RateLimitMiddleware
+
+
+class CountingRedis:
+    """Counts round trips made through a Redis client."""
+
+    def __init__(self, client):
+        self._client = client
+        self.round_trips = 0
+
+    async def evalsha(self, *args):
+        self.round_trips += 1
+        return await self._client.evalsha(*args)
+
+    async def eval(self, *args):
+        self.round_trips += 1
+        return await self._client.eval(*args)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = self._client.pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def counted_execute(*a, **kw):
+            self.round_trips += 1
+            return await execute(*a, **kw)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+async def make_client(redis_url: Optional[str]):
+    if redis_url:
+        import redis.asyncio as redis
+        client = redis.from_url(redis_url, decode_responses=True)
+        await client.flushdb()
+        return client
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is required without --redis-url (pip install fakeredis lupa)")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def make_traffic(clients: int, requests: int, hot_share: float, seed: int) -> List[str]:
+    """Client ids for each request; one hot client, the rest Zipf-like."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(clients)]
+    traffic = []
+    for _ in range(requests):
+        if rng.random() < hot_share:
+            traffic.append("hot")
+        else:
+            traffic.append(f"client-{rng.choices(range(clients), weights)[0]}")
+    return traffic
+
+
+async def run(
+    lease_size: int,
+    traffic: List[str],
+    workers: int,
+    limit: int,
+    tolerance: float,
+    redis_url: Optional[str],
+) -> Dict[str, float]:
+    client = CountingRedis(await make_client(redis_url))
+    config = RateLimitConfig()
+    config.lease_size = lease_size
+    config.overshoot_tolerance = tolerance
+    middlewares = [RateLimitMiddleware(config=config, redis_client=client) for _ in range(workers)]
+
+    admitted = {"hot": 0, "other": 0}
+    window_start = (int(time.time()) // config.window_size + 1) * config.window_size
+    step = config.window_size * 0.95 / len(traffic)
+    next_reconcile = window_start + config.reconcile_interval
+    clock = patch("src.api.middleware.rate_limiting.time.time")
+    fake_time = clock.start()
+    start = time.perf_counter()
+    for i, client_id in enumerate(traffic):
+        now = window_start + i * step
+        fake_time.return_value = now
+        if now >= next_reconcile:
+            next_reconcile += config.reconcile_interval
+            for m in middlewares:
+                if m.leases is not None:
+                    await m.leases.reconcile(client)
+        middleware = middlewares[i % workers]
+        key = f"bench:{client_id}"
+        if middleware.leases is not None:
+            allowed, _, _ = await middleware._leased_check(client, key, limit, config.window_size)
+        else:
+            allowed, _, _ = await middleware._sliding_window_check(client, key, limit, config.window_size)
+        admitted["hot" if client_id == "hot" else "other"] += allowed
+    elapsed = time.perf_counter() - start
+    clock.stop()
+
+    for middleware in middlewares:
+        await middleware.stop()
+    return {
+        "round_trips": client.round_trips / len(traffic),
+        "hot_admitted": admitted["hot"],
+        "other_admitted": admitted["other"],
+        "us_per_request": elapsed / len(traffic) * 1e6,
+    }
+
+
+async def main_async(args):
+    traffic = make_traffic(args.clients, args.requests, args.hot_share, args.seed)
+    hot_requests = traffic.count("hot")
+    print(
+        f"{len(traffic)} requests, {args.workers} workers, limit {args.limit}/window, "
+        f"hot client sends {hot_requests}"
+    )
+    print(f"{'mode':<22} {'round trips/req':>16} {'hot admitted':>13} {'others admitted':>16} {'us/req':>8}")
+    for lease_size in [0] + args.lease_sizes:
+        result = await run(lease_size, traffic, args.workers, args.limit, args.tolerance, args.redis_url)
+        mode = "scripted (baseline)" if lease_size == 0 else f"lease {lease_size}"
+        print(
+            f"{mode:<22} {result['round_trips']:>16.3f} {result['hot_admitted']:>13} "
+            f"{result['other_admitted']:>16} {result['us_per_request']:>8.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate limiting Redis traffic")
+    parser.add_argument("--workers", type=int, default=4, help="Workers sharing the limit")
+    parser.add_argument("--clients", type=int, default=50, help="Distinct clients")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests in the window")
+    parser.add_argument("--limit", type=int, default=1000, help="Requests per client per window")
+    parser.add_argument("--hot-share", type=float, default=0.1, help="Share of traffic from the hot client")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Overshoot tolerance for leases")
+    parser.add_argument("--lease-sizes", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis server (flushes the db)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for RBAC permission checks.
+
+Compares evaluating roles per call (walking role inheritance and the tier
+feature gates with set lookups, as the checks worked before compilation)
+with the compiled bitsets in ``src.auth.rbac``. Both are first checked to
+agree on every role, tier and permission combination.
+
+Usage:
+    python scripts/benchmark_rbac.py [--checks N] [--repeat N]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.auth.rbac import (
+    PERMISSION_BITS,
+    ROLE_INHERITANCE,
+    ROLE_PERMISSIONS,
+    TIER_FEATURES,
+    Permission,
+    RBACManager,
+    Role,
+    UserContext,
+)
+
+GATED = set().union(*TIER_FEATURES.values())
+
+
+def per_call_check(user: UserContext, permission: Permission) -> bool:
+    """Evaluate role membership, inheritance and tier gates on every call."""
+    seen = set()
+    stack = list(user.roles)
+    granted = False
+    while stack:
+        role = stack.pop()
+        if role in seen:
+            continue
+        seen.add(role)
+        if permission in ROLE_PERMISSIONS.get(role, ()):
+            granted = True
+            break
+        stack.extend(ROLE_INHERITANCE.get(role, ()))
+    if not granted:
+        return False
+    if user.tier is not None and permission in GATED:
+        return permission in TIER_FEATURES.get(user.tier, ()) or permission in user.features
+    return True
+
+
+def make_users(count: int, seed: int) -> List[UserContext]:
+    rng = random.Random(seed)
+    tiers = [None] + list(TIER_FEATURES)
+    users = []
+    for i in range(count):
+        roles = rng.sample(list(Role), rng.randint(1, 2))
+        features = frozenset(rng.sample(sorted(GATED), rng.randint(0, 1)))
+        users.append(UserContext(f"user-{i}", roles, "tenant", tier=rng.choice(tiers), features=features))
+    return users
+
+
+def verify(users: List[UserContext]) -> None:
+    manager = RBACManager()
+    for user, permission in itertools.product(users, Permission):
+        expected = per_call_check(user, permission)
+        assert manager.has_permission(user, permission) == expected, (user, permission)
+
+
+def bench(check: Callable[[UserContext, Permission], bool], pairs: List[Tuple[UserContext, Permission]],
+          repeat: int) -> float:
+    """Best checks per second over ``repeat`` runs."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for user, permission in pairs:
+            check(user, permission)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(pairs) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RBAC permission checks")
+    parser.add_argument("--checks", type=int, default=200000, help="Checks per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    users = make_users(500, args.seed)
+    verify(users)
+    rng = random.Random(args.seed)
+    permissions = list(Permission)
+    pairs = [(rng.choice(users), rng.choice(permissions)) for _ in range(args.checks)]
+
+    manager = RBACManager()
+    results = [
+        ("per-call evaluation", bench(per_call_check, pairs, args.repeat)),
+        ("RBACManager.has_permission", bench(manager.has_permission, pairs, args.repeat)),
+        ("UserContext.has_permission", bench(UserContext.has_permission, pairs, args.repeat)),
+        ("inline mask & bit", bench(lambda u, p: u.permission_mask & PERMISSION_BITS[p], pairs, args.repeat)),
+    ]
+    baseline = results[0][1]
+    print(f"{'check':<28} {'checks/s':>14} {'speedup':>8}")
+    for name, rate in results:
+        print(f"{name:<28} {rate:>14,.0f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Lazy router registry for the FastAPI application.
+
+Routers are registered with the module that defines them instead of being
+imported while ``main.py`` loads. A lazily registered router is imported the
+first time a request needs it, or by a background warm-up task once the app
+is serving. Router modules can define a warm-up hook (for example to prime
+caches or load models) that the warm-up task calls once the router is mounted.
+A profile mode imports every router up front, records the cumulative import
+cost of each one and can fail the boot when a configured budget is exceeded.
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RouterImportBudgetExceeded(RuntimeError):
+    """Raised in profile mode when router imports exceed the configured budget."""
+
+
+@dataclass
+class RouterSpec:
+    """Where to find a router and how to mount it.
+
+    ``attr`` names the router object inside ``module``. ``paths`` lists URL
+    prefixes served by the router so a request to one of them loads it
+    directly; routers without known paths are mounted by the warm-up task,
+    which gates readiness. ``warmup_hook`` names an optional function in
+    ``module`` taking the app, called during warm-up.
+    """
+
+    name: str
+    module: str
+    attr: str = "router"
+    prefix: str = ""
+    tags: Optional[List[str]] = None
+    paths: Tuple[str, ...] = ()
+    lazy: bool = True
+    warmup_hook: Optional[str] = None
+
+
+@dataclass
+class RouterImport:
+    """Outcome of importing and mounting one router."""
+
+    name: str
+    status: str
+    trigger: str
+    duration_ms: float = 0.0
+    modules_loaded: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "trigger": self.trigger,
+            "duration_ms": round(self.duration_ms, 2),
+            "modules_loaded": self.modules_loaded,
+            "error": self.error,
+        }
+
+
+@dataclass
+class _RouterState:
+    spec: RouterSpec
+    result: Optional[RouterImport] = None
+    warmed: bool = False
+
+
+class RouterRegistry:
+    """Tracks routers and mounts them on the app on demand."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routers: Dict[str, _RouterState] = {}
+        # One import at a time, so each router's measured cost is its own
+        self._import_lock: Optional[asyncio.Lock] = None
+
+    def register(self, spec: RouterSpec) -> None:
+        """Register a router; non-lazy routers are mounted immediately."""
+        if spec.name in self._routers:
+            raise ValueError(f"Router '{spec.name}' already registered")
+        self._routers[spec.name] = _RouterState(spec=spec)
+        if not spec.lazy:
+            self.load(spec.name, trigger="eager")
+
+    @property
+    def pending(self) -> List[str]:
+        """Names of routers that have not been imported yet."""
+        return [name for name, state in self._routers.items() if state.result is None]
+
+    def is_loaded(self, name: str) -> bool:
+        state = self._routers[name]
+        return state.result is not None and state.result.status == "loaded"
+
+    def _import_router(self, spec: RouterSpec) -> Tuple[Any, RouterImport]:
+        """Import a router module, measuring its cumulative import cost."""
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(spec.module)
+            router = getattr(module, spec.attr)
+            status, error = "loaded", None
+        except Exception as e:
+            router, status, error = None, "failed", f"{type(e).__name__}: {e}"
+            logger.debug(f"Traceback for router '{spec.name}': {traceback.format_exc()}")
+        result = RouterImport(
+            name=spec.name,
+            status=status,
+            trigger="",
+            duration_ms=(time.perf_counter() - start) * 1000,
+            modules_loaded=len(sys.modules) - modules_before,
+            error=error,
+        )
+        return router, result
+
+    def _mount(self, state: _RouterState, router: Any, result: RouterImport, trigger: str) -> bool:
+        spec = state.spec
+        result.trigger = trigger
+        if router is not None:
+            kwargs: Dict[str, Any] = {}
+            if spec.prefix:
+                kwargs["prefix"] = spec.prefix
+            if spec.tags:
+                kwargs["tags"] = spec.tags
+            try:
+                self.app.include_router(router, **kwargs)
+                # Regenerate the OpenAPI schema with the new routes
+                self.app.openapi_schema = None
+            except Exception as e:
+                result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+
+        state.result = result
+        if result.status == "loaded":
+            logger.info(
+                f"Included {spec.name} router ({trigger}) in {result.duration_ms:.1f}ms, "
+                f"{result.modules_loaded} modules imported"
+            )
+            return True
+        logger.warning(f"Failed to include {spec.name} router: {result.error}")
+        return False
+
+    def load(self, name: str, trigger: str = "eager") -> bool:
+        """Import and mount a router synchronously."""
+        state = self._routers[name]
+        if state.result is not None:
+            return state.result.status == "loaded"
+        router, result = self._import_router(state.spec)
+        return self._mount(state, router, result, trigger)
+
+    async def load_async(self, name: str, trigger: str = "request") -> bool:
+        """Import a router in a worker thread and mount it on the event loop.
+
+        Imports are serialized across routers: concurrent imports would
+        share modules and overlap in time, which skews each router's
+        recorded cost.
+        """
+        state = self._routers[name]
+        if state.result is not None:
+            return state.result.status == "loaded"
+        if self._import_lock is None:
+            self._import_lock = asyncio.Lock()
+        async with self._import_lock:
+            if state.result is not None:
+                return state.result.status == "loaded"
+            loop = asyncio.get_running_loop()
+            router, result = await loop.run_in_executor(None, self._import_router, state.spec)
+            return self._mount(state, router, result, trigger)
+
+    async def ensure_loaded_for(self, scope) -> None:
+        """Mount the pending routers whose declared paths match the request.
+
+        A path matching no lazy prefix loads nothing, so stray URLs never
+        import routers they cannot reach.
+        """
+        path = scope.get("path", "")
+        direct = [
+            name for name in self.pending
+            if any(path.startswith(p) for p in self._routers[name].spec.paths)
+        ]
+        for name in direct:
+            await self.load_async(name, trigger="request")
+
+    async def _run_warmup_hook(self, state: _RouterState) -> None:
+        spec = state.spec
+        state.warmed = True
+        if not spec.warmup_hook:
+            return
+        hook = getattr(sys.modules.get(spec.module), spec.warmup_hook, None)
+        if hook is None:
+            return
+        start = time.perf_counter()
+        result = hook(self.app)
+        if inspect.isawaitable(result):
+            await result
+        logger.info(f"Warmed {spec.name} router in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def warm_up(self) -> None:
+        """Import remaining routers one at a time and run their warm-up hooks."""
+        for name, state in self._routers.items():
+            try:
+                if state.result is None:
+                    await self.load_async(name, trigger="warmup")
+                if self.is_loaded(name) and not state.warmed:
+                    await self._run_warmup_hook(state)
+            except Exception as e:
+                logger.warning(f"Router warm-up failed for {name}: {e}")
+        logger.info("Router warm-up complete")
+
+    def profile(
+        self,
+        budget_ms: Optional[float] = None,
+        per_router_budget_ms: Optional[float] = None,
+    ) -> List[RouterImport]:
+        """Import all pending routers now and enforce the import budget."""
+        for name in self.pending:
+            self.load(name, trigger="profile")
+
+        report = self.report()
+        for entry in report["routers"]:
+            logger.info(
+                f"Router import profile: {entry['name']:<24} {entry['duration_ms']:>9.1f}ms "
+                f"{entry['modules_loaded']:>5} modules {entry['status']}"
+            )
+        logger.info(f"Router import profile: total {report['total_ms']:.1f}ms")
+
+        over: List[str] = []
+        if per_router_budget_ms is not None:
+            over.extend(
+                f"{entry['name']} ({entry['duration_ms']:.1f}ms)"
+                for entry in report["routers"]
+                if entry["duration_ms"] > per_router_budget_ms
+            )
+        if budget_ms is not None and report["total_ms"] > budget_ms:
+            over.append(f"total ({report['total_ms']:.1f}ms > {budget_ms}ms)")
+        if over:
+            raise RouterImportBudgetExceeded(f"Router import budget exceeded: {', '.join(over)}")
+
+        return [state.result for state in self._routers.values() if state.result is not None]
+
+    def report(self) -> Dict[str, Any]:
+        """Import cost and state of every registered router."""
+        routers: List[Dict[str, Any]] = []
+        for name, state in self._routers.items():
+            if state.result is None:
+                routers.append({"name": name, "status": "pending", "trigger": None,
+                                "duration_ms": 0.0, "modules_loaded": 0, "error": None})
+            else:
+                routers.append(state.result.to_dict())
+        return {
+            "total_ms": round(sum(r["duration_ms"] for r in routers), 2),
+            "pending": self.pending,
+            "routers": routers,
+        }
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that mounts pending routers before routing a request."""
+
+    def __init__(self, app, registry: RouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.registry.pending:
+            await self.registry.ensure_loaded_for(scope)
+        await self.app(scope, receive, send)
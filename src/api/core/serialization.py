@@ -0,0 +1,191 @@
+"""
+Fast JSON serialization for large API responses.
+
+FastAPI's default path runs every response through ``jsonable_encoder``,
+which rebuilds the whole payload as plain dicts and strings, and then through
+the stdlib ``json`` module. Handlers that return ``FastJSONResponse``
+directly skip that pass: pydantic models, datetimes, UUIDs, enums and
+dataclasses are serialized natively by orjson. ``StreamingJSONResponse``
+writes very large arrays as chunked JSON without building the full body;
+items from synchronous iterables are pulled in a worker thread, batch by
+batch, so a blocking generator does not stall the event loop.
+
+orjson is optional; without it the stdlib encoder is used with the same
+type handling.
+"""
+
+import itertools
+import json
+import logging
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Optional, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    HAS_ORJSON = False
+    logger.info("orjson not installed, fast JSON responses will use the stdlib encoder")
+
+# Raw JSON fragments let pydantic v2 models serialize themselves in Rust
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def _model_default(obj: BaseModel) -> Any:
+    # Output matches FastAPI's jsonable_encoder: aliases on, JSON-mode types
+    serializer = getattr(obj, "__pydantic_serializer__", None)
+    if _Fragment is not None and serializer is not None:
+        return _Fragment(serializer.to_json(obj, by_alias=True))
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", by_alias=True)
+    return obj.dict(by_alias=True)
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Types orjson does not handle natively."""
+    if isinstance(obj, BaseModel):
+        return _model_default(obj)
+    if isinstance(obj, Decimal):
+        # Like jsonable_encoder: integral values stay integers
+        exponent = obj.as_tuple().exponent
+        return int(obj) if isinstance(exponent, int) and exponent >= 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        if hasattr(obj, "model_dump"):
+            return obj.model_dump(mode="json", by_alias=True)
+        return obj.dict(by_alias=True)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (UUID, PurePath)):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    return _orjson_default(obj)
+
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if HAS_ORJSON else 0
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact UTF-8 JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        default=_stdlib_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized with :func:`dumps`.
+
+    Return it directly from a handler; when it is only configured as a
+    ``response_class`` FastAPI still runs ``jsonable_encoder`` first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class StreamingJSONResponse(StreamingResponse):
+    """Stream a large array, optionally wrapped in an envelope object.
+
+    With ``envelope={"success": True}`` and ``key="data"`` the body is
+    ``{"success":true,"data":[...]}``. Items are serialized in batches of
+    ``chunk_size`` so memory stays bounded by one batch.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        items: Union[Iterable[Any], AsyncIterable[Any]],
+        envelope: Optional[Dict[str, Any]] = None,
+        key: str = "data",
+        chunk_size: int = 500,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(
+            iter_json_array(items, envelope=envelope, key=key, chunk_size=chunk_size),
+            status_code=status_code,
+            headers=headers,
+            media_type=self.media_type,
+        )
+
+
+def _take(iterator: Iterator[Any], count: int) -> List[Any]:
+    return list(itertools.islice(iterator, count))
+
+
+async def iter_json_array(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    envelope: Optional[Dict[str, Any]] = None,
+    key: str = "data",
+    chunk_size: int = 500,
+):
+    """Yield a JSON array (or enveloped array) as byte chunks."""
+    if envelope is not None:
+        if key in envelope:
+            raise ValueError(f"Envelope already contains the streamed key '{key}'")
+        head = dumps(envelope)[:-1]
+        if len(head) > 1:
+            head += b","
+        yield head + dumps(key) + b":["
+    else:
+        yield b"["
+
+    batch: List[Any] = []
+    first = True
+
+    def flush() -> bytes:
+        nonlocal first
+        chunk = dumps(batch)[1:-1]
+        if not first:
+            chunk = b"," + chunk
+        first = False
+        batch.clear()
+        return chunk
+
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= chunk_size:
+                yield flush()
+    else:
+        iterator = iter(items)
+        while True:
+            batch.extend(await run_in_threadpool(_take, iterator, chunk_size))
+            if len(batch) < chunk_size:
+                break
+            yield flush()
+    if batch:
+        yield flush()
+
+    yield b"]}" if envelope is not None else b"]"
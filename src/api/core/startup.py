@@ -0,0 +1,204 @@
+"""
+Startup orchestration for the FastAPI application.
+
+Components declare the components they depend on and are initialized
+concurrently as soon as their dependencies have finished, each under its own
+timeout. The resulting timeline is kept so cold-start cost can be inspected
+through the diagnostics endpoint.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Component outcomes
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_SKIPPED = "skipped"
+
+
+@dataclass
+class StartupComponent:
+    """A unit of startup work.
+
+    ``depends_on`` lists hard dependencies: the component is skipped if any of
+    them did not finish successfully. ``after`` only orders the component
+    behind others and runs it regardless of their outcome.
+    """
+
+    name: str
+    init: Callable[[], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+@dataclass
+class ComponentResult:
+    """Outcome and timing of a single startup component."""
+
+    name: str
+    status: str
+    started_at: float = 0.0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    depends_on: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "started_at_ms": round(self.started_at * 1000, 2),
+            "duration_ms": round(self.duration_ms, 2),
+            "error": self.error,
+            "depends_on": self.depends_on,
+        }
+
+
+class StartupOrchestrator:
+    """Runs startup components concurrently in dependency order."""
+
+    def __init__(self, default_timeout: float = 10.0):
+        self.default_timeout = default_timeout
+        self._components: Dict[str, StartupComponent] = {}
+        self._results: Dict[str, ComponentResult] = {}
+        self._started_at: Optional[datetime] = None
+        self._total_ms: Optional[float] = None
+
+    def add(self, component: StartupComponent) -> None:
+        """Register a component."""
+        if component.name in self._components:
+            raise ValueError(f"Startup component '{component.name}' already registered")
+        self._components[component.name] = component
+
+    def component(
+        self,
+        name: str,
+        depends_on: Tuple[str, ...] = (),
+        after: Tuple[str, ...] = (),
+        timeout: Optional[float] = None,
+    ):
+        """Decorator form of :meth:`add`."""
+
+        def decorator(func: Callable[[], Awaitable[Any]]):
+            self.add(StartupComponent(
+                name=name,
+                init=func,
+                depends_on=tuple(depends_on),
+                after=tuple(after),
+                timeout=timeout,
+            ))
+            return func
+
+        return decorator
+
+    def _validate(self) -> None:
+        """Reject unknown dependencies and dependency cycles."""
+        for component in self._components.values():
+            for dep in component.depends_on + component.after:
+                if dep not in self._components:
+                    raise ValueError(
+                        f"Startup component '{component.name}' depends on unknown component '{dep}'"
+                    )
+
+        visiting, visited = set(), set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                cycle = " -> ".join(path[path.index(name):] + [name])
+                raise ValueError(f"Startup dependency cycle detected: {cycle}")
+            visiting.add(name)
+            component = self._components[name]
+            for dep in component.depends_on + component.after:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self._components:
+            visit(name, [])
+
+    async def run(self) -> List[ComponentResult]:
+        """Initialize all registered components and return their results."""
+        self._validate()
+        self._results = {}
+        self._started_at = datetime.now(timezone.utc)
+        origin = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_component(component: StartupComponent) -> ComponentResult:
+            waits = component.depends_on + component.after
+            if waits:
+                await asyncio.gather(*(tasks[dep] for dep in waits))
+
+            failed_deps = [
+                dep for dep in component.depends_on
+                if self._results[dep].status != STATUS_OK
+            ]
+            if failed_deps:
+                result = ComponentResult(
+                    name=component.name,
+                    status=STATUS_SKIPPED,
+                    started_at=time.perf_counter() - origin,
+                    error=f"Dependencies not available: {', '.join(failed_deps)}",
+                    depends_on=list(component.depends_on),
+                )
+                logger.warning(f"Skipping startup component '{component.name}': {result.error}")
+                self._results[component.name] = result
+                return result
+
+            timeout = component.timeout if component.timeout is not None else self.default_timeout
+            start = time.perf_counter()
+            status, error = STATUS_OK, None
+            try:
+                await asyncio.wait_for(component.init(), timeout=timeout)
+            except asyncio.TimeoutError:
+                status, error = STATUS_TIMEOUT, f"Timed out after {timeout}s"
+            except Exception as e:
+                status, error = STATUS_FAILED, str(e) or type(e).__name__
+
+            result = ComponentResult(
+                name=component.name,
+                status=status,
+                started_at=start - origin,
+                duration_ms=(time.perf_counter() - start) * 1000,
+                error=error,
+                depends_on=list(component.depends_on),
+            )
+            if status == STATUS_OK:
+                logger.info(f"Startup component '{component.name}' initialized in {result.duration_ms:.1f}ms")
+            else:
+                logger.warning(f"Startup component '{component.name}' {status}: {error}")
+            self._results[component.name] = result
+            return result
+
+        for name, component in self._components.items():
+            tasks[name] = asyncio.ensure_future(run_component(component))
+        await asyncio.gather(*tasks.values())
+
+        self._total_ms = (time.perf_counter() - origin) * 1000
+        logger.info(f"Startup completed in {self._total_ms:.1f}ms")
+        return self.results
+
+    @property
+    def results(self) -> List[ComponentResult]:
+        """Results ordered by start time."""
+        return sorted(self._results.values(), key=lambda r: r.started_at)
+
+    def timeline(self) -> Dict[str, Any]:
+        """Startup timeline suitable for a diagnostics response."""
+        results = self.results
+        return {
+            "started_at": self._started_at.isoformat() if self._started_at else None,
+            "total_ms": round(self._total_ms, 2) if self._total_ms is not None else None,
+            "sequential_ms": round(sum(r.duration_ms for r in results), 2),
+            "components": [r.to_dict() for r in results],
+            "failed": [r.name for r in results if r.status != STATUS_OK],
+        }
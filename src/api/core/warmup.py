@@ -0,0 +1,156 @@
+"""
+Warm-up pipeline and readiness state.
+
+Liveness only says the process is up. Readiness is reported once the warm-up
+steps (connection pool pre-opening, router imports and their warm-up hooks)
+have finished, or once the warm-up deadline has passed, whichever comes first.
+Steps that are still running at the deadline keep running in the background.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupStep:
+    """A single warm-up step."""
+
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    timeout: Optional[float] = None
+
+
+@dataclass
+class WarmupResult:
+    """Outcome and timing of a warm-up step."""
+
+    name: str
+    status: str
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 2),
+            "error": self.error,
+        }
+
+
+class WarmupPipeline:
+    """Runs warm-up steps concurrently and gates readiness on them."""
+
+    def __init__(self, deadline: float = 30.0):
+        self.deadline = deadline
+        self.state = "pending"
+        self.reason: Optional[str] = None
+        self._steps: List[WarmupStep] = []
+        self._results: Dict[str, WarmupResult] = {}
+        self._started: Optional[float] = None
+        self._ready_after_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_step(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Register a warm-up step."""
+        if self.state != "pending":
+            raise RuntimeError("Warm-up steps must be registered before the pipeline starts")
+        self._steps.append(WarmupStep(name=name, func=func, timeout=timeout))
+
+    def step(self, name: str, timeout: Optional[float] = None):
+        """Decorator form of :meth:`add_step`."""
+
+        def decorator(func: Callable[[], Awaitable[Any]]):
+            self.add_step(name, func, timeout=timeout)
+            return func
+
+        return decorator
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def _mark_ready(self, reason: str, started: float) -> None:
+        if self.state == "ready":
+            return
+        self.state = "ready"
+        self.reason = reason
+        self._ready_after_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Service ready after {self._ready_after_ms:.1f}ms ({reason})")
+
+    async def _run_step(self, step: WarmupStep) -> None:
+        start = time.perf_counter()
+        status, error = "ok", None
+        try:
+            if step.timeout is not None:
+                await asyncio.wait_for(step.func(), timeout=step.timeout)
+            else:
+                await step.func()
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Timed out after {step.timeout}s"
+        except Exception as e:
+            status, error = "failed", str(e) or type(e).__name__
+        result = WarmupResult(
+            name=step.name,
+            status=status,
+            duration_ms=(time.perf_counter() - start) * 1000,
+            error=error,
+        )
+        self._results[step.name] = result
+        if status == "ok":
+            logger.info(f"Warm-up step '{step.name}' finished in {result.duration_ms:.1f}ms")
+        else:
+            logger.warning(f"Warm-up step '{step.name}' {status}: {error}")
+
+    async def run(self) -> None:
+        """Run all steps, flipping readiness on completion or at the deadline."""
+        self.state = "warming"
+        started = self._started = time.perf_counter()
+        if not self._steps:
+            self._mark_ready("completed", started)
+            return
+
+        tasks = [asyncio.ensure_future(self._run_step(step)) for step in self._steps]
+        _, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        if pending:
+            logger.warning(
+                f"Warm-up deadline of {self.deadline}s passed with {len(pending)} step(s) still running"
+            )
+            self._mark_ready("deadline", started)
+            await asyncio.wait(pending)
+        else:
+            self._mark_ready("completed", started)
+
+    def start(self) -> asyncio.Task:
+        """Start the pipeline in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness state and per-step results."""
+        steps = []
+        for step in self._steps:
+            result = self._results.get(step.name)
+            steps.append(result.to_dict() if result else {
+                "name": step.name, "status": "running" if self._started else "pending",
+                "duration_ms": None, "error": None,
+            })
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "reason": self.reason,
+            "deadline_seconds": self.deadline,
+            "ready_after_ms": round(self._ready_after_ms, 2) if self._ready_after_ms is not None else None,
+            "steps": steps,
+        }
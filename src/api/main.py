@@ -2,6 +2,8 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import logging
 import os
 import sys
@@ -74,14 +76,40 @@ app.add_middleware(
 )
 logger.info("CORS middleware configured")
 
+# Response cache for read-heavy routes. Added before the rate limiting and
+# auth middleware so it sits inside them and only serves authenticated requests.
+from src.api.middleware.response_cache import (
+    CachePolicy,
+    InMemoryResponseStore,
+    ResponseCache,
+    ResponseCacheMiddleware,
+)
+
+# Nothing in this service writes product or frame data yet, so the "products"
+# entries below are TTL-only; a write path added later should call
+# invalidate_response_cache(request, "products") once its change is stored.
+response_cache = ResponseCache(
+    policies={
+        "/api/v1/frames": CachePolicy(ttl=300, tags=("products",)),
+        "/api/v1/recommendations": CachePolicy(ttl=60, tags=("products",)),
+        "/api/v1/admin/analytics/overview": CachePolicy(ttl=60, tags=("usage",)),
+        "/api/v1/admin/billing/overview": CachePolicy(ttl=120, tags=("billing",)),
+        "/api/v1/admin/billing/invoices": CachePolicy(ttl=120, tags=("billing",)),
+    },
+    store=InMemoryResponseStore(max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))),
+)
+app.state.response_cache = response_cache
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
 # Add rate limiting middleware
 try:
     logger.info("Configuring rate limiting middleware")
     from src.api.middleware.rate_limiting import create_rate_limit_middleware
     
-    # Create rate limiting middleware with fallback policy
-    rate_limit_middleware = create_rate_limit_middleware(fallback_policy="allow")
+    # Enforce limits in process while Redis is unavailable
+    rate_limit_middleware = create_rate_limit_middleware(fallback_policy="local")
     app.middleware("http")(rate_limit_middleware)
+    app.state.rate_limiter = rate_limit_middleware
     logger.info("Rate limiting middleware configured")
 except ImportError as e:
     logger.warning(f"Failed to import rate limiting middleware: {e}")
@@ -92,6 +120,7 @@ except Exception as e:
 try:
     logger.info("Configuring JWT authentication middleware")
     from src.api.middleware.jwt_auth import JWTAuthMiddleware
+    from src.api.middleware.token_cache import VerifiedTokenCache
     from src.auth import (
         AuthManager,
         TokenValidator,
@@ -114,6 +143,10 @@ try:
         token_validator = TokenValidator(secret_key=secret_key)
         api_key_manager = ApiKeyManager()
         rbac_manager = RBACManager()
+        token_cache = VerifiedTokenCache(
+            max_entries=int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000")),
+        )
+        app.state.token_cache = token_cache
         
         # Add JWT middleware immediately
         app.add_middleware(
@@ -122,13 +155,16 @@ try:
             token_validator=token_validator,
             api_key_manager=api_key_manager,
             rbac_manager=rbac_manager,
+            token_cache=token_cache,
             excluded_paths=[
                 "/health",
                 "/",
                 "/docs",
                 "/openapi.json",
                 "/redoc",
-                "/favicon.ico"
+                "/favicon.ico",
+                "/live",
+                "/ready"
             ]
         )
         
@@ -193,324 +229,311 @@ if not getattr(app.state, 'health_router_included', False):
     
     logger.info("Fallback health endpoints added")
 
-# Try to include other routers but don't fail if they're not available
-try:
-    # Import routers with error handling for each
-    try:
-        logger.info("Attempting to import scraping router")
-        from src.api.routers import scraping
-        app.include_router(scraping)
-        logger.info("Successfully included scraping router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including scraping router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include scraping router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import analytics router")
-        from src.api.routers import analytics
-        app.include_router(analytics)
-        logger.info("Successfully included analytics router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including analytics router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include analytics router: {str(e)}")
-    
-    # Add core business logic routers - import directly to avoid __init__.py issues
-    try:
-        logger.info("Attempting to import frames router")
-        from src.api.routers.frames import router as frames_router
-        app.include_router(frames_router, prefix="/api/v1", tags=["frames"])
-        logger.info("Successfully included frames router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including frames router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include frames router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import recommendations router")
-        from src.api.routers.recommendations_simple import router as recommendations_router
-        app.include_router(recommendations_router, prefix="/api/v1", tags=["recommendations"])
-        logger.info("Successfully included recommendations router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including recommendations router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include recommendations router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import virtual try-on router")
-        from src.api.routers.virtual_try_on import router as virtual_try_on_router
-        app.include_router(virtual_try_on_router, prefix="/api/v1", tags=["virtual-try-on"])
-        logger.info("Successfully included virtual try-on router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including virtual try-on router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include virtual try-on router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import monitoring router")
-        from src.api.routers import monitoring
-        app.include_router(monitoring)
-        logger.info("Successfully included monitoring router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including monitoring router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include monitoring router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import developer router")
-        from src.api.routers import developer
-        app.include_router(developer)
-        logger.info("Successfully included developer router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including developer router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include developer router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import contact_lens_try_on router")
-        from src.api.routers import contact_lens_try_on
-        app.include_router(contact_lens_try_on)
-        logger.info("Successfully included contact lens try-on router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including contact_lens_try_on router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include contact lens try-on router: {str(e)}")
-    
-    try:
-        logger.info("Attempting to import auth_example router")
-        from src.api.routers.auth_example import router as auth_example_router
-        app.include_router(auth_example_router)
-        logger.info("Successfully included auth example router")
-    except ImportError as e:
-        logger.warning(f"ImportError when including auth_example router: {str(e)}")
-        logger.warning(f"Traceback: {traceback.format_exc()}")
-    except Exception as e:
-        logger.warning(f"Failed to include auth example router: {str(e)}")
-except Exception as e:
-    logger.error(f"Error including routers: {str(e)}", exc_info=True)
+# Register the remaining routers. They are imported on the first request that
+# needs them, or by a background warm-up task once startup has finished.
+from src.api.core.router_registry import (
+    LazyRouterMiddleware,
+    RouterRegistry,
+    RouterSpec,
+)
 
-# Include service discovery router
-try:
-    logger.info("Attempting to import service discovery router")
-    from src.api.routers.service_discovery import router as service_discovery_router
-    app.include_router(service_discovery_router)
-    logger.info("Successfully included service discovery router")
-except ImportError as e:
-    logger.warning(f"ImportError when including service discovery router: {str(e)}")
-    logger.warning(f"Traceback: {traceback.format_exc()}")
-except Exception as e:
-    logger.warning(f"Failed to include service discovery router: {str(e)}")
+router_registry = RouterRegistry(app)
+app.state.router_registry = router_registry
+lazy_routers = os.getenv("LAZY_ROUTERS", "true").lower() not in ("0", "false", "no")
 
-# MongoDB router
-try:
-    logger.info("Attempting to import MongoDB router")
-    from src.api.routers.mongodb import router as mongodb_router
-    app.include_router(mongodb_router)
-    logger.info("Successfully included MongoDB router")
-
-    # Admin Portal Router
-    logger.info("Attempting to import admin router")
-    from src.api.routers.admin import router as admin_router
-    app.include_router(admin_router, prefix="/api/v1", tags=["admin"])
-    logger.info("Successfully included admin router")
-except ImportError as e:
-    logger.warning(f"ImportError when including MongoDB router: {str(e)}")
-    logger.warning(f"Traceback: {traceback.format_exc()}")
-except Exception as e:
-    logger.warning(f"Failed to include MongoDB router: {str(e)}")
+# ``paths`` are the URL prefixes each router serves, so the first request to
+# one of them imports its router instead of waiting for the warm-up task.
+ROUTER_SPECS = [
+    RouterSpec("scraping", "src.api.routers", attr="scraping", paths=("/api/v1/scraping",)),
+    RouterSpec("analytics", "src.api.routers", attr="analytics", paths=("/api/v1/analytics",)),
+    # Core business logic routers - import directly to avoid __init__.py issues
+    RouterSpec("frames", "src.api.routers.frames", prefix="/api/v1", tags=["frames"], paths=("/api/v1/frames",)),
+    RouterSpec("recommendations", "src.api.routers.recommendations_simple", prefix="/api/v1", tags=["recommendations"],
+               paths=("/api/v1/recommendations",)),
+    RouterSpec("virtual_try_on", "src.api.routers.virtual_try_on", prefix="/api/v1", tags=["virtual-try-on"],
+               paths=("/api/v1/virtual-try-on",)),
+    RouterSpec("monitoring", "src.api.routers", attr="monitoring", paths=("/api/v1/monitoring",)),
+    RouterSpec("developer", "src.api.routers", attr="developer", paths=("/api/v1/developer",)),
+    RouterSpec("contact_lens_try_on", "src.api.routers", attr="contact_lens_try_on",
+               paths=("/api/contact-lens-try-on",)),
+    RouterSpec("auth_example", "src.api.routers.auth_example", paths=("/api/v1/auth-example",)),
+    RouterSpec("service_discovery", "src.api.routers.service_discovery", paths=("/api/v1/services",)),
+    RouterSpec("mongodb", "src.api.routers.mongodb", paths=("/api/v1/mongodb",)),
+    RouterSpec("admin", "src.api.routers.admin", prefix="/api/v1", tags=["admin"], paths=("/api/v1/admin",),
+               warmup_hook="warm_up"),
+]
+
+for spec in ROUTER_SPECS:
+    spec.lazy = lazy_routers
+    router_registry.register(spec)
+
+# Profile mode: import everything now and fail the boot if over budget
+if os.getenv("ROUTER_IMPORT_PROFILE", "false").lower() in ("1", "true", "yes"):
+    budget_ms = os.getenv("ROUTER_IMPORT_BUDGET_MS")
+    per_router_budget_ms = os.getenv("ROUTER_IMPORT_BUDGET_PER_ROUTER_MS")
+    router_registry.profile(
+        budget_ms=float(budget_ms) if budget_ms else None,
+        per_router_budget_ms=float(per_router_budget_ms) if per_router_budget_ms else None,
+    )
+
+app.add_middleware(LazyRouterMiddleware, registry=router_registry)
+
+# System settings live in memory and follow updates from other workers
+from src.api.services.system_settings import system_settings
+from src.api.middleware.maintenance import MaintenanceModeMiddleware
+
+
+def _apply_debug_logging(old, new):
+    if old.debug_logging != new.debug_logging:
+        logging.getLogger().setLevel(logging.DEBUG if new.debug_logging else logging.INFO)
+
+
+system_settings.on_change(_apply_debug_logging)
+app.add_middleware(MaintenanceModeMiddleware, settings=system_settings)
+
+# Request latency instrumentation. Added last so it is the outermost
+# middleware and its timings include the rest of the stack, including
+# requests the maintenance middleware turns away.
+from src.api.middleware.metrics import RequestMetrics, RequestMetricsMiddleware
+
+request_metrics = RequestMetrics()
+app.state.request_metrics = request_metrics
+if os.getenv("REQUEST_METRICS_ENABLED", "true").lower() not in ("0", "false", "no"):
+    app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
+
+# Warm-up pipeline gating readiness. Steps read connections from app.state
+# when they run, after startup_event has created them.
+from src.api.core.warmup import WarmupPipeline
+
+warmup_pipeline = WarmupPipeline(deadline=float(os.getenv("WARMUP_DEADLINE_SECONDS", "30")))
+app.state.warmup = warmup_pipeline
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "5"))
+
+@warmup_pipeline.step("redis_pool", timeout=5.0)
+async def warm_redis_pool():
+    """Pre-open Redis pool connections with concurrent pings."""
+    redis_client = getattr(app.state, 'redis', None)
+    if redis_client is None:
+        return
+    await asyncio.gather(*(redis_client.ping() for _ in range(WARMUP_POOL_CONNECTIONS)))
+
+@warmup_pipeline.step("mongodb_pool", timeout=10.0)
+async def warm_mongodb_pool():
+    """Pre-open MongoDB pool connections with concurrent pings."""
+    client = getattr(getattr(app.state, 'mongodb_manager', None), 'client', None)
+    if client is None:
+        return
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(WARMUP_POOL_CONNECTIONS)))
+
+@warmup_pipeline.step("routers")
+async def warm_routers():
+    """Import lazy routers and run their warm-up hooks (usage rollup catch-up for admin)."""
+    await router_registry.warm_up()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
     logger.info("Starting EyewearML API")
+    app.state.redis = None
+    app.state.mongodb_manager = None
     try:
         # Import settings within the startup event to ensure environment variables are loaded
         logger.info("Loading application settings")
         from src.api.core.config import settings
+        from src.api.core.startup import StartupOrchestrator
         logger.info("Application settings loaded successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize services: {str(e)}", exc_info=True)
+        # Don't raise exception to allow the app to start
+        return
 
-        # Initialize Prisma client if enabled
-        if settings.USE_PRISMA:
-            try:
-                logger.info("Initializing Prisma client...")
-                from src.api.database.prisma_client import get_prisma_client
-                prisma_client = await get_prisma_client()
-                logger.info("Prisma client initialized successfully")
-            except ImportError as e:
-                logger.warning(f"ImportError when initializing Prisma client: {str(e)}")
-                logger.warning(f"Traceback: {traceback.format_exc()}")
-            except Exception as e:
-                logger.warning(f"Failed to initialize Prisma client: {str(e)}")
+    orchestrator = StartupOrchestrator(
+        default_timeout=float(getattr(settings, 'STARTUP_COMPONENT_TIMEOUT', 10.0))
+    )
+    app.state.startup_orchestrator = orchestrator
+
+    # Initialize Prisma client if enabled
+    if settings.USE_PRISMA:
+        @orchestrator.component("prisma", timeout=15.0)
+        async def init_prisma():
+            logger.info("Initializing Prisma client...")
+            from src.api.database.prisma_client import get_prisma_client
+            await get_prisma_client()
 
-        # Initialize Redis for rate limiting
+    # Initialize Redis for rate limiting
+    @orchestrator.component("redis", timeout=5.0)
+    async def init_redis():
+        logger.info("Initializing Redis client for rate limiting...")
+        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
         try:
-            logger.info("Initializing Redis client for rate limiting...")
-            redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
             await redis_client.ping()
-            app.state.redis = redis_client
-            logger.info("Redis client initialized successfully")
-        except Exception as e:
-            logger.warning(f"Failed to initialize Redis client: {e}")
+        except BaseException:
             logger.warning("Rate limiting will use fallback policy")
-            app.state.redis = None
+            raise
+        app.state.redis = redis_client
+
+        # Share cached responses between instances when configured
+        if os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower() == "redis":
+            from src.api.middleware.response_cache import RedisResponseStore
+            response_cache.store = RedisResponseStore(redis_client)
+            logger.info("Response cache using Redis backend")
 
-        # Initialize MongoDB
+    # Follow settings updates from other workers
+    @orchestrator.component("system_settings", depends_on=("redis",), timeout=5.0)
+    async def init_system_settings():
+        await system_settings.start(app.state.redis)
+
+    # Follow token revocations from other workers
+    if getattr(app.state, "token_cache", None) is not None:
+        @orchestrator.component("token_denylist", depends_on=("redis",), timeout=5.0)
+        async def init_token_denylist():
+            await app.state.token_cache.denylist.start(app.state.redis)
+
+    # Initialize MongoDB
+    @orchestrator.component("mongodb", timeout=15.0)
+    async def init_mongodb():
+        logger.info("Initializing MongoDB connection...")
+        from src.api.database.mongodb_client import get_mongodb_manager
         try:
-            logger.info("Initializing MongoDB connection...")
-            from src.api.database.mongodb_client import get_mongodb_manager
-            mongodb_manager = await get_mongodb_manager()
-            app.state.mongodb_manager = mongodb_manager
-            logger.info("MongoDB connection initialized successfully")
-        except Exception as e:
-            logger.warning(f"Failed to initialize MongoDB connection: {e}")
+            app.state.mongodb_manager = await get_mongodb_manager()
+        except BaseException:
             logger.warning("MongoDB-dependent features will be disabled")
-            app.state.mongodb_manager = None
+            raise
 
-        # Initialize Service Discovery
-        try:
-            logger.info("Initializing Service Discovery...")
-            from src.api.services.service_discovery import init_service_discovery
-            
-            # Use Redis client for service discovery if available
-            redis_for_discovery = app.state.redis if hasattr(app.state, 'redis') else None
-            service_discovery = await init_service_discovery(redis_for_discovery)
-            app.state.service_discovery = service_discovery
-            
-            # Register this FastAPI instance as a service
-            await service_discovery.register_service(
-                service_name="eyewear-api",
-                host="localhost",
-                port=8000,
-                protocol="http",
-                health_check_path="/health",
-                metadata={
-                    "version": "1.0.0",
-                    "environment": settings.ENVIRONMENT,
-                    "service_type": "api_gateway"
-                },
-                tags={"api", "gateway", "eyewear"}
-            )
-            
-            logger.info("Service Discovery initialized successfully")
-        except ImportError as e:
-            logger.warning(f"ImportError when initializing Service Discovery: {str(e)}")
-            logger.warning(f"Traceback: {traceback.format_exc()}")
-        except Exception as e:
-            logger.warning(f"Failed to initialize Service Discovery: {str(e)}")
+    # Initialize Service Discovery, using Redis when it came up
+    @orchestrator.component("service_discovery", after=("redis",), timeout=5.0)
+    async def init_discovery():
+        logger.info("Initializing Service Discovery...")
+        from src.api.services.service_discovery import init_service_discovery
 
-        # Initialize basic services only
-        logger.info("Initializing basic services...")
-        
-        # Try to initialize repositories but don't fail if it doesn't work
+        service_discovery = await init_service_discovery(app.state.redis)
+        app.state.service_discovery = service_discovery
+
+        # Register this FastAPI instance as a service
+        await service_discovery.register_service(
+            service_name="eyewear-api",
+            host="localhost",
+            port=8000,
+            protocol="http",
+            health_check_path="/health",
+            metadata={
+                "version": "1.0.0",
+                "environment": settings.ENVIRONMENT,
+                "service_type": "api_gateway"
+            },
+            tags={"api", "gateway", "eyewear"}
+        )
+
+    # Repositories share the database clients, so let those connect first
+    @orchestrator.component(
+        "repositories",
+        after=("prisma", "mongodb") if settings.USE_PRISMA else ("mongodb",),
+        timeout=20.0,
+    )
+    async def init_repositories():
+        logger.info("Attempting to import and initialize repositories")
+        from src.api.dependencies.repositories import initialize_repositories
+        await initialize_repositories(settings) # Pass settings to initialize_repositories
+
+    # Initialize enhanced authentication system
+    @orchestrator.component("auth", timeout=10.0)
+    async def init_auth():
+        logger.info("Initializing enhanced authentication system")
         try:
-            logger.info("Attempting to import and initialize repositories")
-            # Log all imports to help identify where the render_asset import error might be occurring
-            try:
-                logger.info("Checking for any 'services.render' imports")
-                try:
-                    import services.render
-                    logger.info("Successfully imported services.render")
-                except ImportError as e:
-                    logger.warning(f"ImportError when importing services.render: {str(e)}")
-                    logger.warning(f"This is expected if the module doesn't exist")
-                except Exception:
-                    # Ignore other exceptions during this optional import check
-                    pass
-            except Exception as e:
-                logger.warning(f"Error checking for services.render: {str(e)}")
-                
-            from src.api.dependencies.repositories import initialize_repositories
-            await initialize_repositories(settings) # Pass settings to initialize_repositories
-            logger.info("Repositories initialized successfully")
+            from src.auth import TenantManager, AuthManager, TokenValidator, ApiKeyManager, RBACManager, BackwardCompatibilityManager
+            from src.api.dependencies.auth import init_auth_deps
         except ImportError as e:
-            logger.warning(f"ImportError when initializing repositories: {str(e)}")
-            logger.warning(f"Traceback: {traceback.format_exc()}")
-        except Exception as e:
-            logger.warning(f"Failed to initialize repositories: {str(e)}")
-            logger.warning("Continuing without database connections for cloud deployment")
-        
-        # Initialize enhanced authentication system
+            logger.warning(f"Auth imports failed: {str(e)}")
+            # Fall back to basic auth managers
+            from src.auth.api_key import ApiKeyManager
+            app.state.api_key_manager = ApiKeyManager()
+            logger.info("Fallback: Basic API key manager initialized")
+            raise
+
+        # Get secret key from settings
+        secret_key = getattr(settings, 'JWT_SECRET_KEY', 'your-secret-key-change-in-production')
+
+        # Initialize managers if not already done during app initialization
+        if not hasattr(app.state, 'auth_manager'):
+            tenant_manager = TenantManager()
+            auth_manager = AuthManager(secret_key=secret_key)
+            token_validator = TokenValidator(secret_key=secret_key, tenant_manager=tenant_manager)
+            api_key_manager = ApiKeyManager()
+            rbac_manager = RBACManager()
+            compatibility_manager = BackwardCompatibilityManager(api_key_manager, auth_manager)
+
+            # Store managers in app state
+            app.state.auth_manager = auth_manager
+            app.state.token_validator = token_validator
+            app.state.api_key_manager = api_key_manager
+            app.state.rbac_manager = rbac_manager
+            app.state.tenant_manager = tenant_manager
+            app.state.compatibility_manager = compatibility_manager
+
+            # Initialize auth dependencies
+            init_auth_deps(auth_manager, token_validator, api_key_manager, rbac_manager)
+            logger.info("Auth managers initialized in startup event")
+        else:
+            logger.info("Auth managers already initialized during app creation")
+
+        # Try to initialize OAuth manager for backward compatibility
         try:
-            logger.info("Initializing enhanced authentication system")
-            
-            # Check if auth imports were successful by trying to import
-            try:
-                from src.auth import Role, Permission, TenantManager, AuthManager, TokenValidator, ApiKeyManager, RBACManager, BackwardCompatibilityManager
-                auth_imports_successful = True
-                logger.info("Auth imports successful")
-            except ImportError as e:
-                logger.warning(f"Auth imports failed: {str(e)}")
-                auth_imports_successful = False
-            
-            # Only initialize if imports were successful
-            if not auth_imports_successful:
-                logger.warning("Skipping enhanced auth initialization due to import failures")
-                raise ImportError("Auth imports failed during startup")
-            
-            # Get secret key from settings
-            secret_key = getattr(settings, 'JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-            
-            # Initialize managers if not already done during app initialization
-            if not hasattr(app.state, 'auth_manager'):
-                tenant_manager = TenantManager()
-                auth_manager = AuthManager(secret_key=secret_key)
-                token_validator = TokenValidator(secret_key=secret_key, tenant_manager=tenant_manager)
-                api_key_manager = ApiKeyManager()
-                rbac_manager = RBACManager()
-                compatibility_manager = BackwardCompatibilityManager(api_key_manager, auth_manager)
-                
-                # Store managers in app state
-                app.state.auth_manager = auth_manager
-                app.state.token_validator = token_validator
-                app.state.api_key_manager = api_key_manager
-                app.state.rbac_manager = rbac_manager
-                app.state.tenant_manager = tenant_manager
-                app.state.compatibility_manager = compatibility_manager
-                
-                # Initialize auth dependencies
-                init_auth_deps(auth_manager, token_validator, api_key_manager, rbac_manager)
-                logger.info("Auth managers initialized in startup event")
-            else:
-                logger.info("Auth managers already initialized during app creation")
-            
-            # Try to initialize OAuth manager for backward compatibility
-            try:
-                from src.auth.oauth import OAuthManager
-                app.state.oauth_manager = OAuthManager()
-                logger.info("OAuth manager initialized successfully")
-            except ImportError as e:
-                logger.warning(f"OAuth manager not available: {str(e)}")
-            
-            logger.info("Enhanced authentication system initialized successfully")
-            
+            from src.auth.oauth import OAuthManager
+            app.state.oauth_manager = OAuthManager()
+            logger.info("OAuth manager initialized successfully")
         except ImportError as e:
-            logger.warning(f"ImportError when initializing enhanced auth system: {str(e)}")
-            logger.warning(f"Traceback: {traceback.format_exc()}")
-            # Fall back to basic auth managers
-            try:
-                from src.auth.api_key import ApiKeyManager
-                app.state.api_key_manager = ApiKeyManager()
-                logger.info("Fallback: Basic API key manager initialized")
-            except Exception as fallback_e:
-                logger.error(f"Failed to initialize fallback auth: {str(fallback_e)}")
-        except Exception as e:
-            logger.warning(f"Failed to initialize enhanced auth system: {str(e)}")
-            logger.warning(f"Traceback: {traceback.format_exc()}")
-            
+            logger.warning(f"OAuth manager not available: {str(e)}")
+
+    try:
+        await orchestrator.run()
         logger.info("Basic services initialized")
     except Exception as e:
         logger.error(f"Failed to initialize services: {str(e)}", exc_info=True)
         # Don't raise exception to allow the app to start
 
+@app.on_event("startup")
+async def start_warmup():
+    """Warm up in the background; /ready reports ready once it is done."""
+    warmup_pipeline.start()
+
+@app.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving."""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: warm-up finished or its deadline passed."""
+    status = warmup_pipeline.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "ready" if status["ready"] else "warming_up", **status},
+    )
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request latency histograms and in-flight gauges in Prometheus text format."""
+    body = request_metrics.render_prometheus()
+    if getattr(app.state, "token_cache", None) is not None:
+        body += app.state.token_cache.render_prometheus()
+    return PlainTextResponse(
+        body,
+        media_type="text/plain; version=0.0.4",
+    )
+
+@app.get("/diagnostics/startup")
+async def startup_diagnostics():
+    """Per-component startup timeline for diagnosing cold starts."""
+    orchestrator = getattr(app.state, 'startup_orchestrator', None)
+    if orchestrator is None:
+        return {"success": False, "message": "Startup has not run", "data": None}
+    return {"success": True, "data": orchestrator.timeline()}
+
+@app.get("/diagnostics/routers")
+async def router_diagnostics():
+    """Import cost and load state of each registered router."""
+    return {"success": True, "data": router_registry.report()}
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
@@ -526,6 +549,12 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"Failed to shutdown Service Discovery: {e}")
     
+    await system_settings.stop()
+    if getattr(app.state, "rate_limiter", None) is not None:
+        await app.state.rate_limiter.stop()
+    if getattr(app.state, "token_cache", None) is not None:
+        await app.state.token_cache.denylist.stop()
+
     # Cleanup Redis client
     try:
         if hasattr(app.state, 'redis') and app.state.redis:
@@ -0,0 +1,182 @@
+"""
+Bearer-token authentication middleware.
+
+Requests carrying ``Authorization: Bearer <token>`` are authenticated as a
+JWT first and as an API key second; the resolved ``UserContext`` is put on
+``request.state.user`` and its tenant on ``request.state.tenant_id``, which
+the rate limiting, metrics and response cache middleware read. Requests
+without the header pass through unauthenticated so public endpoints keep
+working, and ``AuthenticationDependency`` enforces authentication and
+permissions per route.
+
+Validated JWTs are kept in a ``VerifiedTokenCache`` together with the
+user's resolved permissions, so a token presented again skips signature
+validation and the RBAC lookups until it expires or something is revoked.
+"""
+
+import inspect
+import logging
+from typing import Any, Iterable, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from src.api.middleware.token_cache import VerifiedTokenCache
+from src.auth.api_key import ApiKey, ApiKeyScope, user_context_for_api_key
+from src.auth.rbac import RBACManager, UserContext
+
+logger = logging.getLogger(__name__)
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=401,
+        content={"detail": detail},
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class JWTAuthMiddleware:
+    """Pure ASGI middleware resolving bearer tokens to a user context."""
+
+    def __init__(
+        self,
+        app,
+        auth_manager=None,
+        token_validator=None,
+        api_key_manager=None,
+        rbac_manager=None,
+        excluded_paths: Iterable[str] = (),
+        token_cache: Optional[VerifiedTokenCache] = None,
+    ):
+        self.app = app
+        self.auth_manager = auth_manager
+        self.token_validator = token_validator
+        self.api_key_manager = api_key_manager
+        self.rbac_manager = rbac_manager
+        self.excluded_paths = set(excluded_paths)
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache()
+
+    def _is_excluded(self, path: str) -> bool:
+        return path in self.excluded_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._is_excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        state = request.state
+        state.authenticated = False
+        state.user = None
+        state.tenant_id = None
+        state.auth_method = None
+
+        header = request.headers.get("Authorization")
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            await _unauthorized("Invalid authorization header")(scope, receive, send)
+            return
+        token = token.strip()
+
+        error = await self._authenticate_jwt(token, state)
+        if error is not None and not await self._authenticate_api_key(token, state):
+            await _unauthorized(error)(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _authenticate_jwt(self, token: str, state) -> Optional[str]:
+        """Authenticate ``token`` as a JWT; returns an error message on failure."""
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            user_context = cached.user_context
+            permissions = cached.claims.get("permissions")
+        else:
+            if self.token_validator is None:
+                return "Token validation unavailable"
+            # Read before validating, so a revocation during validation is not cached as current
+            version = self.token_cache.denylist.version
+            valid, user_context, error = await _maybe_await(self.token_validator.validate_token(token))
+            if not valid or user_context is None:
+                return error or "Invalid token"
+            permissions = None
+            if self.rbac_manager is not None:
+                permissions = self.rbac_manager.get_user_permissions(user_context)
+            self.token_cache.put(token, user_context, {"permissions": permissions}, version=version)
+
+        state.authenticated = True
+        state.user = user_context
+        state.tenant_id = getattr(user_context, "tenant_id", None)
+        state.auth_method = "jwt"
+        state.permissions = permissions
+        return None
+
+    async def _authenticate_api_key(self, token: str, state) -> bool:
+        if self.api_key_manager is None:
+            return False
+        try:
+            api_key = await _maybe_await(self.api_key_manager.verify_api_key(token))
+            if not isinstance(api_key, ApiKey):
+                return False
+            user_context = user_context_for_api_key(api_key)
+        except Exception as e:
+            logger.warning(f"API key verification failed: {e}")
+            return False
+        state.authenticated = True
+        state.user = user_context
+        state.tenant_id = user_context.tenant_id
+        state.auth_method = "api_key"
+        state.api_key = api_key
+        return True
+
+
+class AuthenticationDependency:
+    """Route dependency requiring authentication, permissions or API key scopes."""
+
+    def __init__(
+        self,
+        required_permissions: Optional[List[Any]] = None,
+        required_api_key_scopes: Optional[List[ApiKeyScope]] = None,
+        require_auth: bool = True,
+    ):
+        self.required_permissions = required_permissions or []
+        self.required_api_key_scopes = required_api_key_scopes or []
+        self.require_auth = require_auth
+
+    async def __call__(self, request: Request) -> Optional[UserContext]:
+        state = request.state
+        if not getattr(state, "authenticated", False):
+            if self.require_auth:
+                raise HTTPException(status_code=401, detail="Authentication required")
+            return None
+
+        user = getattr(state, "user", None)
+        if user is None:
+            if self.require_auth:
+                raise HTTPException(status_code=401, detail="Invalid user context")
+            return None
+
+        if self.required_permissions:
+            rbac_manager = RBACManager()
+            for permission in self.required_permissions:
+                if not rbac_manager.has_permission(user, permission):
+                    name = getattr(permission, "value", permission)
+                    raise HTTPException(status_code=403, detail=f"Permission denied: {name}")
+
+        if self.required_api_key_scopes and getattr(state, "auth_method", None) == "api_key":
+            scopes = set(getattr(state, "api_key").scopes)
+            if ApiKeyScope.ADMIN not in scopes and not scopes.issuperset(self.required_api_key_scopes):
+                raise HTTPException(status_code=403, detail="Insufficient API key permissions")
+
+        return user
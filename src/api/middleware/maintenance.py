@@ -0,0 +1,49 @@
+"""
+Maintenance mode gate.
+
+While ``maintenance_mode`` is on, requests outside the exempt paths get a
+503 without reaching the app. The check reads the in-memory settings
+snapshot, so it costs one attribute lookup per request.
+"""
+
+import json
+from typing import Iterable
+
+from src.api.services.system_settings import SettingsService
+
+DEFAULT_EXEMPT_PATHS = ("/health", "/live", "/ready", "/metrics", "/api/v1/admin")
+
+
+class MaintenanceModeMiddleware:
+    """Pure ASGI middleware rejecting traffic during maintenance."""
+
+    def __init__(self, app, settings: SettingsService, exempt_paths: Iterable[str] = DEFAULT_EXEMPT_PATHS,
+                 retry_after: int = 120):
+        self.app = app
+        self.settings = settings
+        self.exempt_paths = tuple(exempt_paths)
+        self.retry_after = retry_after
+        self._body = json.dumps({
+            "success": False,
+            "detail": "Service temporarily unavailable for maintenance",
+        }).encode()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.settings.current.maintenance_mode
+            or scope["path"].startswith(self.exempt_paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._body})
@@ -0,0 +1,234 @@
+"""
+Request latency instrumentation middleware.
+
+Records latency per route template, tenant and status code into fixed-bucket
+histograms and tracks in-flight requests. Everything is updated on the event
+loop thread, so the counters are plain integers with no locking; recording a
+request is a bisect plus a few increments.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Bucket upper bounds in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.025, 0.05, 0.075,
+    0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0,
+)
+
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.5, 0.95, 0.99)
+
+UNMATCHED_ROUTE = "<unmatched>"
+UNKNOWN_TENANT = "-"
+OTHER_TENANT = "other"
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with an overflow bucket."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                upper = self.bounds[i]
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+        return self.bounds[-1]
+
+
+class RequestMetrics:
+    """Latency histograms keyed by method, route template, status and tenant."""
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        max_tenants: int = 200,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self.max_tenants = max_tenants
+        self._series: Dict[Tuple[str, str, int, str], LatencyHistogram] = {}
+        self._tenants: Set[str] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _tenant_label(self, tenant: Optional[str]) -> str:
+        if not tenant:
+            return UNKNOWN_TENANT
+        if tenant in self._tenants:
+            return tenant
+        # Cap label cardinality; late tenants share one series
+        if len(self._tenants) >= self.max_tenants:
+            return OTHER_TENANT
+        self._tenants.add(tenant)
+        return tenant
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        tenant: Optional[str],
+        seconds: float,
+    ) -> None:
+        key = (method, route, status, self._tenant_label(tenant))
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = LatencyHistogram(self.buckets)
+        histogram.observe(seconds)
+
+    def reset(self) -> None:
+        self._series.clear()
+        self._tenants.clear()
+        self.max_in_flight = self.in_flight
+
+    def route_histograms(self) -> Dict[Tuple[str, str], LatencyHistogram]:
+        """Histograms merged across status and tenant, per method and route."""
+        merged: Dict[Tuple[str, str], LatencyHistogram] = {}
+        for (method, route, _, _), histogram in self._series.items():
+            target = merged.get((method, route))
+            if target is None:
+                target = merged[(method, route)] = LatencyHistogram(self.buckets)
+            target.merge(histogram)
+        return merged
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, object]:
+        """Per-route request counts and latency quantiles in milliseconds."""
+        routes = []
+        for (method, route), histogram in sorted(self.route_histograms().items()):
+            entry = {"method": method, "route": route, "count": histogram.count}
+            for q in quantiles:
+                entry[f"p{int(q * 100)}_ms"] = round(histogram.quantile(q) * 1000, 3)
+            routes.append(entry)
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "routes": routes,
+        }
+
+    def render_prometheus(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        lines: List[str] = [
+            "# HELP http_request_duration_seconds Request latency by route, status and tenant.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        bounds = [_format_float(b) for b in self.buckets] + ["+Inf"]
+        for (method, route, status, tenant), histogram in sorted(self._series.items()):
+            labels = (
+                f'method="{_escape(method)}",route="{_escape(route)}",'
+                f'status="{status}",tenant="{_escape(tenant)}"'
+            )
+            cumulative = 0
+            for le, c in zip(bounds, histogram.counts):
+                cumulative += c
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {_format_float(histogram.sum)}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP http_request_duration_quantile_seconds Estimated latency quantiles by route.")
+        lines.append("# TYPE http_request_duration_quantile_seconds gauge")
+        for (method, route), histogram in sorted(self.route_histograms().items()):
+            for q in quantiles:
+                lines.append(
+                    f'http_request_duration_quantile_seconds{{method="{_escape(method)}",'
+                    f'route="{_escape(route)}",quantile="{q}"}} {_format_float(histogram.quantile(q))}'
+                )
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+        lines.append("# HELP http_requests_in_flight_max Highest number of concurrent requests seen.")
+        lines.append("# TYPE http_requests_in_flight_max gauge")
+        lines.append(f"http_requests_in_flight_max {self.max_in_flight}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    The route label is the matched route's path template (``/frames/{id}``),
+    which the router stores in the scope, so raw URLs never become labels.
+    The tenant is ``request.state.tenant_id`` as set by authentication,
+    falling back to the tenant header.
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: Optional[RequestMetrics] = None,
+        tenant_header: str = "x-tenant-id",
+    ):
+        self.app = app
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.tenant_header = tenant_header.lower().encode("latin-1")
+
+    def _tenant(self, scope) -> Optional[str]:
+        # The authenticated tenant wins over the client-supplied header
+        state = scope.get("state")
+        if state and state.get("tenant_id"):
+            return state["tenant_id"]
+        for name, value in scope.get("headers", ()):
+            if name == self.tenant_header:
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        if metrics.in_flight > metrics.max_in_flight:
+            metrics.max_in_flight = metrics.in_flight
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+            metrics.observe(scope["method"], template, status, self._tenant(scope), elapsed)
@@ -0,0 +1,672 @@
+"""
+Redis-backed rate limiting middleware.
+
+Each request costs one Redis round trip: the window check, the insert and
+the numbers for the rate limit headers are computed atomically by a Lua
+script (EVALSHA, falling back to EVAL the first time a server sees it), so
+concurrent bursts cannot race past the limit.
+
+Three algorithms are available through ``RateLimitConfig.algorithm``:
+
+- ``sliding_log``: exact sliding window, one sorted-set member per request.
+- ``sliding_counter``: approximate sliding window from the current and
+  previous fixed-window counts, O(1) state per key.
+- ``gcra``: generic cell rate algorithm, a single timestamp per key.
+
+With ``RateLimitConfig.lease_size`` set, each worker instead reserves
+requests from Redis in chunks and grants them from a local bucket with no
+round trip, falling back to one reservation per request only when a client
+is close to its limit (see ``LocalLeaseLimiter``).
+
+With ``fallback_policy="local"``, limits are enforced in process by
+``ShardedLocalLimiter`` while Redis is failing, and handed back to Redis
+once it answers again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from redis.exceptions import NoScriptError
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ("sliding_log", "sliding_counter", "gcra")
+FALLBACK_POLICIES = ("allow", "deny", "local")
+
+# All scripts take KEYS[1] and ARGV = now_ms, window_ms, limit[, member]
+# and return {allowed, count, reset_ms}. ``reset_ms`` is when the window
+# frees up: the next allowed time for a denied request.
+# Sliding-log scores are Unix timestamps in seconds, as they have always
+# been, so the sorted sets stay readable by ``_get_rate_limit_info`` and
+# by workers running older code.
+SLIDING_LOG_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1]) / 1000
+local window = tonumber(ARGV[2]) / 1000
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+  redis.call('ZADD', key, now, ARGV[4])
+  count = count + 1
+  allowed = 1
+end
+redis.call('PEXPIRE', key, ARGV[2])
+local reset = now + window
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+if oldest[2] then
+  reset = tonumber(oldest[2]) + window
+end
+return {allowed, count, math.floor(reset * 1000 + 0.5)}
+"""
+
+SLIDING_COUNTER_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local index = math.floor(now / window)
+local state = redis.call('HMGET', key, 'w', 'c', 'p')
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+local stored = tonumber(state[1])
+if stored ~= index then
+  if stored == index - 1 then previous = current else previous = 0 end
+  current = 0
+end
+local start = index * window
+local weight = 1 - (now - start) / window
+local estimate = previous * weight + current
+local allowed = 0
+local reset = start + window
+if estimate + 1 <= limit then
+  current = current + 1
+  estimate = estimate + 1
+  allowed = 1
+elseif previous > 0 and current + 1 <= limit then
+  -- Wait until the previous window's share has decayed enough
+  reset = start + math.ceil(window * (previous - (limit - current - 1)) / previous)
+end
+redis.call('HSET', key, 'w', index, 'c', current, 'p', previous)
+redis.call('PEXPIRE', key, window * 2)
+return {allowed, math.ceil(estimate), reset}
+"""
+
+GCRA_SCRIPT = """
+local key = KEYS[1]
+-- Work in integer microseconds so the stored arrival time stays exact
+local now = tonumber(ARGV[1]) * 1000
+local window = tonumber(ARGV[2]) * 1000
+local limit = tonumber(ARGV[3])
+local interval = math.floor(window / limit)
+local tat = tonumber(redis.call('GET', key)) or now
+if tat < now then tat = now end
+local allow_at = tat + interval - window
+if now < allow_at then
+  return {0, limit, math.ceil(allow_at / 1000)}
+end
+local new_tat = tat + interval
+redis.call('SET', key, string.format('%d', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+local remaining = math.floor((now - (new_tat - window)) / interval)
+return {1, limit - remaining, math.ceil(new_tat / 1000)}
+"""
+
+# Reserve up to ARGV[1] requests in a fixed-window counter without taking
+# it past ARGV[2]; returns {granted, used}
+LEASE_SCRIPT = """
+local key = KEYS[1]
+local want = tonumber(ARGV[1])
+local ceiling = tonumber(ARGV[2])
+local used = tonumber(redis.call('GET', key)) or 0
+local granted = math.max(0, math.min(want, ceiling - used))
+if granted > 0 then
+  used = redis.call('INCRBY', key, granted)
+  redis.call('PEXPIRE', key, ARGV[3])
+end
+return {granted, used}
+"""
+
+SCRIPTS = {
+    "sliding_log": SLIDING_LOG_SCRIPT,
+    "sliding_counter": SLIDING_COUNTER_SCRIPT,
+    "gcra": GCRA_SCRIPT,
+}
+
+
+class RateLimitConfig:
+    """Limits per minute by endpoint and user type."""
+
+    def __init__(self):
+        self.default_limit = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+        self.window_size = 60
+        self.burst_allowance = 0.5
+        self.algorithm = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_log")
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.key_prefix = "rate_limit"
+        # Requests a worker reserves per client at a time; 0 checks every
+        # request against Redis
+        self.lease_size = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "0"))
+        # Fraction of a limit that chunked leases may reserve beyond it
+        self.overshoot_tolerance = float(os.getenv("RATE_LIMIT_OVERSHOOT_TOLERANCE", "0.1"))
+        self.reconcile_interval = float(os.getenv("RATE_LIMIT_RECONCILE_SECONDS", "1.0"))
+        # Keys tracked per process by the local fallback limiter
+        self.local_max_keys = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "100000"))
+        self.endpoint_limits = {
+            "/api/v1/auth/login": 5,
+            "/api/v1/auth/register": 3,
+            "/api/v1/auth/reset-password": 3,
+            "/api/v1/recommendations": 30,
+            "/api/v1/virtual-try-on": 20,
+            "/api/v1/admin": 120,
+        }
+        self.user_type_limits = {
+            "free": self.default_limit,
+            "premium": self.default_limit * 2,
+            "professional": self.default_limit * 2,
+            "enterprise": self.default_limit * 5,
+        }
+        self.skip_paths = (
+            "/health",
+            "/api/v1/health",
+            "/live",
+            "/ready",
+            "/metrics",
+            "/api/v1/monitoring/internal",
+        )
+
+
+async def _eval_script(redis_client, script: str, sha: str, key: str, *args):
+    try:
+        return await redis_client.evalsha(sha, 1, key, *args)
+    except NoScriptError:
+        return await redis_client.eval(script, 1, key, *args)
+
+
+class _Lease:
+    __slots__ = ("index", "window", "tokens", "used", "active", "denied_until")
+
+    def __init__(self, index: int, window: int):
+        self.index = index
+        self.window = window
+        self.tokens = 0
+        self.used = 0
+        self.active = True
+        self.denied_until = 0.0
+
+    def expired(self, now: float) -> bool:
+        return now >= (self.index + 1) * self.window
+
+
+class LocalLeaseLimiter:
+    """Grants requests from per-worker buckets leased from Redis in chunks.
+
+    Redis keeps a fixed-window counter of reserved requests per client.
+    While a client has plenty of headroom, a worker reserves ``lease_size``
+    requests at once and serves them locally; chunked leases may take the
+    counter up to ``limit * (1 + overshoot_tolerance)``, which bounds how
+    far stale headroom can overshoot. Within ``SYNC_MARGIN`` leases of the
+    limit every request reserves exactly one slot, capped at the limit.
+
+    ``reconcile`` runs in the background and, in one pipeline, hands the
+    unused reservations of idle clients back so other workers can use them.
+    Since only that frees slots within a window, a denial is also answered
+    locally until the next reconcile interval.
+    """
+
+    # Switch to per-request reservations within this many leases of the limit
+    SYNC_MARGIN = 2
+
+    def __init__(self, lease_size: int, overshoot_tolerance: float = 0.1, reconcile_interval: float = 1.0):
+        if lease_size < 1:
+            raise ValueError("lease_size must be at least 1")
+        self.lease_size = lease_size
+        self.overshoot_tolerance = overshoot_tolerance
+        self.reconcile_interval = reconcile_interval
+        self._leases: Dict[str, _Lease] = {}
+        self._script_sha = hashlib.sha1(LEASE_SCRIPT.encode()).hexdigest()
+        self._task: Optional[asyncio.Task] = None
+
+    def _lease_size_for(self, limit: int, used: int) -> int:
+        if limit - used > self.lease_size * self.SYNC_MARGIN:
+            return self.lease_size
+        return 1
+
+    async def acquire(self, redis_client, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        """Take one request; returns ``(allowed, count, reset)`` like the scripted check."""
+        self._ensure_reconciling(redis_client)
+        now = time.time()
+        index = int(now // window)
+        reset = (index + 1) * window
+        lease = self._leases.get(key)
+        if lease is None or lease.index != index:
+            lease = self._leases[key] = _Lease(index, window)
+        lease.active = True
+
+        if lease.tokens == 0:
+            if now < lease.denied_until:
+                return False, limit, reset
+            want = self._lease_size_for(limit, lease.used)
+            ceiling = limit + int(limit * self.overshoot_tolerance) if want > 1 else limit
+            granted, used = await _eval_script(
+                redis_client, LEASE_SCRIPT, self._script_sha, f"{key}:{index}", want, ceiling, window * 2000
+            )
+            lease.tokens += int(granted)
+            lease.used = int(used)
+            if lease.tokens == 0:
+                lease.denied_until = now + self.reconcile_interval
+                return False, limit, reset
+
+        lease.tokens -= 1
+        # Reserved globally, less what this worker holds but hasn't granted
+        return True, min(limit, lease.used - lease.tokens), reset
+
+    async def reconcile(self, redis_client) -> int:
+        """Return idle reservations to Redis; returns how many were released."""
+        now = time.time()
+        pipe = redis_client.pipeline(transaction=False)
+        released = 0
+        for key, lease in list(self._leases.items()):
+            if lease.expired(now):
+                # Counters of past windows expire on their own
+                del self._leases[key]
+            elif lease.active:
+                lease.active = False
+            else:
+                del self._leases[key]
+                if lease.tokens:
+                    pipe.decrby(f"{key}:{lease.index}", lease.tokens)
+                    released += lease.tokens
+        if released:
+            await pipe.execute()
+            logger.debug(f"Released {released} idle rate limit reservations")
+        return released
+
+    async def _reconcile_loop(self, redis_client) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile(redis_client)
+            except Exception as e:
+                logger.warning(f"Rate limit reconciliation failed: {e}")
+
+    def _ensure_reconciling(self, redis_client) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._reconcile_loop(redis_client))
+
+    def clear(self) -> None:
+        """Forget all leases, e.g. after Redis lost its counters."""
+        self._leases.clear()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class _Shard:
+    __slots__ = ("lock", "capacity", "slots", "index", "current", "previous")
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        # key -> slot in the counter arrays, least recently used first
+        self.slots: "OrderedDict[str, int]" = OrderedDict()
+        self.index = array("q", [0]) * capacity
+        self.current = array("L", [0]) * capacity
+        self.previous = array("L", [0]) * capacity
+
+
+class ShardedLocalLimiter:
+    """In-process sliding-window-counter limiter with bounded memory.
+
+    Keys are spread over lock-striped shards. Each shard keeps its counters
+    in fixed-size arrays and an LRU map from key to array slot; once a
+    shard is full, the least recently used key gives up its slot.
+    """
+
+    def __init__(self, max_keys: int = 100_000, shards: int = 16):
+        per_shard = max(1, max_keys // shards)
+        self._shards: List[_Shard] = [_Shard(per_shard) for _ in range(shards)]
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard.slots) for shard in self._shards)
+
+    def _slot(self, shard: _Shard, key: str, index: int) -> int:
+        slot = shard.slots.get(key)
+        if slot is not None:
+            shard.slots.move_to_end(key)
+            return slot
+        if len(shard.slots) < shard.capacity:
+            slot = len(shard.slots)
+        else:
+            _, slot = shard.slots.popitem(last=False)
+            self.evictions += 1
+        shard.slots[key] = slot
+        shard.index[slot] = index
+        shard.current[slot] = 0
+        shard.previous[slot] = 0
+        return slot
+
+    def check(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        """Check and record one request; returns ``(allowed, count, reset)``."""
+        now = time.time()
+        index = int(now // window)
+        start = index * window
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            slot = self._slot(shard, key, index)
+            stored = shard.index[slot]
+            if stored != index:
+                shard.previous[slot] = shard.current[slot] if stored == index - 1 else 0
+                shard.current[slot] = 0
+                shard.index[slot] = index
+            current = shard.current[slot]
+            previous = shard.previous[slot]
+            estimate = previous * (1 - (now - start) / window) + current
+            if estimate + 1 <= limit:
+                shard.current[slot] = current + 1
+                return True, math.ceil(estimate + 1), start + window
+        reset = start + window
+        if previous and current + 1 <= limit:
+            # When the previous window's share has decayed enough
+            reset = start + math.ceil(window * (previous - (limit - current - 1)) / previous)
+        return False, math.ceil(estimate), reset
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.slots.clear()
+
+
+class RateLimitMiddleware:
+    """HTTP middleware enforcing per-client limits through Redis."""
+
+    # Seconds to wait before retrying a failed Redis connection
+    RECONNECT_INTERVAL = 30.0
+    # Seconds a connection attempt may take before it counts as failed
+    CONNECT_TIMEOUT = 2.0
+    # Seconds the local fallback serves alone after a Redis error
+    REDIS_RETRY_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        redis_client=None,
+        fallback_policy: str = "allow",
+    ):
+        self.config = config or RateLimitConfig()
+        if self.config.algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {self.config.algorithm}")
+        if fallback_policy not in FALLBACK_POLICIES:
+            raise ValueError(f"Unknown rate limit fallback policy: {fallback_policy}")
+        self.redis = redis_client
+        self.fallback_policy = fallback_policy
+        self._next_connect_attempt = 0.0
+        self._connect_task: Optional[asyncio.Task] = None
+        self.local: Optional[ShardedLocalLimiter] = None
+        if fallback_policy == "local":
+            self.local = ShardedLocalLimiter(max_keys=self.config.local_max_keys)
+        # While degraded, Redis is skipped until ``_redis_retry_at``
+        self._degraded = False
+        self._redis_retry_at = 0.0
+        self._script = SCRIPTS[self.config.algorithm]
+        self._script_sha = hashlib.sha1(self._script.encode()).hexdigest()
+        self.leases: Optional[LocalLeaseLimiter] = None
+        if self.config.lease_size > 0:
+            self.leases = LocalLeaseLimiter(
+                self.config.lease_size,
+                overshoot_tolerance=self.config.overshoot_tolerance,
+                reconcile_interval=self.config.reconcile_interval,
+            )
+
+    async def __call__(self, request: Request, call_next):
+        if self._should_skip_rate_limiting(request):
+            return await call_next(request)
+
+        redis_client = await self._get_redis(request)
+        if self.local is None and redis_client is None:
+            return await self._fallback(request, call_next)
+
+        client_id = self._get_client_identifier(request)
+        limit = self._get_rate_limit(request, client_id)
+        key = self._get_key(request, client_id)
+        if self.local is not None and (redis_client is None or time.monotonic() < self._redis_retry_at):
+            self._set_degraded(True)
+            allowed, count, reset = self.local.check(key, limit, self.config.window_size)
+        elif self.leases is not None:
+            allowed, count, reset = await self._leased_check(
+                self.leases, redis_client, key, limit, self.config.window_size
+            )
+        else:
+            allowed, count, reset = await self._sliding_window_check(
+                redis_client, key, limit, self.config.window_size
+            )
+
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(0, limit - count)),
+            "X-RateLimit-Reset": str(reset),
+        }
+        if self._degraded:
+            headers["X-RateLimit-Status"] = "local"
+        if not allowed:
+            retry_after = max(1, reset - int(time.time()))
+            headers["Retry-After"] = str(retry_after)
+            logger.info(f"Rate limit exceeded for {client_id} on {request.url.path}")
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded", "retry_after": retry_after},
+                headers=headers,
+            )
+
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+    async def _fallback(self, request: Request, call_next):
+        if self.fallback_policy == "deny":
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Rate limiting unavailable"},
+                headers={"X-RateLimit-Status": "unavailable"},
+            )
+        response = await call_next(request)
+        response.headers["X-RateLimit-Status"] = "disabled"
+        return response
+
+    async def _get_redis(self, request: Request):
+        """Use the configured or app-wide client, connecting in the background otherwise.
+
+        Requests never wait for a connection attempt: until one succeeds
+        they get the fallback policy.
+        """
+        if self.redis is not None:
+            return self.redis
+        app_redis = getattr(request.app.state, "redis", None)
+        if app_redis is not None:
+            return app_redis
+        connecting = self._connect_task is not None and not self._connect_task.done()
+        if not connecting and time.monotonic() >= self._next_connect_attempt:
+            self._next_connect_attempt = time.monotonic() + self.RECONNECT_INTERVAL
+            self._connect_task = asyncio.ensure_future(self._connect())
+        return None
+
+    async def _connect(self) -> None:
+        try:
+            client = redis.from_url(
+                self.config.redis_url, decode_responses=True, socket_connect_timeout=self.CONNECT_TIMEOUT
+            )
+            await asyncio.wait_for(client.ping(), self.CONNECT_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Rate limiting Redis unavailable: {e}")
+            return
+        self.redis = client
+        logger.info("Rate limiting connected to Redis")
+
+    def _should_skip_rate_limiting(self, request: Request) -> bool:
+        if request.method == "OPTIONS":
+            return True
+        return request.url.path.startswith(self.config.skip_paths)
+
+    def _get_client_identifier(self, request: Request) -> str:
+        user_id, _ = _user_attributes(getattr(request.state, "user", None))
+        if user_id:
+            return f"user:{user_id}"
+
+        api_key = request.headers.get("X-API-Key")
+        if api_key:
+            return f"api_key:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+        host = request.client.host if request.client else "unknown"
+        return f"ip:{host}"
+
+    def _get_endpoint_limit(self, path: str) -> Optional[Tuple[str, int]]:
+        """Longest configured endpoint prefix matching ``path``."""
+        best = None
+        for prefix, limit in self.config.endpoint_limits.items():
+            if path.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+                best = (prefix, limit)
+        return best
+
+    def _get_rate_limit(self, request: Request, client_id: str) -> int:
+        endpoint = self._get_endpoint_limit(request.url.path)
+        if endpoint is not None:
+            return endpoint[1]
+        user = getattr(request.state, "user", None)
+        if user is not None:
+            _, user_type = _user_attributes(user)
+            return self.config.user_type_limits.get(user_type or "free", self.config.default_limit)
+        return self.config.default_limit
+
+    def _get_key(self, request: Request, client_id: str) -> str:
+        # Endpoint limits get their own window so they don't eat the global one
+        endpoint = self._get_endpoint_limit(request.url.path)
+        scope = endpoint[0] if endpoint is not None else "global"
+        mode = "lease" if self.leases is not None else self.config.algorithm
+        return f"{self.config.key_prefix}:{mode}:{client_id}:{scope}"
+
+    def _set_degraded(self, degraded: bool) -> None:
+        if degraded == self._degraded:
+            return
+        self._degraded = degraded
+        if degraded:
+            logger.warning("Redis unavailable, enforcing rate limits in process")
+            return
+        logger.info("Redis recovered, rate limits handed back to Redis")
+        # Counts kept during the outage are not carried over
+        if self.local is not None:
+            self.local.clear()
+        if self.leases is not None:
+            self.leases.clear()
+
+    def _redis_succeeded(self) -> None:
+        if self._degraded:
+            self._set_degraded(False)
+
+    def _fallback_result(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        if self.local is not None:
+            # Skip Redis for a while rather than waiting on it every request
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+            self._set_degraded(True)
+            return self.local.check(key, limit, window)
+        reset = int(time.time()) + window
+        if self.fallback_policy == "deny":
+            return False, limit, reset
+        return True, 0, reset
+
+    async def _sliding_window_check(
+        self, redis_client, key: str, limit: int, window: int
+    ) -> Tuple[bool, int, int]:
+        """Check and record one request; returns ``(allowed, count, reset)``.
+
+        ``reset`` is a Unix timestamp in seconds.
+        """
+        now_ms = int(time.time() * 1000)
+        try:
+            allowed, count, reset_ms = await _eval_script(
+                redis_client, self._script, self._script_sha, key,
+                now_ms, window * 1000, limit, f"{now_ms}-{uuid.uuid4().hex[:8]}",
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, applying '{self.fallback_policy}' policy: {e}")
+            return self._fallback_result(key, limit, window)
+        self._redis_succeeded()
+        return bool(int(allowed)), int(count), -(-int(reset_ms) // 1000)
+
+    async def _leased_check(
+        self, leases: LocalLeaseLimiter, redis_client, key: str, limit: int, window: int
+    ) -> Tuple[bool, int, int]:
+        """Like ``_sliding_window_check`` but served from a local lease when possible."""
+        try:
+            result = await leases.acquire(redis_client, key, limit, window)
+        except Exception as e:
+            logger.warning(f"Rate limit lease failed, applying '{self.fallback_policy}' policy: {e}")
+            return self._fallback_result(key, limit, window)
+        self._redis_succeeded()
+        return result
+
+    async def stop(self) -> None:
+        """Stop background reconciliation and any pending connection attempt."""
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+        if self.leases is not None:
+            await self.leases.stop()
+
+    async def _get_rate_limit_info(self, redis_client, key: str, limit: int) -> Dict[str, Any]:
+        """Current usage of a sliding-log key without recording a request."""
+        now = time.time()
+        window = self.config.window_size
+        await redis_client.zremrangebyscore(key, "-inf", now - window)
+        count = await redis_client.zcard(key)
+        oldest = await redis_client.zrange(key, 0, 0, withscores=True)
+        if oldest:
+            reset = int(float(oldest[0][1]) + window)
+        else:
+            reset = int(now + window)
+        remaining = max(0, limit - count)
+        return {
+            "limit": limit,
+            "remaining": remaining,
+            "reset": reset,
+            "retry_after": max(1, reset - int(now)) if remaining == 0 else 0,
+        }
+
+
+def _user_attributes(user) -> Tuple[Optional[str], Optional[str]]:
+    """User id and user type of an authenticated user.
+
+    The auth middleware sets a ``UserContext``, whose tier is the user type;
+    plain dicts of JWT claims are accepted too.
+    """
+    if user is None:
+        return None, None
+    if isinstance(user, dict):
+        return user.get("user_id") or user.get("sub"), user.get("user_type") or user.get("tier")
+    return getattr(user, "user_id", None), getattr(user, "tier", None)
+
+
+def create_rate_limit_middleware(
+    config: Optional[RateLimitConfig] = None,
+    redis_client=None,
+    fallback_policy: str = "allow",
+) -> RateLimitMiddleware:
+    """Build the middleware for ``app.middleware("http")``."""
+    return RateLimitMiddleware(config=config, redis_client=redis_client, fallback_policy=fallback_policy)
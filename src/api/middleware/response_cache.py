@@ -0,0 +1,433 @@
+"""
+Tenant-aware HTTP response cache with ETag support.
+
+GET responses for routes with an explicit ``CachePolicy`` are cached under a
+key made of the tenant, the path and the normalized query string. Every
+cached response carries a strong ETag; a request whose ``If-None-Match``
+matches a cached entry gets a 304 without the handler running. Entries are
+tagged (tenant, route and policy tags) so writes can invalidate everything
+derived from the data they changed.
+
+The store is in-process by default; ``RedisResponseStore`` shares entries
+between instances.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachePolicy:
+    """Caching rules for requests under a path prefix."""
+
+    ttl: float
+    tags: Tuple[str, ...] = ()
+    vary_headers: Tuple[str, ...] = ()
+    ignore_params: Tuple[str, ...] = ()
+    max_body_bytes: int = 1024 * 1024
+
+
+@dataclass
+class CachedResponse:
+    """A stored response."""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: str
+    stored_at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "status": self.status,
+            "headers": self.headers,
+            "body": base64.b64encode(self.body).decode("ascii"),
+            "etag": self.etag,
+            "stored_at": self.stored_at,
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "CachedResponse":
+        data = json.loads(raw)
+        return cls(
+            status=data["status"],
+            headers=[tuple(h) for h in data["headers"]],
+            body=base64.b64decode(data["body"]),
+            etag=data["etag"],
+            stored_at=data["stored_at"],
+        )
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class InMemoryResponseStore:
+    """Bounded LRU response store with a tag index."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[CachedResponse, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+
+    def _remove(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[1] <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return item[0]
+
+    async def set(self, key: str, response: CachedResponse, ttl: float, tags: Iterable[str]) -> None:
+        self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (response, time.monotonic() + ttl, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        keys: Set[str] = set()
+        for tag in tags:
+            keys.update(self._tag_index.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tag_index.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisResponseStore:
+    """Response store shared through Redis.
+
+    Entries are JSON with a base64 body so the store works with clients
+    created with ``decode_responses=True``. Tags are Redis sets of keys with
+    a long expiry of their own.
+    """
+
+    def __init__(self, redis_client, prefix: str = "respcache", tag_ttl: int = 86400):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:entry:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self.redis.get(self._key(key))
+        return CachedResponse.from_json(raw) if raw else None
+
+    async def set(self, key: str, response: CachedResponse, ttl: float, tags: Iterable[str]) -> None:
+        ttl_ms = max(1, int(ttl * 1000))
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(key), response.to_json(), px=ttl_ms)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+            # Tag sets outlive their entries; stale members only cost memory
+            pipe.expire(self._tag_key(tag), self.tag_ttl)
+        await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        keys = await self.redis.sunion(tag_keys)
+        pipe = self.redis.pipeline()
+        if keys:
+            pipe.delete(*(self._key(k.decode() if isinstance(k, bytes) else k) for k in keys))
+        pipe.delete(*tag_keys)
+        await pipe.execute()
+        return len(keys)
+
+    async def clear(self) -> None:
+        async for key in self.redis.scan_iter(match=f"{self.prefix}:*"):
+            await self.redis.delete(key)
+
+
+class ResponseCache:
+    """Policy lookup, key building and invalidation over a store."""
+
+    def __init__(
+        self,
+        policies: Dict[str, CachePolicy],
+        store=None,
+        tenant_header: str = "x-tenant-id",
+    ):
+        # Longest prefix first so the most specific policy wins
+        self.policies = sorted(policies.items(), key=lambda item: len(item[0]), reverse=True)
+        self.store = store if store is not None else InMemoryResponseStore()
+        self.tenant_header = tenant_header.lower()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def policy_for(self, path: str) -> Tuple[Optional[str], Optional[CachePolicy]]:
+        for prefix, policy in self.policies:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return prefix, policy
+        return None, None
+
+    def identity_for(self, headers: Dict[str, str], state: Optional[dict]) -> Tuple[str, str]:
+        """Return the tenant and the scope cached entries are keyed under.
+
+        Entries are never shared between principals: a hit skips the handler
+        and with it any role or permission checks, so two users of one tenant
+        must not see each other's responses. With a tenant resolved by
+        authentication (``request.state.tenant_id``) the scope is that tenant
+        plus the authenticated user and permission mask. Otherwise the tenant
+        comes from the client-supplied header and the scope is tied to the
+        caller's credentials, so sending the header alone reads nothing.
+        """
+        trusted = state.get("tenant_id") if state else None
+        tenant = trusted or headers.get(self.tenant_header) or "-"
+        principal = _principal(state.get("user")) if trusted and state else None
+        if principal is None:
+            credential = headers.get("authorization") or headers.get("x-api-key") or ""
+            principal = hashlib.blake2b(credential.encode(), digest_size=8).hexdigest() if credential else "anon"
+        return tenant, f"{tenant}|{principal}"
+
+    @staticmethod
+    def normalize_query(query_string: str, ignore_params: Iterable[str] = ()) -> str:
+        ignored = set(ignore_params)
+        params = [(k, v) for k, v in parse_qsl(query_string, keep_blank_values=True) if k not in ignored]
+        return urlencode(sorted(params))
+
+    def build_key(
+        self,
+        scope_id: str,
+        path: str,
+        query_string: str,
+        policy: CachePolicy,
+        headers: Dict[str, str],
+    ) -> str:
+        parts = [scope_id, path, self.normalize_query(query_string, policy.ignore_params)]
+        parts.extend(f"{h}={headers.get(h.lower(), '')}" for h in policy.vary_headers)
+        return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=20).hexdigest()
+
+    def tags_for(self, tenant: str, prefix: str, policy: CachePolicy) -> Tuple[str, ...]:
+        return (f"tenant:{tenant}", f"route:{prefix}") + tuple(policy.tags)
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Drop every cached response carrying any of ``tags``."""
+        removed = await self.store.invalidate_tags(tags)
+        if removed:
+            logger.info(f"Invalidated {removed} cached responses for tags {list(tags)}")
+        return removed
+
+    async def invalidate_tenant(self, tenant: str) -> int:
+        return await self.invalidate_tags(f"tenant:{tenant}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified, "errors": self.errors}
+
+
+def _principal(user) -> Optional[str]:
+    """Authenticated user id and permission mask, so a role change gets fresh entries."""
+    if user is None:
+        return None
+    if isinstance(user, dict):
+        user_id, mask = user.get("user_id") or user.get("sub"), user.get("permission_mask")
+    else:
+        user_id, mask = getattr(user, "user_id", None), getattr(user, "permission_mask", None)
+    if user_id is None:
+        return None
+    return f"{user_id}:{mask:x}" if isinstance(mask, int) else str(user_id)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached responses and answering conditional GETs.
+
+    Add it inside the authentication middleware so cached responses are only
+    served to requests that passed authentication.
+    """
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        prefix, policy = self.cache.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", ())}
+        tenant, scope_id = self.cache.identity_for(headers, scope.get("state"))
+        key = self.cache.build_key(
+            scope_id, scope["path"], scope.get("query_string", b"").decode("latin-1"), policy, headers
+        )
+        if_none_match = headers.get("if-none-match")
+        bypass = "no-cache" in headers.get("cache-control", "")
+
+        if not bypass:
+            try:
+                cached = await self.cache.store.get(key)
+            except Exception as e:
+                # A store outage degrades to uncached responses, never to errors
+                self.cache.errors += 1
+                logger.warning(f"Failed to read cached response: {e}")
+                cached = None
+            if cached is not None:
+                if _etag_matches(if_none_match, cached.etag):
+                    self.cache.not_modified += 1
+                    await self._send_not_modified(send, cached.etag, policy)
+                else:
+                    self.cache.hits += 1
+                    await self._send_cached(send, cached, scope["method"] == "HEAD")
+                return
+
+        self.cache.misses += 1
+        await self._call_and_store(scope, receive, send, key, prefix, policy, tenant, if_none_match)
+
+    async def _send_not_modified(self, send, etag: str, policy: CachePolicy) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [
+                (b"etag", etag.encode("latin-1")),
+                (b"cache-control", f"private, max-age={int(policy.ttl)}".encode("latin-1")),
+                (b"x-cache", b"HIT"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send_cached(self, send, cached: CachedResponse, head: bool) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in cached.headers]
+        age = max(0, int(time.time() - cached.stored_at))
+        headers.append((b"age", str(age).encode("latin-1")))
+        headers.append((b"x-cache", b"HIT"))
+        await send({"type": "http.response.start", "status": cached.status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if head else cached.body})
+
+    async def _call_and_store(self, scope, receive, send, key, prefix, policy, tenant, if_none_match):
+        start_message = None
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > policy.max_body_bytes:
+                # Too large to cache: flush what we held back and stream the rest
+                passthrough = True
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": message.get("more_body", False)})
+                return
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            await self._finish(send, start_message, body, key, prefix, policy, tenant, if_none_match)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(self, send, start_message, body, key, prefix, policy, tenant, if_none_match):
+        status = start_message["status"]
+        raw_headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in start_message.get("headers", [])]
+        header_names = {k.lower() for k, _ in raw_headers}
+        cache_control = next((v for k, v in raw_headers if k.lower() == "cache-control"), "")
+        cacheable = (
+            status == 200
+            and "set-cookie" not in header_names
+            and "no-store" not in cache_control
+            and "private" not in cache_control
+        )
+        if not cacheable:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = compute_etag(body)
+        stored_headers = [(k, v) for k, v in raw_headers if k.lower() not in ("etag", "cache-control")]
+        stored_headers.append(("etag", etag))
+        stored_headers.append(("cache-control", f"private, max-age={int(policy.ttl)}"))
+        try:
+            await self.cache.store.set(
+                key,
+                CachedResponse(status=status, headers=stored_headers, body=body, etag=etag),
+                policy.ttl,
+                self.cache.tags_for(tenant, prefix, policy),
+            )
+        except Exception as e:
+            self.cache.errors += 1
+            logger.warning(f"Failed to store cached response: {e}")
+
+        if _etag_matches(if_none_match, etag):
+            self.cache.not_modified += 1
+            await self._send_not_modified(send, etag, policy)
+            return
+
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored_headers]
+        headers.append((b"x-cache", b"MISS"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def invalidate_response_cache(request, *tags: str) -> int:
+    """Invalidate cached responses by tag from inside a request handler."""
+    cache = getattr(request.app.state, "response_cache", None)
+    if cache is None:
+        return 0
+    try:
+        return await cache.invalidate_tags(*tags)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cached responses for tags {list(tags)}: {e}")
+        return 0
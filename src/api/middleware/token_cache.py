@@ -0,0 +1,223 @@
+"""
+Cache of verified bearer tokens for the JWT authentication middleware.
+
+A token that passed signature validation is stored under its SHA-256 digest
+together with its claims and the resolved user context, until the token's
+``exp``. Repeat requests with the same token then skip the signature check
+and the RBAC lookups entirely.
+
+Revocation is handled with a shared denylist version: revoking anything
+bumps a counter in Redis, every worker picks the new value up within
+``check_interval`` seconds, and entries cached under an older version are
+treated as misses and re-validated.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def unverified_expiry(token: str) -> Optional[float]:
+    """The ``exp`` claim of a JWT, read without checking the signature.
+
+    Only used for tokens that have already been validated.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+class DenylistVersion:
+    """Revocation counter shared by all workers through Redis."""
+
+    def __init__(self, key: str = "auth:denylist:version", check_interval: float = 1.0):
+        self.key = key
+        self.check_interval = check_interval
+        self.version = 0
+        self.redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def bump(self) -> int:
+        """Record a revocation; cached tokens from before it are re-validated."""
+        if self.redis is None:
+            self.version += 1
+        else:
+            self.version = max(self.version, int(await self.redis.incr(self.key)))
+        return self.version
+
+    async def refresh(self) -> bool:
+        if self.redis is None:
+            return False
+        version = int(await self.redis.get(self.key) or 0)
+        if version <= self.version:
+            return False
+        self.version = version
+        return True
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Denylist version check failed: {e}")
+
+    async def start(self, redis_client) -> None:
+        await self.stop()
+        self.redis = redis_client
+        await self.refresh()
+        self._task = asyncio.ensure_future(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class CachedToken:
+    __slots__ = ("expires_at", "version", "user_context", "claims")
+
+    def __init__(self, expires_at: float, version: int, user_context: Any, claims: Dict[str, Any]):
+        self.expires_at = expires_at
+        self.version = version
+        self.user_context = user_context
+        self.claims = claims
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of validated tokens keyed by token digest."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        denylist: Optional[DenylistVersion] = None,
+        max_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.denylist = denylist or DenylistVersion()
+        self.max_ttl = max_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, CachedToken]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.revoked = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[digest]
+            self.expired += 1
+            self.misses += 1
+            return None
+        if entry.version != self.denylist.version:
+            del self._entries[digest]
+            self.revoked += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        token: str,
+        user_context: Any,
+        claims: Optional[Dict[str, Any]] = None,
+        expires_at: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> bool:
+        """Cache a validated token; tokens without an expiry are not cached.
+
+        ``version`` is the denylist version read before validation started.
+        If a revocation bumped it since, the result may be stale and is not
+        cached.
+        """
+        if version is None:
+            version = self.denylist.version
+        elif version != self.denylist.version:
+            self.revoked += 1
+            return False
+        expires_at = expires_at if expires_at is not None else unverified_expiry(token)
+        if expires_at is None:
+            return False
+        now = self._clock()
+        if self.max_ttl is not None:
+            expires_at = min(expires_at, now + self.max_ttl)
+        if expires_at <= now:
+            return False
+        digest = token_digest(token)
+        self._entries[digest] = CachedToken(expires_at, version, user_context, claims or {})
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, token: str) -> None:
+        self._entries.pop(token_digest(token), None)
+
+    async def revoke(self, token: Optional[str] = None) -> int:
+        """Drop ``token`` here and make every worker re-validate what it cached."""
+        if token is not None:
+            self.invalidate(token)
+        return await self.denylist.bump()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "revoked": self.revoked,
+            "evictions": self.evictions,
+            "denylist_version": self.denylist.version,
+        }
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        lines: List[str] = [
+            "# HELP auth_token_cache_requests_total Verified-token cache lookups by result.",
+            "# TYPE auth_token_cache_requests_total counter",
+            f'auth_token_cache_requests_total{{result="hit"}} {stats["hits"]}',
+            f'auth_token_cache_requests_total{{result="miss"}} {stats["misses"]}',
+            "# HELP auth_token_cache_hit_ratio Share of lookups served from the cache.",
+            "# TYPE auth_token_cache_hit_ratio gauge",
+            f"auth_token_cache_hit_ratio {stats['hit_rate']:.6f}",
+            "# HELP auth_token_cache_entries Tokens currently cached.",
+            "# TYPE auth_token_cache_entries gauge",
+            f"auth_token_cache_entries {stats['size']}",
+            "# HELP auth_token_cache_evictions_total Entries dropped to stay within the size bound.",
+            "# TYPE auth_token_cache_evictions_total counter",
+            f"auth_token_cache_evictions_total {stats['evictions']}",
+        ]
+        return "\n".join(lines) + "\n"
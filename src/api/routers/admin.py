@@ -3,12 +3,34 @@ Admin Portal API Router
 Provides backend functionality for the admin portal including analytics, security, compliance, and billing management.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
+import os
 from pydantic import BaseModel
 
+from src.api.core.serialization import FastJSONResponse
+from src.api.middleware.response_cache import invalidate_response_cache
+from src.api.services.compliance_reports import compliance_report_handler
+from src.api.services.exports import (
+    BACKGROUND_RANGES,
+    CONTENT_TYPES,
+    ExportSource,
+    build_export_stream,
+    export_filename,
+    export_job_handler,
+    iter_file_range,
+    parse_range_header,
+    resolve_date_range,
+)
+from src.api.services.jobs import InMemoryJobStore, JobRunner, SQLiteJobStore
+from src.api.services.pagination import IndexedCollection, encode_cursor
+from src.api.services.system_settings import DEFAULT_SYSTEM_SETTINGS, system_settings
+from src.api.services.usage_rollups import SQLiteRollupStore, UsageRollupPipeline, UsageRollupStore
+
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 # Data Models
@@ -37,7 +59,7 @@ class SecurityEvent(BaseModel):
     details: str
 
 # Mock data for demonstration
-MOCK_ANALYTICS_DATA = {
+MOCK_ANALYTICS_DATA: Dict[str, Any] = {
     "api_usage": {
         "total_calls": 2400000,
         "monthly_growth": 22,
@@ -101,28 +123,302 @@ MOCK_SECURITY_EVENTS = [
     )
 ]
 
+MOCK_INVOICES = [
+    {
+        "id": 1,
+        "customer": "Acme Eyewear Co.",
+        "amount": 199.00,
+        "status": "Paid",
+        "date": "2025-01-15",
+        "invoice_number": "INV-2025-001"
+    },
+    {
+        "id": 2,
+        "customer": "Vision Plus Store",
+        "amount": 999.00,
+        "status": "Paid",
+        "date": "2025-01-20",
+        "invoice_number": "INV-2025-002"
+    },
+    {
+        "id": 3,
+        "customer": "Optical Boutique",
+        "amount": 49.00,
+        "status": "Pending",
+        "date": "2025-01-20",
+        "invoice_number": "INV-2025-003"
+    }
+]
+
+
+MOCK_CUSTOMERS = [
+    {
+        "id": 1,
+        "name": "Acme Eyewear Co.",
+        "email": "billing@acme-eyewear.com",
+        "plan": "Professional",
+        "status": "active",
+        "created_at": datetime(2024, 3, 4, 9, 30),
+    },
+    {
+        "id": 2,
+        "name": "Vision Plus Store",
+        "email": "ops@visionplus.com",
+        "plan": "Enterprise",
+        "status": "active",
+        "created_at": datetime(2024, 6, 18, 14, 5),
+    },
+    {
+        "id": 3,
+        "name": "Optical Boutique",
+        "email": "hello@opticalboutique.com",
+        "plan": "Starter",
+        "status": "trial",
+        "created_at": datetime(2025, 1, 9, 11, 45),
+    }
+]
+
+# Ordered by (timestamp, id) with secondary indexes for the list filters
+SECURITY_EVENT_INDEX = IndexedCollection(MOCK_SECURITY_EVENTS, indexes=("event_type", "status"))
+INVOICE_INDEX = IndexedCollection(MOCK_INVOICES, timestamp="date", indexes=("status",), descending=False)
+CUSTOMER_INDEX = IndexedCollection(MOCK_CUSTOMERS, timestamp="created_at", indexes=("status", "plan"))
+
+
+def _paginate(index: IndexedCollection, page: int, limit: int, cursor: Optional[str], filters=None, predicate=None):
+    """Keyset page when a cursor is given (empty for the first page), offset page otherwise."""
+    if cursor is not None:
+        try:
+            items, next_cursor = index.page_after(cursor or None, limit, filters, predicate)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return items, {"limit": limit, "next_cursor": next_cursor}
+
+    items, total = index.page_offset((page - 1) * limit, limit, filters, predicate)
+    pagination: Dict[str, Any] = {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "pages": (total + limit - 1) // limit,
+        # Lets offset clients switch to cursors from here on
+        "next_cursor": None,
+    }
+    if items and page * limit < total:
+        pagination["next_cursor"] = encode_cursor(index.key_of(items[-1]))
+    return items, pagination
+
+
+def _update_customer(customer_id: int, **fields) -> None:
+    customer = next((c for c in MOCK_CUSTOMERS if c["id"] == customer_id), None)
+    if customer is not None:
+        customer.update({k: v for k, v in fields.items() if v is not None})
+        CUSTOMER_INDEX.update(customer)
+
+
+@lru_cache(maxsize=1)
+def _mock_usage_records() -> List[Dict[str, Any]]:
+    """Daily usage_records rows for the last year, built on first use."""
+    latest = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    endpoints = [e["name"] for e in MOCK_ANALYTICS_DATA["api_usage"]["endpoints"]]
+    records = []
+    for day in range(365):
+        for n, endpoint in enumerate(endpoints):
+            recorded_at = latest - timedelta(days=day, hours=(day + n) % 9)
+            records.append({
+                "id": f"usage-{day:03d}-{n}",
+                "tenant_id": f"tenant-{n % 3 + 1}",
+                "feature": "api_call",
+                "endpoint": endpoint,
+                "quantity": 2000 + (day * 37 + n * 101) % 900,
+                "recorded_at": recorded_at,
+                "created_at": recorded_at + timedelta(minutes=1),
+            })
+    return records
+
+
+async def _fetch_usage_batch(after, before, limit):
+    records = sorted(
+        (r for r in _mock_usage_records() if r["created_at"] < before),
+        key=lambda r: (r["created_at"], r["id"]),
+    )
+    if after is not None:
+        records = [r for r in records if (r["created_at"], r["id"]) > after]
+    return records[:limit]
+
+
+def _rollup_store() -> UsageRollupStore:
+    path = os.getenv("USAGE_ROLLUP_DB")
+    return SQLiteRollupStore(path) if path else UsageRollupStore()
+
+
+usage_rollups = _rollup_store()
+usage_rollup_pipeline = UsageRollupPipeline(usage_rollups, _fetch_usage_batch)
+
+
+async def _collect_audit_events(framework: str):
+    events = MOCK_SECURITY_EVENTS
+    by_status: Dict[str, int] = {}
+    for event in events:
+        by_status[event.status] = by_status.get(event.status, 0) + 1
+    lines = [f"Security events reviewed: {len(events)}"]
+    lines += [f"{status}: {count}" for status, count in sorted(by_status.items())]
+    lines += [f"{e.timestamp:%Y-%m-%d %H:%M} {e.event_type} from {e.source_ip} ({e.status})" for e in events]
+    return "Audit Log", lines
+
+
+async def _collect_encryption_status(framework: str):
+    return "Encryption", [
+        "Data at rest: AES-256 (managed keys), all stores",
+        "Data in transit: TLS 1.2+ enforced on all endpoints",
+        "Key rotation: every 90 days, last rotated 2025-01-01",
+    ]
+
+
+async def _collect_access_records(framework: str):
+    customers = MOCK_CUSTOMERS
+    return "Access Control", [
+        f"Customer accounts: {len(customers)}",
+        *(f"{c['name']}: plan {c['plan']}, status {c['status']}" for c in customers),
+        "Admin access requires two-factor authentication",
+    ]
+
+
+def _job_store():
+    path = os.getenv("ADMIN_JOB_DB")
+    return SQLiteJobStore(path) if path else InMemoryJobStore()
+
+
+# Compliance reports and background exports share one job table and worker pool
+admin_jobs = JobRunner(
+    _job_store(),
+    concurrency=int(os.getenv("ADMIN_JOB_CONCURRENCY", "2")),
+    result_ttl=float(os.getenv("ADMIN_JOB_RESULT_TTL_SECONDS", "86400")),
+)
+admin_jobs.register(
+    "compliance_report",
+    compliance_report_handler([_collect_audit_events, _collect_encryption_status, _collect_access_records]),
+)
+
+
+async def warm_up(app):
+    """Start the rollup and job workers and bring usage rollups up to date.
+
+    Readiness waits for the catch-up, so the analytics overview is current
+    from the first request instead of after the first background run.
+    """
+    usage_rollup_pipeline.start(interval=float(os.getenv("USAGE_ROLLUP_INTERVAL_SECONDS", "30")))
+    await admin_jobs.start()
+    await usage_rollup_pipeline.catch_up()
+
+
+def _in_memory_source(name: str, fields: List[str], rows, timestamp_field: str) -> ExportSource:
+    """Export source over a mock collection, paged by (timestamp, id)."""
+    def matching(start: datetime, end: datetime):
+        return [r for r in rows() if start <= r[timestamp_field] < end]
+
+    async def fetch_page(start, end, after, limit):
+        page = sorted(matching(start, end), key=lambda r: (r[timestamp_field], r["id"]))
+        if after is not None:
+            page = [r for r in page if (r[timestamp_field], r["id"]) > after]
+        return page[:limit]
+
+    async def count(start, end):
+        return len(matching(start, end))
+
+    return ExportSource(name, fields, fetch_page, timestamp_field=timestamp_field, count=count)
+
+
+EXPORT_SOURCES = {
+    "analytics": _in_memory_source(
+        "analytics",
+        ["id", "tenant_id", "feature", "endpoint", "quantity", "recorded_at"],
+        _mock_usage_records,
+        "recorded_at",
+    ),
+    "security": _in_memory_source(
+        "security",
+        ["id", "timestamp", "event_type", "source_ip", "user_agent", "status", "details"],
+        lambda: [event.dict() for event in MOCK_SECURITY_EVENTS],
+        "timestamp",
+    ),
+    "billing": _in_memory_source(
+        "billing",
+        ["id", "invoice_number", "customer", "amount", "status", "issued_at"],
+        lambda: [{**inv, "issued_at": datetime.fromisoformat(str(inv["date"]))} for inv in MOCK_INVOICES],
+        "issued_at",
+    ),
+}
+
+admin_jobs.register("export", export_job_handler(EXPORT_SOURCES))
+
+
+async def _export(
+    request: Request,
+    source_name: str,
+    format: str,
+    date_range: str,
+    compress: bool,
+    background: Optional[bool],
+):
+    """Stream an export directly, or queue it as a background job for large ranges."""
+    source = EXPORT_SOURCES[source_name]
+    if background is None:
+        background = date_range in BACKGROUND_RANGES
+
+    if background:
+        job, _ = await admin_jobs.submit(
+            "export", {"source": source_name, "format": format, "date_range": date_range, "compress": compress}
+        )
+        base = request.url.path[: request.url.path.rindex("/admin/") + len("/admin")]
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "message": f"{source_name.capitalize()} export queued",
+                "job_id": job.id,
+                "status_url": f"{base}/exports/{job.id}",
+                "download_url": f"{base}/exports/{job.id}/download",
+            },
+        )
+
+    start, end = resolve_date_range(date_range)
+    filename = export_filename(source, format, date_range, compress)
+    return StreamingResponse(
+        build_export_stream(source, format, start, end, compress),
+        media_type="application/gzip" if compress else CONTENT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # Analytics Endpoints
 @router.get("/analytics/overview")
-async def get_analytics_overview():
+async def get_analytics_overview(
+    tenant_id: Optional[str] = None,
+    days: int = Query(30, ge=1, le=365)
+):
     """Get comprehensive analytics overview"""
+    # Served from the rollups as they stand; the warm-up hook keeps them current
+    watermark = usage_rollup_pipeline.watermark
     return {
         "success": True,
-        "data": MOCK_ANALYTICS_DATA,
+        "data": {
+            **MOCK_ANALYTICS_DATA,
+            "api_usage": {
+                **usage_rollups.overview(days=days, tenant_id=tenant_id),
+                "as_of": watermark[0].isoformat() if watermark else None,
+            },
+        },
         "timestamp": datetime.now().isoformat()
     }
 
 @router.get("/analytics/export")
 async def export_analytics(
-    format: str = Query("csv", regex="^(csv|pdf|json)$"),
-    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$")
+    request: Request,
+    format: str = Query("csv", regex="^(csv|ndjson|json)$"),
+    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$"),
+    compress: bool = False,
+    background: Optional[bool] = None
 ):
-    """Export analytics data in specified format"""
-    return {
-        "success": True,
-        "message": f"Analytics report exported successfully as {format.upper()}",
-        "download_url": f"/downloads/analytics-{date_range}-{datetime.now().strftime('%Y%m%d')}.{format}",
-        "expires_at": (datetime.now() + timedelta(hours=24)).isoformat()
-    }
+    """Export usage records in specified format"""
+    return await _export(request, "analytics", format, date_range, compress, background)
 
 # Security Endpoints
 @router.get("/security/overview")
@@ -148,28 +444,32 @@ async def get_security_overview():
 async def get_security_events(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    event_type: Optional[str] = None
+    event_type: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """Get paginated security events"""
-    events = MOCK_SECURITY_EVENTS
+    filters = {"status": status}
+    predicate = None
     if event_type:
-        events = [e for e in events if event_type.lower() in e.event_type.lower()]
-    
-    start = (page - 1) * limit
-    end = start + limit
+        if event_type.lower() in SECURITY_EVENT_INDEX.values("event_type"):
+            filters["event_type"] = event_type
+        else:
+            # Partial names still match, without the index
+            needle = event_type.lower()
+
+            def predicate(event):
+                return needle in event.event_type.lower()
+
+    events, pagination = _paginate(SECURITY_EVENT_INDEX, page, limit, cursor, filters, predicate)
     
-    return {
+    return FastJSONResponse({
         "success": True,
         "data": {
-            "events": [e.dict() for e in events[start:end]],
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": len(events),
-                "pages": (len(events) + limit - 1) // limit
-            }
+            "events": events,
+            "pagination": pagination
         }
-    }
+    })
 
 @router.get("/security/events/{event_id}")
 async def get_security_event_details(event_id: int):
@@ -231,16 +531,14 @@ async def escalate_security_event(event_id: int):
 
 @router.get("/security/export")
 async def export_security_report(
-    format: str = Query("pdf", regex="^(csv|pdf|json)$"),
-    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$")
+    request: Request,
+    format: str = Query("csv", regex="^(csv|ndjson|json)$"),
+    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$"),
+    compress: bool = False,
+    background: Optional[bool] = None
 ):
-    """Export security report"""
-    return {
-        "success": True,
-        "message": f"Security report exported successfully as {format.upper()}",
-        "download_url": f"/downloads/security-{date_range}-{datetime.now().strftime('%Y%m%d')}.{format}",
-        "expires_at": (datetime.now() + timedelta(hours=24)).isoformat()
-    }
+    """Export security events"""
+    return await _export(request, "security", format, date_range, compress, background)
 
 # Compliance Endpoints
 @router.get("/compliance/overview")
@@ -274,27 +572,52 @@ async def get_compliance_overview():
 
 @router.post("/compliance/generate-report")
 async def generate_compliance_report(
+    request: Request,
     report_type: str = Query(..., regex="^(soc2|hipaa|gdpr|all)$"),
     format: str = Query("pdf", regex="^(pdf|docx)$")
 ):
-    """Generate compliance report"""
-    return {
-        "success": True,
-        "message": f"{report_type.upper()} compliance report generated successfully",
-        "report_id": f"RPT-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "download_url": f"/downloads/compliance-{report_type}-{datetime.now().strftime('%Y%m%d')}.{format}",
-        "expires_at": (datetime.now() + timedelta(hours=48)).isoformat()
-    }
+    """Queue compliance report generation"""
+    job, created = await admin_jobs.submit("compliance_report", {"report_type": report_type, "format": format})
+    base = request.url.path[: request.url.path.rindex("/compliance/")]
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "message": (
+                f"{report_type.upper()} compliance report queued"
+                if created else f"{report_type.upper()} compliance report already in progress"
+            ),
+            "report_id": job.id,
+            "status": job.status,
+            "status_url": f"{base}/compliance/reports/{job.id}",
+            "download_url": f"{base}/compliance/download/{job.id}",
+        },
+    )
+
+@router.get("/compliance/reports/{report_id}")
+async def get_compliance_report_status(report_id: str):
+    """Get compliance report progress"""
+    job = await admin_jobs.store.get(report_id)
+    if job is None or job.kind != "compliance_report":
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"success": True, "data": job.to_dict()}
 
 @router.get("/compliance/download/{report_id}")
 async def download_compliance_report(report_id: str):
     """Download compliance report"""
-    return {
-        "success": True,
-        "message": f"Report {report_id} download initiated",
-        "download_url": f"/downloads/{report_id}.pdf",
-        "file_size": "2.4 MB"
-    }
+    job = await admin_jobs.store.get(report_id)
+    if job is None or job.kind != "compliance_report":
+        raise HTTPException(status_code=404, detail="Report not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
+    data = await admin_jobs.store.load_result(report_id)
+    if data is None:
+        raise HTTPException(status_code=410, detail="Report is no longer available")
+    return Response(
+        content=data,
+        media_type=job.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{job.filename}"'},
+    )
 
 # Billing Endpoints
 @router.get("/billing/overview")
@@ -321,52 +644,17 @@ async def get_billing_overview():
 async def get_billing_invoices(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """Get paginated billing invoices"""
-    mock_invoices = [
-        {
-            "id": 1,
-            "customer": "Acme Eyewear Co.",
-            "amount": 199.00,
-            "status": "Paid",
-            "date": "2025-01-15",
-            "invoice_number": "INV-2025-001"
-        },
-        {
-            "id": 2,
-            "customer": "Vision Plus Store",
-            "amount": 999.00,
-            "status": "Paid",
-            "date": "2025-01-20",
-            "invoice_number": "INV-2025-002"
-        },
-        {
-            "id": 3,
-            "customer": "Optical Boutique",
-            "amount": 49.00,
-            "status": "Pending",
-            "date": "2025-01-20",
-            "invoice_number": "INV-2025-003"
-        }
-    ]
-    
-    if status:
-        mock_invoices = [inv for inv in mock_invoices if inv["status"].lower() == status.lower()]
-    
-    start = (page - 1) * limit
-    end = start + limit
+    invoices, pagination = _paginate(INVOICE_INDEX, page, limit, cursor, {"status": status})
     
     return {
         "success": True,
         "data": {
-            "invoices": mock_invoices[start:end],
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": len(mock_invoices),
-                "pages": (len(mock_invoices) + limit - 1) // limit
-            }
+            "invoices": invoices,
+            "pagination": pagination
         }
     }
 
@@ -394,57 +682,101 @@ async def get_invoice_details(invoice_id: int):
 
 @router.get("/billing/export")
 async def export_billing_report(
-    format: str = Query("csv", regex="^(csv|pdf|excel)$"),
-    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$")
+    request: Request,
+    format: str = Query("csv", regex="^(csv|ndjson|json)$"),
+    date_range: str = Query("30d", regex="^(7d|30d|90d|1y)$"),
+    compress: bool = False,
+    background: Optional[bool] = None
 ):
-    """Export billing report"""
-    return {
-        "success": True,
-        "message": f"Billing report exported successfully as {format.upper()}",
-        "download_url": f"/downloads/billing-{date_range}-{datetime.now().strftime('%Y%m%d')}.{format}",
-        "expires_at": (datetime.now() + timedelta(hours=24)).isoformat()
+    """Export invoices"""
+    return await _export(request, "billing", format, date_range, compress, background)
+
+# Export Job Endpoints
+@router.get("/exports/{job_id}")
+async def get_export_job(job_id: str):
+    """Get background export progress"""
+    job = await admin_jobs.store.get(job_id)
+    if job is None or job.kind != "export":
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return {"success": True, "data": job.to_dict()}
+
+@router.get("/exports/{job_id}/download")
+async def download_export(job_id: str, request: Request):
+    """Download a finished export; supports byte ranges for resuming"""
+    job = await admin_jobs.store.get(job_id)
+    if job is None or job.kind != "export":
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    if not job.result_path or not os.path.exists(job.result_path):
+        raise HTTPException(status_code=410, detail="Export is no longer available")
+
+    size = job.result_size or 0
+    etag = f'"{job.id}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{job.filename}"',
     }
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        iter_file_range(job.result_path, start, end),
+        status_code=status_code,
+        media_type=job.content_type,
+        headers=headers,
+    )
 
 # Settings Endpoints
 @router.get("/settings/system")
 async def get_system_settings():
     """Get current system settings"""
+    current = system_settings.current
     return {
         "success": True,
-        "data": {
-            "maintenance_mode": False,
-            "auto_scaling": True,
-            "debug_logging": False,
-            "two_factor_auth": True,
-            "ip_whitelisting": True,
-            "session_timeout": True
-        }
+        "data": current.as_dict(),
+        "version": current.version
     }
 
 @router.put("/settings/system")
 async def update_system_settings(settings: SystemSettings):
     """Update system settings"""
+    current = await system_settings.update(settings.dict())
     return {
         "success": True,
         "message": "System settings updated successfully",
-        "data": settings.dict()
+        "data": current.as_dict(),
+        "version": current.version
     }
 
 @router.put("/settings/toggle/{setting_name}")
 async def toggle_system_setting(setting_name: str, enabled: bool):
     """Toggle a specific system setting"""
-    valid_settings = [
-        "maintenance_mode", "auto_scaling", "debug_logging",
-        "two_factor_auth", "ip_whitelisting", "session_timeout"
-    ]
-    
-    if setting_name not in valid_settings:
+    if setting_name not in DEFAULT_SYSTEM_SETTINGS:
         raise HTTPException(status_code=400, detail="Invalid setting name")
     
+    current = await system_settings.update({setting_name: enabled})
     return {
         "success": True,
         "message": f"{setting_name.replace('_', ' ').title()} {'enabled' if enabled else 'disabled'} successfully",
-        "data": {setting_name: enabled}
+        "data": {setting_name: enabled},
+        "version": current.version
     }
 
 # Customer Management Endpoints (Enhanced)
@@ -454,26 +786,35 @@ async def get_customers(
     limit: int = Query(10, ge=1, le=100),
     search: Optional[str] = None,
     status: Optional[str] = None,
-    plan: Optional[str] = None
+    plan: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """Get paginated customers with filtering"""
-    # This would typically query a database
+    predicate = None
+    if search:
+        needle = search.lower()
+
+        def predicate(customer):
+            return needle in customer["name"].lower() or needle in customer["email"].lower()
+
+    customers, pagination = _paginate(
+        CUSTOMER_INDEX, page, limit, cursor, {"status": status, "plan": plan}, predicate
+    )
     return {
         "success": True,
         "data": {
-            "customers": [],  # Would be populated from database
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": 1247,
-                "pages": 125
-            }
+            "customers": customers,
+            "pagination": pagination
         }
     }
 
 @router.put("/customers/{customer_id}")
-async def update_customer(customer_id: int, customer_data: CustomerUpdate):
+async def update_customer(customer_id: int, customer_data: CustomerUpdate, request: Request):
     """Update customer information"""
+    _update_customer(customer_id, **customer_data.dict(exclude_none=True))
+    # Plan and status changes feed the billing views. Those are cross-customer
+    # admin views tagged "billing" by their cache policy; there is no per-customer tag
+    await invalidate_response_cache(request, "billing")
     return {
         "success": True,
         "message": f"Customer {customer_id} updated successfully",
@@ -481,8 +822,10 @@ async def update_customer(customer_id: int, customer_data: CustomerUpdate):
     }
 
 @router.post("/customers/{customer_id}/suspend")
-async def suspend_customer(customer_id: int):
+async def suspend_customer(customer_id: int, request: Request):
     """Suspend a customer account"""
+    _update_customer(customer_id, status="suspended")
+    await invalidate_response_cache(request, "billing")
     return {
         "success": True,
         "message": f"Customer {customer_id} has been suspended",
@@ -490,8 +833,10 @@ async def suspend_customer(customer_id: int):
     }
 
 @router.post("/customers/{customer_id}/activate")
-async def activate_customer(customer_id: int):
+async def activate_customer(customer_id: int, request: Request):
     """Activate a customer account"""
+    _update_customer(customer_id, status="active")
+    await invalidate_response_cache(request, "billing")
     return {
         "success": True,
         "message": f"Customer {customer_id} has been activated",
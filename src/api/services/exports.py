@@ -0,0 +1,276 @@
+"""
+Streaming export engine for the admin portal.
+
+Rows are pulled from a source one keyset page at a time and pushed through a
+generator pipeline (encode -> optional gzip) so memory stays constant no
+matter how large the date range is. Small exports stream straight into the
+response. Large ones run as ``export`` jobs on the shared job runner and
+write to a file in ``EXPORT_DIR``; clients poll the job for progress and
+download the finished file with HTTP range requests, so interrupted
+downloads can resume.
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from src.api.core.serialization import dumps, iter_json_array
+from src.api.services.jobs import JobContext, JobResult, remove_file
+
+logger = logging.getLogger(__name__)
+
+DATE_RANGES = {
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "90d": timedelta(days=90),
+    "1y": timedelta(days=365),
+}
+
+# Date ranges that always run as background jobs
+BACKGROUND_RANGES = {"1y"}
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+CHUNK_BYTES = 64 * 1024
+
+# fetch_page(start, end, after, limit) -> rows ordered by (timestamp, id),
+# strictly after the ``after`` key when one is given
+FetchPage = Callable[[datetime, datetime, Optional[Tuple[Any, Any]], int], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclass
+class ExportSource:
+    """A keyset-paginated row source."""
+
+    name: str
+    fields: List[str]
+    fetch_page: FetchPage
+    timestamp_field: str = "timestamp"
+    id_field: str = "id"
+    count: Optional[Callable[[datetime, datetime], Awaitable[int]]] = None
+    page_size: int = 1000
+
+    async def iter_rows(self, start: datetime, end: datetime) -> AsyncIterator[Dict[str, Any]]:
+        after = None
+        while True:
+            page = await self.fetch_page(start, end, after, self.page_size)
+            for row in page:
+                yield row
+            if len(page) < self.page_size:
+                return
+            last = page[-1]
+            after = (last[self.timestamp_field], last[self.id_field])
+
+
+def resolve_date_range(date_range: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    end = now or datetime.now()
+    return end - DATE_RANGES[date_range], end
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def encode_csv(rows: AsyncIterator[Dict[str, Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for row in rows:
+        writer.writerow([_csv_value(row.get(f)) for f in fields])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(rows: AsyncIterator[Dict[str, Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    async for row in rows:
+        chunk += dumps({f: row.get(f) for f in fields})
+        chunk += b"\n"
+        if len(chunk) >= CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+async def encode_json(rows: AsyncIterator[Dict[str, Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    async def projected():
+        async for row in rows:
+            yield {f: row.get(f) for f in fields}
+
+    async for chunk in iter_json_array(projected()):
+        yield chunk
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "json": encode_json,
+}
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def _count_rows(rows: AsyncIterator[Dict[str, Any]], progress: Callable[[int], None]):
+    written = 0
+    async for row in rows:
+        yield row
+        written += 1
+        if written % 1000 == 0:
+            progress(written)
+    progress(written)
+
+
+def build_export_stream(
+    source: ExportSource,
+    fmt: str,
+    start: datetime,
+    end: datetime,
+    compress: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    """Compose the source -> encoder -> (gzip) pipeline."""
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    rows = source.iter_rows(start, end)
+    if progress is not None:
+        rows = _count_rows(rows, progress)
+    stream = ENCODERS[fmt](rows, source.fields)
+    return gzip_chunks(stream) if compress else stream
+
+
+def export_filename(source: ExportSource, fmt: str, date_range: str, compress: bool) -> str:
+    name = f"{source.name}-{date_range}-{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    return name + ".gz" if compress else name
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive offsets.
+
+    Returns None when no range was requested and raises ValueError when the
+    range cannot be satisfied.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError("Only single byte ranges are supported")
+    first, _, last = spec.strip().partition("-")
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        raise ValueError("Invalid range")
+    if first == "":
+        if not last:
+            raise ValueError("Invalid range")
+        length = int(last)
+        if length <= 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield ``path`` from ``start`` to ``end`` inclusive.
+
+    A plain generator on purpose: ``StreamingResponse`` iterates sync
+    iterators in the threadpool, so the reads never block the event loop.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def export_directory() -> str:
+    return os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "admin-exports"))
+
+
+def export_job_handler(
+    sources: Dict[str, ExportSource],
+    directory: Optional[str] = None,
+    clock: Callable[[], datetime] = datetime.now,
+):
+    """Job handler writing an export to ``directory``.
+
+    The file is named after the job, so any process sharing the job store
+    and the directory can serve the download.
+    """
+    async def handler(params: Dict[str, Any], ctx: JobContext) -> JobResult:
+        source = sources[params["source"]]
+        fmt, date_range, compress = params["format"], params["date_range"], params["compress"]
+        start, end = resolve_date_range(date_range, clock())
+        target = directory or export_directory()
+        await run_in_threadpool(os.makedirs, target, exist_ok=True)
+        filename = export_filename(source, fmt, date_range, compress)
+        path = os.path.join(target, f"{ctx.job.id}-{filename}")
+
+        started = time.perf_counter()
+        total = await source.count(start, end) if source.count is not None else None
+        written = {"rows": 0, "reported": 0}
+
+        def progress(rows: int) -> None:
+            written["rows"] = rows
+
+        try:
+            stream = build_export_stream(source, fmt, start, end, compress, progress)
+            f = await run_in_threadpool(open, path, "wb")
+            try:
+                async for chunk in stream:
+                    await run_in_threadpool(f.write, chunk)
+                    rows = written["rows"]
+                    if total and rows != written["reported"]:
+                        written["reported"] = rows
+                        await ctx.report(min(99.0, rows * 100 / total), f"{rows} of {total} rows written")
+            finally:
+                await run_in_threadpool(f.close)
+        except BaseException:
+            remove_file(path)
+            raise
+        size = await run_in_threadpool(os.path.getsize, path)
+        logger.info(
+            f"Export {ctx.job.id} ({source.name}, {date_range}) wrote {written['rows']} rows, "
+            f"{size} bytes in {time.perf_counter() - started:.1f}s"
+        )
+        await ctx.report(99.0, f"{written['rows']} rows written")
+        return JobResult(
+            data=b"",
+            content_type="application/gzip" if compress else CONTENT_TYPES[fmt],
+            filename=filename,
+            path=path,
+        )
+    return handler
@@ -0,0 +1,596 @@
+"""
+In-process background job runner.
+
+Jobs are rows in a job table (SQLite, or in memory for tests and local
+runs) so their status survives restarts. A fixed number of worker tasks
+claim queued jobs under a lease that the running worker keeps renewing;
+a job whose lease ran out belonged to a process that died and is queued
+again, so several processes can share one SQLite file. Every write a
+runner makes to a job it claimed is conditional on still holding it, so a
+runner that lost its lease stops its handler and its late writes are
+discarded instead of overwriting the new owner's. Handlers report
+progress as they go, and results are kept for download until they pass
+the runner's result TTL. Small results are stored as bytes; handlers that
+produce large files write them to shared storage and return the path.
+
+Submitting a job with the same kind and parameters as one that is still
+queued or running returns the existing job instead of creating a new one.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED)
+
+
+@dataclass
+class Job:
+    """One row of the job table."""
+
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    dedupe_key: str
+    status: str = STATUS_QUEUED
+    progress: float = 0.0
+    message: Optional[str] = None
+    error: Optional[str] = None
+    content_type: Optional[str] = None
+    filename: Optional[str] = None
+    result_size: Optional[int] = None
+    # Set when the result is a file on disk rather than bytes in the store
+    result_path: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Runner holding a running job, and until when its claim is valid
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": round(self.progress, 1),
+            "message": self.message,
+            "error": self.error,
+            "filename": self.filename,
+            "result_size": self.result_size,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+@dataclass
+class JobResult:
+    """What a handler returns: the file to store for download.
+
+    With ``path`` the handler already wrote the file and ``data`` is unused.
+    """
+
+    data: bytes
+    content_type: str
+    filename: str
+    path: Optional[str] = None
+
+
+class LeaseLost(RuntimeError):
+    """Raised when a runner writes to a job another runner has taken over."""
+
+
+class JobContext:
+    """Handed to handlers so they can report progress."""
+
+    def __init__(self, runner: "JobRunner", job: Job):
+        self._runner = runner
+        self.job = job
+
+    async def report(self, progress: float, message: Optional[str] = None) -> None:
+        self.job.progress = max(0.0, min(100.0, progress))
+        self.job.message = message
+        if not await self._runner.store.update(self.job, owner=self._runner.owner):
+            raise LeaseLost(f"Job {self.job.id} is held by another runner")
+
+
+Handler = Callable[[Dict[str, Any], JobContext], Awaitable[JobResult]]
+
+
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove job file {path}: {e}")
+
+
+def dedupe_key_for(kind: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{kind}:{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"
+
+
+class InMemoryJobStore:
+    """Job table and result store held in process memory."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._results: Dict[str, bytes] = {}
+        self._lock = asyncio.Lock()
+
+    async def create_or_get_active(self, job: Job) -> Tuple[Job, bool]:
+        async with self._lock:
+            for existing in self._jobs.values():
+                if existing.dedupe_key == job.dedupe_key and existing.status in ACTIVE_STATUSES:
+                    return existing, False
+            self._jobs[job.id] = job
+            return job, True
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _held_by(self, job_id: str, owner: Optional[str]) -> bool:
+        current = self._jobs.get(job_id)
+        return current is not None and (owner is None or current.owner == owner)
+
+    async def update(self, job: Job, owner: Optional[str] = None) -> bool:
+        """Write ``job``; with ``owner``, only while that runner still holds it."""
+        if not self._held_by(job.id, owner):
+            return False
+        # Runners work on their own copy, as they would with a database
+        self._jobs[job.id] = dataclasses.replace(job)
+        return True
+
+    async def claim_next(self, owner: Optional[str] = None, lease_until: Optional[datetime] = None) -> Optional[Job]:
+        async with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == STATUS_QUEUED]
+            if not queued:
+                return None
+            job = min(queued, key=lambda j: j.created_at)
+            job.status = STATUS_RUNNING
+            job.started_at = datetime.now()
+            job.owner = owner
+            job.lease_expires_at = lease_until
+            return dataclasses.replace(job)
+
+    async def renew_lease(self, job_id: str, owner: str, lease_until: datetime) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != STATUS_RUNNING or job.owner != owner:
+            return False
+        job.lease_expires_at = lease_until
+        return True
+
+    async def requeue_expired(self, now: datetime) -> int:
+        count = 0
+        for job in self._jobs.values():
+            if job.status == STATUS_RUNNING and (job.lease_expires_at is None or job.lease_expires_at < now):
+                job.status = STATUS_QUEUED
+                job.owner = job.lease_expires_at = None
+                count += 1
+        return count
+
+    async def purge_finished(self, before: datetime) -> List[Job]:
+        expired = [
+            job for job in self._jobs.values()
+            if job.status in FINISHED_STATUSES and job.finished_at is not None and job.finished_at < before
+        ]
+        for job in expired:
+            del self._jobs[job.id]
+            self._results.pop(job.id, None)
+        return expired
+
+    async def list(self, kind: Optional[str] = None, limit: int = 50) -> List[Job]:
+        jobs = [j for j in self._jobs.values() if kind is None or j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)[:limit]
+
+    async def save_result(self, job_id: str, data: bytes, owner: Optional[str] = None) -> bool:
+        if not self._held_by(job_id, owner):
+            return False
+        self._results[job_id] = data
+        return True
+
+    async def load_result(self, job_id: str) -> Optional[bytes]:
+        return self._results.get(job_id)
+
+
+class SQLiteJobStore:
+    """Job table and result store in a SQLite file.
+
+    Calls run in the default executor. A partial unique index on the dedupe
+    key over active jobs makes deduplication atomic across processes
+    sharing the file.
+    """
+
+    _COLUMNS = (
+        "id", "kind", "params", "dedupe_key", "status", "progress", "message", "error",
+        "content_type", "filename", "result_size", "result_path", "created_at", "started_at", "finished_at",
+        "owner", "lease_expires_at",
+    )
+    _TIMESTAMPS = ("created_at", "started_at", "finished_at", "lease_expires_at")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                dedupe_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                content_type TEXT,
+                filename TEXT,
+                result_size INTEGER,
+                result_path TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                owner TEXT,
+                lease_expires_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_active_dedupe
+                ON jobs (dedupe_key) WHERE status IN ('queued', 'running');
+            CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT PRIMARY KEY REFERENCES jobs (id) ON DELETE CASCADE,
+                data BLOB NOT NULL
+            );
+            """
+        )
+        # Files created before these columns existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name in ("result_path", "owner", "lease_expires_at"):
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} TEXT")
+
+    async def _call(self, func, *args):
+        def locked():
+            with self._lock:
+                return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, locked)
+
+    def _to_row(self, job: Job) -> Tuple:
+        return (
+            job.id, job.kind, json.dumps(job.params, default=str), job.dedupe_key, job.status,
+            job.progress, job.message, job.error, job.content_type, job.filename, job.result_size, job.result_path,
+            job.created_at.isoformat(),
+            job.started_at.isoformat() if job.started_at else None,
+            job.finished_at.isoformat() if job.finished_at else None,
+            job.owner,
+            job.lease_expires_at.isoformat() if job.lease_expires_at else None,
+        )
+
+    def _from_row(self, row: Tuple) -> Job:
+        values = dict(zip(self._COLUMNS, row))
+        values["params"] = json.loads(values["params"])
+        for name in self._TIMESTAMPS:
+            if values[name]:
+                values[name] = datetime.fromisoformat(values[name])
+        return Job(**values)
+
+    def _select(self, where: str, args: Tuple = ()) -> List[Job]:
+        rows = self._conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs {where}", args).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    async def create_or_get_active(self, job: Job) -> Tuple[Job, bool]:
+        def insert():
+            try:
+                placeholders = ", ".join("?" * len(self._COLUMNS))
+                self._conn.execute(
+                    f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({placeholders})", self._to_row(job)
+                )
+                return job, True
+            except sqlite3.IntegrityError:
+                existing = self._select(
+                    "WHERE dedupe_key = ? AND status IN ('queued', 'running')", (job.dedupe_key,)
+                )
+                if not existing:
+                    raise
+                return existing[0], False
+        return await self._call(insert)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        jobs = await self._call(self._select, "WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    async def update(self, job: Job, owner: Optional[str] = None) -> bool:
+        """Write ``job``; with ``owner``, only while that runner still holds it."""
+        assignments = ", ".join(f"{name} = ?" for name in self._COLUMNS[1:])
+        row = self._to_row(job)
+        sql, args = f"UPDATE jobs SET {assignments} WHERE id = ?", row[1:] + row[:1]
+        if owner is not None:
+            sql, args = sql + " AND owner = ?", args + (owner,)
+        cursor = await self._call(self._conn.execute, sql, args)
+        return cursor.rowcount == 1
+
+    async def claim_next(self, owner: Optional[str] = None, lease_until: Optional[datetime] = None) -> Optional[Job]:
+        def claim():
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                jobs = self._select("WHERE status = 'queued' ORDER BY created_at LIMIT 1")
+                if not jobs:
+                    return None
+                job = jobs[0]
+                job.status = STATUS_RUNNING
+                job.started_at = datetime.now()
+                job.owner = owner
+                job.lease_expires_at = lease_until
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_expires_at = ? WHERE id = ?",
+                    (job.status, job.started_at.isoformat(), owner,
+                     lease_until.isoformat() if lease_until else None, job.id),
+                )
+                return job
+            finally:
+                self._conn.execute("COMMIT")
+        return await self._call(claim)
+
+    async def renew_lease(self, job_id: str, owner: str, lease_until: datetime) -> bool:
+        cursor = await self._call(
+            self._conn.execute,
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (lease_until.isoformat(), job_id, owner),
+        )
+        return cursor.rowcount == 1
+
+    async def requeue_expired(self, now: datetime) -> int:
+        cursor = await self._call(
+            self._conn.execute,
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL "
+            "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+            (now.isoformat(),),
+        )
+        return cursor.rowcount
+
+    async def purge_finished(self, before: datetime) -> List[Job]:
+        def purge():
+            where = "WHERE status IN ('completed', 'failed') AND finished_at < ?"
+            args = (before.isoformat(),)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._select(where, args)
+                self._conn.execute(f"DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs {where})", args)
+                self._conn.execute(f"DELETE FROM jobs {where}", args)
+            finally:
+                self._conn.execute("COMMIT")
+            return expired
+        return await self._call(purge)
+
+    async def list(self, kind: Optional[str] = None, limit: int = 50) -> List[Job]:
+        if kind is None:
+            return await self._call(self._select, "ORDER BY created_at DESC LIMIT ?", (limit,))
+        return await self._call(self._select, "WHERE kind = ? ORDER BY created_at DESC LIMIT ?", (kind, limit))
+
+    async def save_result(self, job_id: str, data: bytes, owner: Optional[str] = None) -> bool:
+        if owner is None:
+            sql, args = "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ?)", (job_id, data, job_id)
+        else:
+            sql = "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND owner = ?)"
+            args = (job_id, data, job_id, owner)
+        cursor = await self._call(
+            self._conn.execute, f"INSERT OR REPLACE INTO job_results (job_id, data) {sql}", args
+        )
+        return cursor.rowcount == 1
+
+    async def load_result(self, job_id: str) -> Optional[bytes]:
+        def load():
+            row = self._conn.execute("SELECT data FROM job_results WHERE job_id = ?", (job_id,)).fetchone()
+            return bytes(row[0]) if row else None
+        return await self._call(load)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class JobRunner:
+    """Runs queued jobs on a fixed pool of worker tasks.
+
+    A claimed job is leased for ``lease_seconds`` and the lease is renewed
+    while the handler runs. With ``recover_interrupted`` the runner
+    re-queues running jobs whose lease expired, on start and then
+    periodically, and finished jobs are deleted with their results
+    ``result_ttl`` seconds after they finish (``None`` keeps them).
+    """
+
+    def __init__(
+        self,
+        store,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        recover_interrupted: bool = True,
+        lease_seconds: float = 60.0,
+        result_ttl: Optional[float] = 7 * 86400,
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.recover_interrupted = recover_interrupted
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Handler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._next_maintenance = 0.0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def handler(self, kind: str):
+        """Decorator form of :meth:`register`."""
+        def decorator(func: Handler) -> Handler:
+            self.register(kind, func)
+            return func
+        return decorator
+
+    @property
+    def running(self) -> bool:
+        return any(not w.done() for w in self._workers)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.maintain()
+        self._next_maintenance = time.monotonic() + self.lease_seconds / 2
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._workers = [asyncio.ensure_future(self._worker(n)) for n in range(self.concurrency)]
+        logger.info(f"Job runner started with {self.concurrency} workers")
+
+    async def maintain(self) -> None:
+        """Re-queue jobs whose lease ran out and drop results past their TTL."""
+        now = datetime.now()
+        if self.recover_interrupted:
+            requeued = await self.store.requeue_expired(now)
+            if requeued:
+                logger.warning(f"Re-queued {requeued} jobs whose worker stopped renewing its lease")
+        if self.result_ttl is not None:
+            purged = await self.store.purge_finished(now - timedelta(seconds=self.result_ttl))
+            for job in purged:
+                if job.result_path:
+                    remove_file(job.result_path)
+            if purged:
+                logger.info(f"Deleted {len(purged)} finished jobs older than {self.result_ttl:.0f}s")
+
+    async def stop(self) -> None:
+        # wait_for() can swallow a cancel that races the wake-up, so workers
+        # also check this flag
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Tuple[Job, bool]:
+        """Queue a job; returns ``(job, created)``, reusing an identical active job."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params, dedupe_key=dedupe_key_for(kind, params))
+        job, created = await self.store.create_or_get_active(job)
+        if not self.running:
+            await self.start()
+        if created:
+            self._wakeup.set()
+        return job, created
+
+    async def wait(self, job_id: str, timeout: float = 10.0) -> Job:
+        """Poll until a job finishes; mainly for tests and scripts."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.store.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return job
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError(f"Job {job_id} still {job.status}")
+            await asyncio.sleep(0.01)
+
+    async def _worker(self, number: int) -> None:
+        while not self._stopping:
+            try:
+                if time.monotonic() >= self._next_maintenance:
+                    self._next_maintenance = time.monotonic() + self.lease_seconds / 2
+                    await self.maintain()
+                job = await self.store.claim_next(self.owner, self._lease_deadline())
+            except Exception as e:
+                logger.error(f"Job worker {number} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    def _lease_deadline(self) -> datetime:
+        return datetime.now() + timedelta(seconds=self.lease_seconds)
+
+    async def _heartbeat(self, job: Job, work: asyncio.Future) -> bool:
+        """Renew the lease while ``work`` runs; cancels it and returns True once the lease is lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            job.lease_expires_at = self._lease_deadline()
+            try:
+                renewed = await self.store.renew_lease(job.id, self.owner, job.lease_expires_at)
+            except Exception as e:
+                logger.error(f"Failed to renew lease for job {job.id}: {e}")
+                continue
+            if not renewed:
+                work.cancel()
+                return True
+
+    async def _run_handler(self, handler: Optional[Handler], job: Job) -> JobResult:
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job kind '{job.kind}'")
+        return await handler(job.params, JobContext(self, job))
+
+    async def _execute(self, job: Job) -> None:
+        handler = self._handlers.get(job.kind)
+        start = time.perf_counter()
+        work = asyncio.ensure_future(self._run_handler(handler, job))
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, work))
+        try:
+            result = await work
+            if result.path is not None:
+                job.result_path = result.path
+                job.result_size = os.path.getsize(result.path)
+            else:
+                if not await self.store.save_result(job.id, result.data, owner=self.owner):
+                    raise LeaseLost(f"Job {job.id} is held by another runner")
+                job.result_size = len(result.data)
+            job.content_type = result.content_type
+            job.filename = result.filename
+            job.status = STATUS_COMPLETED
+            job.progress = 100.0
+            logger.info(f"Job {job.id} ({job.kind}) completed in {time.perf_counter() - start:.1f}s")
+        except LeaseLost:
+            logger.warning(f"Job {job.id} ({job.kind}) was taken over by another runner, discarding this run")
+            return
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                logger.warning(f"Job {job.id} ({job.kind}) lease was taken over by another runner, stopped it")
+                return
+            job.status = STATUS_QUEUED
+            job.owner = job.lease_expires_at = None
+            await self.store.update(job, owner=self.owner)
+            raise
+        except Exception as e:
+            job.status = STATUS_FAILED
+            job.error = str(e)
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+        finally:
+            heartbeat.cancel()
+        job.finished_at = datetime.now()
+        job.owner = job.lease_expires_at = None
+        if not await self.store.update(job, owner=self.owner):
+            logger.warning(f"Job {job.id} ({job.kind}) was taken over by another runner, discarding this run")
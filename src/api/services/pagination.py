@@ -0,0 +1,208 @@
+"""
+Keyset pagination over indexed collections.
+
+``IndexedCollection`` keeps rows ordered by a compound ``(timestamp, id)``
+key plus one secondary index per filterable field, each also ordered by that
+key. A page is a bisect into the right index followed by ``limit`` steps, so
+deep pages cost the same as the first one. Cursors are opaque URL-safe
+tokens encoding the last key returned.
+
+Offset pagination is kept for existing clients; it still has to walk past
+the skipped rows.
+"""
+
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+Key = Tuple[Any, Any]
+
+
+def encode_cursor(key: Key) -> str:
+    """Encode a ``(timestamp, id)`` key as an opaque cursor."""
+    timestamp, row_id = key
+    if isinstance(timestamp, datetime):
+        payload = {"t": timestamp.isoformat(), "dt": True, "i": row_id}
+    else:
+        payload = {"t": timestamp, "i": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _scalar(value: Any, types: Tuple[type, ...]) -> bool:
+    return isinstance(value, types) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str) -> Key:
+    """Decode a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        timestamp, row_id = payload["t"], payload["i"]
+        if payload.get("dt"):
+            timestamp = datetime.fromisoformat(timestamp)
+        elif not _scalar(timestamp, (int, float, str)):
+            raise TypeError("cursor timestamp must be a scalar")
+        if not _scalar(row_id, (int, str)):
+            raise TypeError("cursor id must be a string or integer")
+        return timestamp, row_id
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _normalize(value: Any) -> Hashable:
+    return value.lower() if isinstance(value, str) else value
+
+
+class IndexedCollection:
+    """Rows ordered by ``(timestamp, id)`` with per-field secondary indexes."""
+
+    def __init__(
+        self,
+        rows: Iterable[Any] = (),
+        timestamp: str = "timestamp",
+        id_field: str = "id",
+        indexes: Iterable[str] = (),
+        descending: bool = True,
+        getter: Optional[Callable[[Any, str], Any]] = None,
+    ):
+        self.timestamp = timestamp
+        self.id_field = id_field
+        self.descending = descending
+        self._get = getter or (lambda row, name: row[name] if isinstance(row, dict) else getattr(row, name))
+        self._rows: Dict[Key, Any] = {}
+        # Indexed values as of insertion, so rows mutated in place can be removed
+        self._indexed: Dict[Key, Dict[str, Hashable]] = {}
+        self._keys: List[Key] = []
+        self._indexes: Dict[str, Dict[Hashable, List[Key]]] = {name: {} for name in indexes}
+        for row in rows:
+            self.add(row)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key_of(self, row: Any) -> Key:
+        return self._get(row, self.timestamp), self._get(row, self.id_field)
+
+    def add(self, row: Any) -> None:
+        key = self.key_of(row)
+        if key in self._rows:
+            self.remove(key)
+        self._rows[key] = row
+        self._indexed[key] = {name: _normalize(self._get(row, name)) for name in self._indexes}
+        insort(self._keys, key)
+        for name, value in self._indexed[key].items():
+            insort(self._indexes[name].setdefault(value, []), key)
+
+    def remove(self, key: Key) -> None:
+        del self._rows[key]
+        del self._keys[bisect_left(self._keys, key)]
+        for name, value in self._indexed.pop(key).items():
+            keys = self._indexes[name][value]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del self._indexes[name][value]
+
+    def update(self, row: Any) -> None:
+        """Re-index a row whose indexed fields changed."""
+        key = self.key_of(row)
+        if key in self._rows:
+            self.remove(key)
+        self.add(row)
+
+    def values(self, field_name: str) -> List[Hashable]:
+        """Distinct normalized values of an indexed field."""
+        return list(self._indexes[field_name])
+
+    def _candidates(self, filters: Dict[str, Any]) -> List[Key]:
+        """The smallest index matching all equality filters."""
+        lists = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in self._indexes:
+                raise KeyError(f"Field '{name}' is not indexed")
+            lists.append(self._indexes[name].get(_normalize(value), []))
+        if not lists:
+            return self._keys
+        return min(lists, key=len)
+
+    def _matches(self, row: Any, filters: Dict[str, Any]) -> bool:
+        return all(
+            value is None or _normalize(self._get(row, name)) == _normalize(value)
+            for name, value in filters.items()
+        )
+
+    def _check_cursor_key(self, key: Key) -> None:
+        """Raise ValueError unless ``key`` orders against this collection's keys.
+
+        A cursor from another collection, or a naive timestamp against aware
+        ones, would otherwise fail with TypeError in the middle of a bisect.
+        """
+        if not self._keys:
+            return
+        sample = self._keys[0]
+        for value, expected, part in zip(key, sample, ("timestamp", "id")):
+            try:
+                value < expected  # comparing across types raises TypeError
+            except TypeError:
+                raise ValueError(
+                    f"Invalid cursor: {part} {value!r} does not match the collection's {type(expected).__name__} keys"
+                ) from None
+
+    def _iter_from(self, keys: List[Key], after: Optional[Key]) -> Iterator[Key]:
+        if self.descending:
+            end = len(keys) if after is None else bisect_left(keys, after)
+            for i in range(end - 1, -1, -1):
+                yield keys[i]
+        else:
+            start = 0 if after is None else bisect_right(keys, after)
+            for i in range(start, len(keys)):
+                yield keys[i]
+
+    def _iter_rows(
+        self,
+        filters: Dict[str, Any],
+        after: Optional[Key] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> Iterator[Any]:
+        for key in self._iter_from(self._candidates(filters), after):
+            row = self._rows[key]
+            if self._matches(row, filters) and (predicate is None or predicate(row)):
+                yield row
+
+    def page_after(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """Return up to ``limit`` rows after ``cursor`` and the next cursor."""
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None:
+            self._check_cursor_key(after)
+        rows: List[Any] = []
+        for row in self._iter_rows(filters or {}, after, predicate):
+            if len(rows) == limit:
+                return rows, encode_cursor(self.key_of(rows[-1]))
+            rows.append(row)
+        return rows, None
+
+    def page_offset(
+        self,
+        offset: int,
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> Tuple[List[Any], int]:
+        """Offset page plus the total number of matching rows."""
+        rows: List[Any] = []
+        total = 0
+        for row in self._iter_rows(filters or {}, None, predicate):
+            if offset <= total < offset + limit:
+                rows.append(row)
+            total += 1
+        return rows, total
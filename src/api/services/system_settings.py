@@ -0,0 +1,193 @@
+"""
+Versioned system settings shared by every worker.
+
+Each process holds the current settings as an immutable snapshot, so a
+request checking ``system_settings.current.maintenance_mode`` is a plain
+attribute read with no I/O. Updates are written to Redis with a version
+counter in one transaction and published on a channel; every worker
+subscribed to the channel swaps in the new snapshot. A periodic version
+check catches any messages missed while a subscriber was disconnected.
+
+Without Redis the service still works, but only for the local process.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    class WatchError(Exception):  # type: ignore[no-redef]
+        """Stand-in so ``except WatchError`` stays valid without redis."""
+
+DEFAULT_SYSTEM_SETTINGS = {
+    "maintenance_mode": False,
+    "auto_scaling": True,
+    "debug_logging": False,
+    "two_factor_auth": True,
+    "ip_whitelisting": True,
+    "session_timeout": True,
+}
+
+
+class SettingsSnapshot:
+    """An immutable, versioned set of settings readable as attributes."""
+
+    version: int
+    updated_at: datetime
+    _values: Dict[str, Any]
+
+    def __init__(self, version: int, values: Dict[str, Any], updated_at: Optional[datetime] = None):
+        self.__dict__.update(values)
+        self.__dict__["version"] = version
+        self.__dict__["updated_at"] = updated_at or datetime.now()
+        self.__dict__["_values"] = dict(values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings snapshots are read-only")
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names that are not settings
+        raise AttributeError(f"Unknown setting: {name}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+
+class SettingsService:
+    """Serves settings from memory and propagates updates through Redis."""
+
+    def __init__(
+        self,
+        defaults: Dict[str, Any],
+        key_prefix: str = "system-settings",
+        check_interval: float = 30.0,
+    ):
+        self.defaults = dict(defaults)
+        self.values_key = f"{key_prefix}:values"
+        self.version_key = f"{key_prefix}:version"
+        self.channel = f"{key_prefix}:updates"
+        self.check_interval = check_interval
+        self.current = SettingsSnapshot(0, self.defaults)
+        self.redis: Optional[Any] = None
+        self._listeners: List[Callable[[SettingsSnapshot, SettingsSnapshot], Any]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def on_change(self, listener: Callable[[SettingsSnapshot, SettingsSnapshot], Any]) -> None:
+        """Call ``listener(old, new)`` whenever a newer snapshot is applied."""
+        self._listeners.append(listener)
+
+    def _validate(self, changes: Dict[str, Any]) -> None:
+        unknown = set(changes) - set(self.defaults)
+        if unknown:
+            raise KeyError(f"Unknown settings: {', '.join(sorted(unknown))}")
+
+    def _apply(self, version: int, values: Dict[str, Any]) -> bool:
+        """Swap in a snapshot if it is newer than the current one."""
+        old = self.current
+        if version <= old.version:
+            return False
+        self.current = SettingsSnapshot(version, {**self.defaults, **values})
+        logger.info(f"System settings updated to version {version}")
+        for listener in self._listeners:
+            try:
+                listener(old, self.current)
+            except Exception as e:
+                logger.warning(f"Settings listener failed: {e}")
+        return True
+
+    async def update(self, changes: Dict[str, Any]) -> SettingsSnapshot:
+        """Apply ``changes`` everywhere and return the new local snapshot."""
+        self._validate(changes)
+        if self.redis is None:
+            self._apply(self.current.version + 1, {**self.current.as_dict(), **changes})
+            return self.current
+
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(self.values_key, self.version_key)
+                    stored = await pipe.get(self.values_key)
+                    values = {**self.defaults, **(json.loads(stored) if stored else {}), **changes}
+                    pipe.multi()
+                    pipe.set(self.values_key, json.dumps(values))
+                    pipe.incr(self.version_key)
+                    _, version = await pipe.execute()
+                    break
+                except WatchError:
+                    # Another worker updated concurrently; merge onto its values
+                    continue
+
+        self._apply(version, values)
+        await self.redis.publish(self.channel, json.dumps({"version": version, "values": values}))
+        return self.current
+
+    async def refresh(self) -> bool:
+        """Load the stored snapshot if its version is newer than ours."""
+        if self.redis is None:
+            return False
+        version = int(await self.redis.get(self.version_key) or 0)
+        if version <= self.current.version:
+            return False
+        stored = await self.redis.get(self.values_key)
+        return self._apply(version, json.loads(stored) if stored else {})
+
+    async def _subscribe(self, redis_client) -> None:
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published before the subscription is picked up here
+                await self.refresh()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                        self._apply(int(payload["version"]), payload["values"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Ignoring malformed settings message: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Settings subscription lost, retrying: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+    async def _check_versions(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                if await self.refresh():
+                    logger.warning("System settings were stale; a pub/sub message was missed")
+            except Exception as e:
+                logger.warning(f"Settings version check failed: {e}")
+
+    async def start(self, redis_client) -> None:
+        """Load the shared snapshot and follow updates from other workers."""
+        await self.stop()
+        self.redis = redis_client
+        await self.refresh()
+        self._tasks = [
+            asyncio.ensure_future(self._subscribe(redis_client)),
+            asyncio.ensure_future(self._check_versions()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+system_settings = SettingsService(DEFAULT_SYSTEM_SETTINGS)
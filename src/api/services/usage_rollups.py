@@ -0,0 +1,402 @@
+"""
+Incremental usage rollups for the admin analytics dashboard.
+
+Raw ``usage_records`` rows are folded into hourly and daily buckets per
+tenant as they arrive, each bucket holding call totals split by feature and
+endpoint. Every bucket is also mirrored into an all-tenants bucket, so the
+overview reads at most a few hundred buckets no matter how many raw rows
+exist.
+
+``UsageRollupPipeline`` tails the raw table by its ``(created_at, id)``
+watermark rather than ``recorded_at``, so records reported late are still
+counted. ``created_at`` is stamped when a row is inserted, not when its
+transaction commits, so a row can become visible after a later one has
+already been read; the pipeline therefore only reads rows older than a
+``grace`` period, which must exceed the longest insert transaction for
+each record to be counted exactly once. ``SQLiteRollupStore`` persists the buckets together
+with the watermark, so a restart resumes where it stopped instead of
+replaying the raw table.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALL_TENANTS = "*"
+HOURLY = "hour"
+DAILY = "day"
+
+Watermark = Tuple[datetime, str]
+
+# fetch_batch(after, before, limit) -> records with created_at < before,
+# ordered by (created_at, id), strictly after the ``after`` watermark when one
+# is given
+FetchBatch = Callable[[Optional[Watermark], datetime, int], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclass
+class RollupBucket:
+    """Call totals for one tenant over one hour or day."""
+
+    calls: int = 0
+    by_feature: Counter = field(default_factory=Counter)
+    by_endpoint: Counter = field(default_factory=Counter)
+
+    def add(self, feature: str, endpoint: Optional[str], quantity: int) -> None:
+        self.calls += quantity
+        self.by_feature[feature] += quantity
+        if endpoint:
+            self.by_endpoint[endpoint] += quantity
+
+
+def _endpoint_of(record: Dict[str, Any]) -> Optional[str]:
+    endpoint = record.get("endpoint")
+    if endpoint:
+        return endpoint
+    metadata = record.get("metadata") or {}
+    return metadata.get("endpoint") if isinstance(metadata, dict) else None
+
+
+class UsageRollupStore:
+    """Hourly and daily usage aggregates, maintained incrementally."""
+
+    def __init__(
+        self,
+        hourly_retention: timedelta = timedelta(days=90),
+        daily_retention: timedelta = timedelta(days=800),
+    ):
+        self.hourly_retention = hourly_retention
+        self.daily_retention = daily_retention
+        self._hourly: Dict[Tuple[datetime, str], RollupBucket] = {}
+        self._daily: Dict[Tuple[datetime, str], RollupBucket] = {}
+        self.records_applied = 0
+        # (created_at, id) of the last record folded into the buckets
+        self.watermark: Optional[Watermark] = None
+
+    def _granularities(self):
+        return ((HOURLY, self._hourly), (DAILY, self._daily))
+
+    def _touched(self, granularity: str, key: Tuple[datetime, str]) -> None:
+        """Called for every bucket a record changes."""
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        """Fold one usage record into its hourly and daily buckets."""
+        recorded_at: datetime = record["recorded_at"]
+        hour = recorded_at.replace(minute=0, second=0, microsecond=0)
+        day = hour.replace(hour=0)
+        tenant = record["tenant_id"]
+        feature = record["feature"]
+        endpoint = _endpoint_of(record)
+        quantity = int(record.get("quantity", 1))
+
+        for (granularity, buckets), start in zip(self._granularities(), (hour, day)):
+            for key in ((start, tenant), (start, ALL_TENANTS)):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = RollupBucket()
+                bucket.add(feature, endpoint, quantity)
+                self._touched(granularity, key)
+        self.records_applied += 1
+
+    def _cutoffs(self, now: datetime) -> Dict[str, datetime]:
+        return {HOURLY: now - self.hourly_retention, DAILY: now - self.daily_retention}
+
+    def compact(self, now: Optional[datetime] = None) -> int:
+        """Drop buckets past their retention; returns how many were removed."""
+        cutoffs = self._cutoffs(now or datetime.now())
+        removed = 0
+        for granularity, buckets in self._granularities():
+            expired = [key for key in buckets if key[0] < cutoffs[granularity]]
+            for key in expired:
+                del buckets[key]
+            removed += len(expired)
+        return removed
+
+    async def checkpoint(self, previous: Optional[Watermark]) -> bool:
+        """Persist the buckets changed since ``previous``; in memory, nothing to do.
+
+        Returns False when another process already moved the watermark on,
+        in which case the store has reloaded its state.
+        """
+        return True
+
+    async def compact_async(self, now: Optional[datetime] = None) -> int:
+        return self.compact(now)
+
+    def _window(
+        self,
+        buckets: Dict[Tuple[datetime, str], RollupBucket],
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+        tenant: str,
+    ):
+        current = start
+        while current < end:
+            bucket = buckets.get((current, tenant))
+            if bucket is not None:
+                yield current, bucket
+            current += step
+
+    def overview(
+        self,
+        now: Optional[datetime] = None,
+        days: int = 30,
+        tenant_id: Optional[str] = None,
+        top_endpoints: int = 4,
+    ) -> Dict[str, Any]:
+        """API usage summary for the last ``days`` days, read from rollups only."""
+        now = now or datetime.now()
+        tenant = tenant_id or ALL_TENANTS
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today + timedelta(days=1)
+        start = end - timedelta(days=days)
+        previous_start = start - timedelta(days=days)
+
+        total = 0
+        endpoints: Counter = Counter()
+        for _, bucket in self._window(self._daily, start, end, timedelta(days=1), tenant):
+            total += bucket.calls
+            endpoints.update(bucket.by_endpoint)
+        previous = sum(
+            b.calls for _, b in self._window(self._daily, previous_start, start, timedelta(days=1), tenant)
+        )
+
+        by_hour = [0] * 24
+        for hour, bucket in self._window(self._hourly, start, end, timedelta(hours=1), tenant):
+            by_hour[hour.hour] += bucket.calls
+        peak = max(range(24), key=by_hour.__getitem__) if any(by_hour) else None
+
+        return {
+            "total_calls": total,
+            "monthly_growth": round((total - previous) * 100 / previous, 1) if previous else None,
+            "daily_average": round(total / days) if days else 0,
+            "peak_hour": f"{peak:02d}:00" if peak is not None else None,
+            "endpoints": [
+                {
+                    "name": name,
+                    "calls": calls,
+                    "percentage": round(calls * 100 / total, 1) if total else 0.0,
+                }
+                for name, calls in endpoints.most_common(top_endpoints)
+            ],
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hourly_buckets": len(self._hourly),
+            "daily_buckets": len(self._daily),
+            "records_applied": self.records_applied,
+        }
+
+
+class SQLiteRollupStore(UsageRollupStore):
+    """Rollup buckets and their watermark persisted in a SQLite file.
+
+    Changed buckets are written with the new watermark in one transaction,
+    so a restart resumes from a consistent state. Several processes may run
+    the pipeline over the same file: a checkpoint only commits when the
+    stored watermark is still the one this process started its batch from;
+    otherwise another process got there first and the store reloads.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._dirty: Set[Tuple[str, datetime, str]] = set()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS usage_rollups (
+                granularity TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                tenant_id TEXT NOT NULL,
+                calls INTEGER NOT NULL,
+                by_feature TEXT NOT NULL,
+                by_endpoint TEXT NOT NULL,
+                PRIMARY KEY (granularity, bucket_start, tenant_id)
+            );
+            CREATE TABLE IF NOT EXISTS usage_rollup_state (
+                name TEXT PRIMARY KEY,
+                watermark_created_at TEXT NOT NULL,
+                watermark_id TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            """
+        )
+        self._load()
+
+    async def _call(self, func, *args):
+        def locked():
+            with self._lock:
+                return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, locked)
+
+    def _touched(self, granularity: str, key: Tuple[datetime, str]) -> None:
+        self._dirty.add((granularity, key[0], key[1]))
+
+    def _stored_watermark(self) -> Optional[Watermark]:
+        row = self._conn.execute(
+            "SELECT watermark_created_at, watermark_id FROM usage_rollup_state WHERE name = 'usage'"
+        ).fetchone()
+        return (datetime.fromisoformat(row[0]), row[1]) if row else None
+
+    def _load(self) -> None:
+        self._hourly.clear()
+        self._daily.clear()
+        self._dirty.clear()
+        buckets = dict(self._granularities())
+        rows = self._conn.execute(
+            "SELECT granularity, bucket_start, tenant_id, calls, by_feature, by_endpoint FROM usage_rollups"
+        )
+        for granularity, start, tenant, calls, by_feature, by_endpoint in rows:
+            buckets[granularity][(datetime.fromisoformat(start), tenant)] = RollupBucket(
+                calls, Counter(json.loads(by_feature)), Counter(json.loads(by_endpoint))
+            )
+        self.watermark = self._stored_watermark()
+
+    def _rows(self, keys: Iterable[Tuple[str, datetime, str]]) -> List[Tuple]:
+        buckets = dict(self._granularities())
+        rows = []
+        for granularity, start, tenant in keys:
+            bucket = buckets[granularity].get((start, tenant))
+            if bucket is not None:
+                rows.append((
+                    granularity, start.isoformat(), tenant, bucket.calls,
+                    json.dumps(bucket.by_feature), json.dumps(bucket.by_endpoint),
+                ))
+        return rows
+
+    def _commit(self, previous: Optional[Watermark]) -> bool:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._stored_watermark() != previous:
+                self._conn.execute("ROLLBACK")
+                self._load()
+                return False
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO usage_rollups "
+                "(granularity, bucket_start, tenant_id, calls, by_feature, by_endpoint) VALUES (?, ?, ?, ?, ?, ?)",
+                self._rows(self._dirty),
+            )
+            if self.watermark is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO usage_rollup_state "
+                    "(name, watermark_created_at, watermark_id, updated_at) VALUES ('usage', ?, ?, ?)",
+                    (self.watermark[0].isoformat(), self.watermark[1], datetime.now().isoformat()),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._dirty.clear()
+        return True
+
+    async def checkpoint(self, previous: Optional[Watermark]) -> bool:
+        return await self._call(self._commit, previous)
+
+    def _delete_expired(self, cutoffs: Dict[str, datetime]) -> None:
+        for granularity, cutoff in cutoffs.items():
+            self._conn.execute(
+                "DELETE FROM usage_rollups WHERE granularity = ? AND bucket_start < ?",
+                (granularity, cutoff.isoformat()),
+            )
+
+    async def compact_async(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.now()
+        removed = self.compact(now)
+        await self._call(self._delete_expired, self._cutoffs(now))
+        return removed
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class UsageRollupPipeline:
+    """Tails new usage records and applies them to a rollup store."""
+
+    def __init__(
+        self,
+        store: UsageRollupStore,
+        fetch_batch: FetchBatch,
+        batch_size: int = 5000,
+        grace: timedelta = timedelta(minutes=5),
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.store = store
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.grace = grace
+        self.clock = clock
+        self.last_run: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def watermark(self) -> Optional[Watermark]:
+        return self.store.watermark
+
+    async def catch_up(self) -> int:
+        """Apply every settled record newer than the watermark; returns how many.
+
+        Records created within the last ``grace`` are left for a later run,
+        since transactions still open may yet commit rows ordered before them.
+        """
+        async with self._lock:
+            applied = 0
+            start = time.perf_counter()
+            horizon = self.clock() - self.grace
+            while True:
+                previous = self.store.watermark
+                batch = await self.fetch_batch(previous, horizon, self.batch_size)
+                for record in batch:
+                    self.store.apply(record)
+                if batch:
+                    last = batch[-1]
+                    self.store.watermark = (last["created_at"], last["id"])
+                    if not await self.store.checkpoint(previous):
+                        # Another process applied this batch; continue from its state
+                        continue
+                    applied += len(batch)
+                if len(batch) < self.batch_size:
+                    break
+            self.last_run = datetime.now()
+            if applied:
+                logger.info(
+                    f"Applied {applied} usage records to rollups in {(time.perf_counter() - start) * 1000:.1f}ms"
+                )
+            return applied
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                await self.catch_up()
+                await self.store.compact_async()
+            except Exception as e:
+                logger.error(f"Usage rollup run failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = 30.0) -> None:
+        """Run catch-up in the background every ``interval`` seconds."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,308 @@
+"""
+Tenant API keys.
+
+Keys are issued as ``<prefix>.<secret>``. The prefix is public and unique,
+and indexes the stored key; only an HMAC-SHA256 of the secret is kept.
+Verifying a presented key is one dictionary lookup by prefix and one
+constant-time comparison of the keyed hash, however many keys exist.
+
+Successful verifications are cached in memory for a short time, so a busy
+client does not pay for the hash on every request. Revoking a key drops
+its cache entries immediately and calls any registered revocation hooks,
+e.g. to tell other workers.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.security import HTTPBearer
+
+from src.auth.rbac import Role, UserContext
+
+logger = logging.getLogger(__name__)
+
+PREFIX_BYTES = 6
+SECRET_BYTES = 32
+
+
+class ApiKeyScope(str, Enum):
+    READ_ONLY = "read_only"
+    WRITE = "write"
+    ANALYTICS = "analytics"
+    ADMIN = "admin"
+
+
+@dataclass
+class ApiKey:
+    id: str
+    tenant_id: str
+    name: str
+    prefix: str
+    key_hash: str
+    scopes: List[ApiKeyScope]
+    created_by: str
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    last_used_ip: Optional[str] = None
+    revoked_at: Optional[datetime] = None
+    revoked_by: Optional[str] = None
+    revocation_reason: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def is_valid(self, now: Optional[datetime] = None) -> bool:
+        if self.revoked_at is not None:
+            return False
+        return self.expires_at is None or self.expires_at > (now or datetime.utcnow())
+
+
+def user_context_for_api_key(api_key: ApiKey) -> UserContext:
+    """The user context an API key acts as, derived from its scopes."""
+    scopes = set(api_key.scopes)
+    if ApiKeyScope.ADMIN in scopes:
+        roles = [Role.TENANT_ADMIN]
+    elif ApiKeyScope.WRITE in scopes:
+        roles = [Role.CLIENT_ADMIN]
+    else:
+        roles = [Role.CLIENT_USER]
+    if ApiKeyScope.ANALYTICS in scopes and Role.TENANT_ADMIN not in roles:
+        roles.append(Role.ANALYST)
+    return UserContext(
+        user_id=f"api_key_{api_key.id}",
+        roles=roles,
+        tenant_id=api_key.tenant_id,
+        client_id=api_key.metadata.get("client_id"),
+        brand_id=api_key.metadata.get("brand_id"),
+    )
+
+
+class ApiKeyManager:
+    """Issues, verifies and revokes API keys through a prefix index."""
+
+    def __init__(
+        self,
+        hash_secret: Optional[str] = None,
+        cache_ttl: float = 60.0,
+        cache_size: int = 10000,
+    ):
+        secret = hash_secret or os.getenv("API_KEY_HASH_SECRET")
+        if not secret:
+            logger.warning("API_KEY_HASH_SECRET is not set; issued keys only verify in this process")
+            secret = secrets.token_hex(32)
+        self._hash_key = secret.encode()
+        self._keys: Dict[str, ApiKey] = {}
+        self._by_prefix: Dict[str, ApiKey] = {}
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        # SHA-256 of the presented key -> (key, cached until)
+        self._cache: "OrderedDict[bytes, Tuple[ApiKey, float]]" = OrderedDict()
+        self._cached_digests: Dict[str, Set[bytes]] = {}
+        self._revocation_hooks: List[Callable[[ApiKey], Any]] = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def hash_secret(self, secret: str) -> str:
+        return hmac.new(self._hash_key, secret.encode(), hashlib.sha256).hexdigest()
+
+    def create_api_key(
+        self,
+        tenant_id: str,
+        name: str,
+        scopes: List[ApiKeyScope],
+        created_by: str,
+        expires_in_days: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[ApiKey, str]:
+        """Create a key; returns it and the ``prefix.secret`` string shown once."""
+        prefix = secrets.token_hex(PREFIX_BYTES)
+        while prefix in self._by_prefix:
+            prefix = secrets.token_hex(PREFIX_BYTES)
+        secret = secrets.token_urlsafe(SECRET_BYTES)
+        now = datetime.utcnow()
+        api_key = ApiKey(
+            id=str(uuid.uuid4()),
+            tenant_id=tenant_id,
+            name=name,
+            prefix=prefix,
+            key_hash=self.hash_secret(secret),
+            scopes=list(scopes),
+            created_by=created_by,
+            created_at=now,
+            expires_at=now + timedelta(days=expires_in_days) if expires_in_days is not None else None,
+            metadata=dict(metadata or {}),
+        )
+        self._keys[api_key.id] = api_key
+        self._by_prefix[prefix] = api_key
+        return api_key, f"{prefix}.{secret}"
+
+    def verify_api_key(self, key: str, client_ip: Optional[str] = None) -> Optional[ApiKey]:
+        """The key for ``key`` if it is valid, else None."""
+        digest = hashlib.sha256(key.encode()).digest()
+        api_key = self._cached(digest) or self._lookup(key, digest)
+        if api_key is None:
+            return None
+        api_key.last_used_at = datetime.utcnow()
+        if client_ip:
+            api_key.last_used_ip = client_ip
+        return api_key
+
+    def _lookup(self, key: str, digest: bytes) -> Optional[ApiKey]:
+        prefix, _, secret = key.partition(".")
+        api_key = self._by_prefix.get(prefix)
+        if api_key is None or not secret:
+            return None
+        if not hmac.compare_digest(api_key.key_hash, self.hash_secret(secret)):
+            return None
+        if not api_key.is_valid():
+            return None
+        self._remember(digest, api_key)
+        return api_key
+
+    def _cached(self, digest: bytes) -> Optional[ApiKey]:
+        entry = self._cache.get(digest)
+        if entry is None:
+            self.cache_misses += 1
+            return None
+        api_key, until = entry
+        if until <= time.time() or not api_key.is_valid():
+            self._forget(digest, api_key.id)
+            self.cache_misses += 1
+            return None
+        self._cache.move_to_end(digest)
+        self.cache_hits += 1
+        return api_key
+
+    def _remember(self, digest: bytes, api_key: ApiKey) -> None:
+        if self.cache_ttl <= 0:
+            return
+        until = time.time() + self.cache_ttl
+        if api_key.expires_at is not None:
+            until = min(until, api_key.expires_at.timestamp())
+        self._cache[digest] = (api_key, until)
+        self._cached_digests.setdefault(api_key.id, set()).add(digest)
+        while len(self._cache) > self.cache_size:
+            old_digest, (old_key, _) = self._cache.popitem(last=False)
+            self._forget(old_digest, old_key.id)
+
+    def _forget(self, digest: bytes, key_id: str) -> None:
+        self._cache.pop(digest, None)
+        digests = self._cached_digests.get(key_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._cached_digests[key_id]
+
+    def invalidate(self, key_id: str) -> None:
+        """Drop cached verifications of a key."""
+        for digest in self._cached_digests.pop(key_id, set()):
+            self._cache.pop(digest, None)
+
+    def on_revoke(self, hook: Callable[[ApiKey], Any]) -> None:
+        """Call ``hook(api_key)`` whenever a key is revoked."""
+        self._revocation_hooks.append(hook)
+
+    def revoke_api_key(self, key_id: str, revoked_by: str, reason: Optional[str] = None) -> Optional[ApiKey]:
+        api_key = self._keys.get(key_id)
+        if api_key is None:
+            return None
+        api_key.revoked_at = datetime.utcnow()
+        api_key.revoked_by = revoked_by
+        api_key.revocation_reason = reason
+        self.invalidate(key_id)
+        logger.info(f"API key {api_key.prefix} revoked by {revoked_by}")
+        for hook in self._revocation_hooks:
+            try:
+                hook(api_key)
+            except Exception as e:
+                logger.warning(f"API key revocation hook failed: {e}")
+        return api_key
+
+    def get_api_key(self, key_id: str) -> Optional[ApiKey]:
+        return self._keys.get(key_id)
+
+    def list_api_keys(self, tenant_id: str) -> List[ApiKey]:
+        return [key for key in self._keys.values() if key.tenant_id == tenant_id]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "size": len(self._cache),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+        }
+
+
+class ApiKeyBearer(HTTPBearer):
+    """Bearer scheme resolving the credentials to a verified API key."""
+
+    def __init__(self, api_key_manager: ApiKeyManager, auto_error: bool = True):
+        super().__init__(auto_error=False)
+        self.api_key_manager = api_key_manager
+        self.raise_on_error = auto_error
+
+    def _get_client_ip(self, request: Request) -> Optional[str]:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+        real_ip = request.headers.get("X-Real-IP")
+        if real_ip:
+            return real_ip
+        return request.client.host if request.client else None
+
+    async def __call__(self, request: Request) -> Optional[ApiKey]:  # type: ignore[override]
+        credentials = await super().__call__(request)
+        if credentials is None:
+            if self.raise_on_error:
+                raise HTTPException(status_code=401, detail="Missing API key")
+            return None
+        api_key = self.api_key_manager.verify_api_key(credentials.credentials, self._get_client_ip(request))
+        if api_key is None:
+            if self.raise_on_error:
+                raise HTTPException(status_code=401, detail="Invalid or expired API key")
+            return None
+        request.state.api_key = api_key
+        return api_key
+
+
+class ApiKeyDependency:
+    """Route dependency requiring a verified API key with the given scopes."""
+
+    def __init__(self, api_key_manager: ApiKeyManager, required_scopes: Optional[List[ApiKeyScope]] = None):
+        self.api_key_manager = api_key_manager
+        self.required_scopes = required_scopes or []
+        self.security = ApiKeyBearer(api_key_manager)
+
+    async def __call__(self, request: Request) -> Tuple[ApiKey, UserContext]:
+        api_key = await self.security.__call__(request)
+        if api_key is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired API key")
+        scopes = set(api_key.scopes)
+        missing = [scope for scope in self.required_scopes if scope not in scopes]
+        if missing and ApiKeyScope.ADMIN not in scopes:
+            required = ", ".join(scope.value for scope in missing)
+            raise HTTPException(status_code=403, detail=f"Insufficient API key permissions. Missing: {required}")
+        user_context = self._create_user_context_from_api_key(api_key)
+        request.state.user = user_context
+        return api_key, user_context
+
+    def _create_user_context_from_api_key(self, api_key: ApiKey) -> UserContext:
+        return user_context_for_api_key(api_key)
+
+
+def create_api_key_dependency(
+    api_key_manager: ApiKeyManager,
+    required_scopes: Optional[List[ApiKeyScope]] = None,
+) -> ApiKeyDependency:
+    return ApiKeyDependency(api_key_manager, required_scopes)
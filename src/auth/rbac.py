@@ -0,0 +1,220 @@
+"""
+Role-based access control.
+
+Roles, their inheritance and the tier feature gates are compiled once into
+integer bitsets: every ``Permission`` owns one bit, every role a mask of
+its own and inherited permissions, and every tier a mask of the gated
+features it unlocks. A ``UserContext`` computes its effective mask when it
+is created, so checking a permission is a single bitwise AND.
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+class Role(str, Enum):
+    SUPER_ADMIN = "super_admin"
+    TENANT_ADMIN = "tenant_admin"
+    CLIENT_ADMIN = "client_admin"
+    CLIENT_USER = "client_user"
+    ANALYST = "analyst"
+
+
+class Permission(str, Enum):
+    MANAGE_SYSTEM = "manage_system"
+    MANAGE_TENANTS = "manage_tenants"
+    MANAGE_USERS = "manage_users"
+    MANAGE_API_KEYS = "manage_api_keys"
+    MANAGE_BILLING = "manage_billing"
+    VIEW_AUDIT_LOGS = "view_audit_logs"
+    MANAGE_PRODUCTS = "manage_products"
+    VIEW_PRODUCTS = "view_products"
+    VIEW_RECOMMENDATIONS = "view_recommendations"
+    VIEW_ANALYTICS = "view_analytics"
+    EXPORT_DATA = "export_data"
+    ADVANCED_ANALYTICS = "advanced_analytics"
+    ACCESS_ML_TOOLS = "access_ml_tools"
+    BULK_OPERATIONS = "bulk_operations"
+    WHITE_LABEL_ACCESS = "white_label_access"
+
+
+ROLE_PERMISSIONS: Dict[Role, Set[Permission]] = {
+    Role.CLIENT_USER: {
+        Permission.VIEW_PRODUCTS,
+        Permission.VIEW_RECOMMENDATIONS,
+    },
+    Role.ANALYST: {
+        Permission.VIEW_ANALYTICS,
+        Permission.ADVANCED_ANALYTICS,
+        Permission.EXPORT_DATA,
+    },
+    Role.CLIENT_ADMIN: {
+        Permission.MANAGE_PRODUCTS,
+        Permission.VIEW_ANALYTICS,
+        Permission.MANAGE_API_KEYS,
+        Permission.ACCESS_ML_TOOLS,
+        Permission.BULK_OPERATIONS,
+    },
+    Role.TENANT_ADMIN: {
+        Permission.MANAGE_USERS,
+        Permission.MANAGE_BILLING,
+        Permission.VIEW_AUDIT_LOGS,
+        Permission.WHITE_LABEL_ACCESS,
+    },
+    Role.SUPER_ADMIN: {
+        Permission.MANAGE_SYSTEM,
+        Permission.MANAGE_TENANTS,
+    },
+}
+
+ROLE_INHERITANCE: Dict[Role, Tuple[Role, ...]] = {
+    Role.ANALYST: (Role.CLIENT_USER,),
+    Role.CLIENT_ADMIN: (Role.CLIENT_USER,),
+    Role.TENANT_ADMIN: (Role.CLIENT_ADMIN, Role.ANALYST),
+    Role.SUPER_ADMIN: (Role.TENANT_ADMIN,),
+}
+
+# Features each tier unlocks; permissions listed under any tier are gated
+TIER_FEATURES: Dict[str, Set[Permission]] = {
+    "free": set(),
+    "professional": {
+        Permission.EXPORT_DATA,
+        Permission.ADVANCED_ANALYTICS,
+        Permission.ACCESS_ML_TOOLS,
+    },
+    "enterprise": {
+        Permission.EXPORT_DATA,
+        Permission.ADVANCED_ANALYTICS,
+        Permission.ACCESS_ML_TOOLS,
+        Permission.BULK_OPERATIONS,
+        Permission.WHITE_LABEL_ACCESS,
+    },
+}
+
+PERMISSION_BITS: Dict[Permission, int] = {permission: 1 << i for i, permission in enumerate(Permission)}
+
+
+def permission_mask(permissions: Iterable[Permission]) -> int:
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+def permissions_from_mask(mask: int) -> Set[Permission]:
+    return {permission for permission, bit in PERMISSION_BITS.items() if mask & bit}
+
+
+class CompiledPolicy:
+    """Role and tier masks compiled from permission tables."""
+
+    def __init__(
+        self,
+        role_permissions: Mapping[Role, Iterable[Permission]] = ROLE_PERMISSIONS,
+        inheritance: Mapping[Role, Iterable[Role]] = ROLE_INHERITANCE,
+        tier_features: Mapping[str, Iterable[Permission]] = TIER_FEATURES,
+    ):
+        direct = {role: permission_mask(perms) for role, perms in role_permissions.items()}
+        self.role_masks: Dict[Role, int] = {}
+        for role in Role:
+            self.role_masks[role] = self._compile_role(role, direct, inheritance, ())
+        self.tier_masks: Dict[str, int] = {tier: permission_mask(perms) for tier, perms in tier_features.items()}
+        self.gated_mask = 0
+        for mask in self.tier_masks.values():
+            self.gated_mask |= mask
+        # Per-instance memo; contexts with the same roles and tier share a mask
+        self.mask_for = lru_cache(maxsize=4096)(self._mask_for)
+
+    def _compile_role(self, role: Role, direct, inheritance, path: Tuple[Role, ...]) -> int:
+        if role in path:
+            chain = " -> ".join(r.value for r in path + (role,))
+            raise ValueError(f"Role inheritance cycle: {chain}")
+        if role in self.role_masks:
+            return self.role_masks[role]
+        mask = direct.get(role, 0)
+        for parent in inheritance.get(role, ()):
+            mask |= self._compile_role(parent, direct, inheritance, path + (role,))
+        return mask
+
+    def _mask_for(
+        self,
+        roles: FrozenSet[Role],
+        tier: Optional[str] = None,
+        features: FrozenSet[Permission] = frozenset(),
+    ) -> int:
+        """Effective mask for a role set within a tier plus per-tenant features.
+
+        Without a tier, feature gates are not applied.
+        """
+        mask = 0
+        for role in roles:
+            mask |= self.role_masks[role]
+        if tier is not None:
+            allowed = self.tier_masks.get(tier, 0) | permission_mask(features)
+            mask &= ~self.gated_mask | allowed
+        return mask
+
+
+DEFAULT_POLICY = CompiledPolicy()
+
+
+@dataclass
+class UserContext:
+    """An authenticated principal and its precomputed permission mask."""
+
+    user_id: str
+    roles: List[Role]
+    tenant_id: Optional[str] = None
+    client_id: Optional[str] = None
+    brand_id: Optional[str] = None
+    tier: Optional[str] = None
+    # Gated features enabled for this tenant outside its tier
+    features: FrozenSet[Permission] = frozenset()
+    permission_mask: int = field(default=0, init=False, compare=False)
+
+    def __post_init__(self):
+        self.refresh_permissions()
+
+    def refresh_permissions(self, policy: CompiledPolicy = DEFAULT_POLICY) -> None:
+        """Recompute the mask, e.g. after roles changed."""
+        self.permission_mask = policy.mask_for(frozenset(self.roles), self.tier, frozenset(self.features))
+
+    def has_permission(self, permission: Permission) -> bool:
+        return bool(self.permission_mask & PERMISSION_BITS[permission])
+
+
+class RBACManager:
+    """Permission checks against compiled role masks."""
+
+    def __init__(self, policy: Optional[CompiledPolicy] = None):
+        self.policy = policy or DEFAULT_POLICY
+
+    def _mask(self, user_context: UserContext) -> int:
+        if self.policy is DEFAULT_POLICY:
+            return user_context.permission_mask
+        return self.policy.mask_for(
+            frozenset(user_context.roles), user_context.tier, frozenset(user_context.features)
+        )
+
+    def has_permission(self, user_context: UserContext, permission: Permission) -> bool:
+        return bool(self._mask(user_context) & PERMISSION_BITS[permission])
+
+    def has_all_permissions(self, user_context: UserContext, permissions: Iterable[Permission]) -> bool:
+        required = permission_mask(permissions)
+        return self._mask(user_context) & required == required
+
+    def has_any_permission(self, user_context: UserContext, permissions: Iterable[Permission]) -> bool:
+        return bool(self._mask(user_context) & permission_mask(permissions))
+
+    def get_user_permissions(self, user_context: UserContext) -> Set[Permission]:
+        return permissions_from_mask(self._mask(user_context))
+
+    def get_role_permissions(self, role: Role) -> Set[Permission]:
+        return permissions_from_mask(self.policy.role_masks[role])
+
+    def can_access_tenant(self, user_context: UserContext, tenant_id: str) -> bool:
+        if self.has_permission(user_context, Permission.MANAGE_TENANTS):
+            return True
+        return user_context.tenant_id == tenant_id
@@ -0,0 +1,987 @@
+"""
+In-process caching for MongoDB query results.
+
+``MemoryCache`` is a TTL + LRU cache that threads can share. It is split
+into segments chosen by key hash, each with its own lock, LRU order and
+counters, so threads working on different keys do not serialize on a
+single lock. With one segment (the default) LRU order is exact; with
+several, each segment evicts its own least recently used entry and the
+segment capacities add up to ``max_size``.
+
+Expired entries are found through a hierarchical timing wheel per segment
+rather than by scanning: an expiry pass costs what actually expired, and
+``expire`` can be given a time budget so it runs in short slices.
+
+``CacheManager`` wraps a ``MemoryCache`` with async methods, a background
+expiry task and the key conventions for product compatibility and face
+analysis results. Given a Redis client it becomes two-tier: the
+``MemoryCache`` turns into a short-lived L1 in front of Redis, kept
+coherent across instances by ``LayeredCache``.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from src.performance.layered_cache import LayeredCache
+from src.performance.timer_wheel import TimerWheel
+from src.performance.tinylfu import WTinyLFUPolicy
+
+logger = logging.getLogger(__name__)
+
+# Segments used by caches created for heavily threaded callers
+DEFAULT_SEGMENTS = 16
+
+# Keys expired per segment lock acquisition during background expiry
+EXPIRY_BATCH = 256
+
+# Least recently used entries compared when evicting by byte cost
+EVICTION_SAMPLE = 5
+# Containers larger than this are sized from a sample of their items
+SIZE_SAMPLE = 32
+SIZE_DEPTH = 4
+
+_SCALARS = frozenset({str, bytes, bytearray, int, float, bool, type(None)})
+_getsizeof = sys.getsizeof
+
+DEFAULT_NAMESPACE = "default"
+
+EVICTION_POLICIES = ("lru", "tinylfu")
+
+COMPATIBILITY_TTL = 600
+# Product fields that tag compatibility listings, and the tag prefix for each
+PRODUCT_TAG_FIELDS = (("product_id", "product"), ("sku", "product"), ("brand_id", "brand"))
+FACE_ANALYSIS_TTL = 3600
+
+_MISSING = object()
+
+
+def make_key(key: Any) -> Hashable:
+    """Cache key for ``key``; dicts and lists are serialized deterministically."""
+    if isinstance(key, (str, bytes, int, float)):
+        return key
+    return json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _item_size(value: Any, depth: int) -> int:
+    if type(value) in _SCALARS:
+        return _getsizeof(value)
+    return estimate_size(value, depth)
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate bytes held by ``value``.
+
+    Containers are walked a few levels deep; large ones are sized from a
+    sample of their items and scaled up, so the cost stays small.
+    """
+    size = _getsizeof(value)
+    if type(value) in _SCALARS or _depth >= SIZE_DEPTH:
+        return size
+    depth = _depth + 1
+    inner = 0
+    if isinstance(value, dict):
+        count = len(value)
+        for key, item in itertools.islice(value.items(), SIZE_SAMPLE):
+            inner += _item_size(key, depth) + _item_size(item, depth)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        count = len(value)
+        for item in itertools.islice(value, SIZE_SAMPLE):
+            inner += _item_size(item, depth)
+    elif isinstance(value, (str, bytes, bytearray, int, float)):
+        return size
+    else:
+        attributes = getattr(value, "__dict__", None)
+        return size + (estimate_size(attributes, depth) if attributes is not None else 0)
+    if count > SIZE_SAMPLE:
+        inner = inner * count // SIZE_SAMPLE
+    return size + inner
+
+
+def namespace_of(key: Any) -> str:
+    """Namespace of a cache key: a string key's prefix up to the first ``:``."""
+    if isinstance(key, str):
+        prefix, separator, _ = key.partition(":")
+        if separator:
+            return prefix
+    return DEFAULT_NAMESPACE
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "size", "namespace", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: Optional[float],
+        size: int = 0,
+        namespace: str = DEFAULT_NAMESPACE,
+        tags: Tuple[str, ...] = (),
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.namespace = namespace
+        self.tags = tags
+
+
+class CacheStats(dict):
+    """Counter snapshot; keys can also be read as attributes."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class _Segment:
+    """One lock stripe: its entries in LRU order, expiry wheel and counters.
+
+    Entries are also kept in LRU order per namespace, so a namespace over
+    its byte budget can be trimmed without walking the others, and indexed
+    by tag so invalidating a tag only touches its keys. Without a
+    ``policy`` the count limit evicts in LRU order; with one, the policy
+    picks the victim.
+    """
+
+    __slots__ = (
+        "lock", "entries", "by_namespace", "by_tag", "wheel", "policy", "capacity", "bytes", "namespace_bytes",
+        "hits", "misses", "sets", "evictions", "expirations", "invalidations",
+    )
+
+    def __init__(self, capacity: int, wheel: TimerWheel, policy: Optional[WTinyLFUPolicy] = None):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.by_namespace: "Dict[str, OrderedDict[Hashable, None]]" = {}
+        self.by_tag: Dict[str, Set[Hashable]] = {}
+        self.wheel = wheel
+        self.policy = policy
+        self.capacity = capacity
+        self.bytes = 0
+        self.namespace_bytes: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def touch(self, key: Hashable, entry: CacheEntry) -> None:
+        self.entries.move_to_end(key)
+        self.by_namespace[entry.namespace].move_to_end(key)
+        if self.policy is not None:
+            self.policy.hit(key)
+
+    def insert(self, key: Hashable, entry: CacheEntry) -> None:
+        """Store ``entry`` and evict whatever the count limit requires."""
+        replaced = self._unlink(key)
+        self.entries[key] = entry
+        self.by_namespace.setdefault(entry.namespace, OrderedDict())[key] = None
+        self.bytes += entry.size
+        self.namespace_bytes[entry.namespace] = self.namespace_bytes.get(entry.namespace, 0) + entry.size
+        for tag in entry.tags:
+            keys = self.by_tag.get(tag)
+            if keys is None:
+                keys = self.by_tag[tag] = set()
+            keys.add(key)
+        if entry.expires_at is not None:
+            self.wheel.schedule(key, entry.expires_at)
+        if self.policy is None:
+            while len(self.entries) > self.capacity:
+                self.evict(next(iter(self.entries)))
+        elif replaced is not None:
+            self.policy.hit(key)
+        else:
+            victim = self.policy.add(key)
+            if victim is not None:
+                self.evict(victim)
+
+    def remove(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._unlink(key)
+        if entry is not None and self.policy is not None:
+            self.policy.discard(key)
+        return entry
+
+    def _unlink(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        namespace = entry.namespace
+        order = self.by_namespace[namespace]
+        del order[key]
+        self.bytes -= entry.size
+        if order:
+            self.namespace_bytes[namespace] -= entry.size
+        else:
+            del self.by_namespace[namespace]
+            del self.namespace_bytes[namespace]
+        for tag in entry.tags:
+            keys = self.by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self.by_tag[tag]
+        self.wheel.cancel(key)
+        return entry
+
+    def evict(self, key: Hashable) -> Optional[CacheEntry]:
+        self.evictions += 1
+        return self.remove(key)
+
+    def victim(self, order, keep: Hashable) -> Optional[Hashable]:
+        """The costliest of the few least recently used keys in ``order``."""
+        victim = None
+        largest = -1
+        for key in itertools.islice(order, EVICTION_SAMPLE + 1):
+            if key == keep:
+                continue
+            size = self.entries[key].size
+            if size > largest:
+                victim, largest = key, size
+        return victim
+
+    def invalidate_tags(self, tags: Set[str]) -> int:
+        removed = 0
+        # Set intersection walks the smaller side, usually far fewer than len(tags)
+        for tag in tags.intersection(self.by_tag):
+            keys = self.by_tag.get(tag)
+            if keys:
+                # Removing the entries empties and drops this set
+                members = list(keys)
+                for key in members:
+                    self.remove(key)
+                removed += len(members)
+        self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.by_namespace.clear()
+        self.by_tag.clear()
+        self.namespace_bytes.clear()
+        self.bytes = 0
+        self.wheel.clear()
+        if self.policy is not None:
+            self.policy.clear()
+        self.hits = self.misses = self.sets = 0
+        self.evictions = self.expirations = self.invalidations = 0
+
+
+class _PendingLoad:
+    """A load in progress that other threads wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MemoryCache:
+    """Thread-safe TTL + LRU cache, optionally lock-striped into segments.
+
+    Besides the entry count, the approximate bytes held can be bounded in
+    total (``max_bytes``) and per namespace (``namespace_budgets``). Entry
+    costs come from ``sizer``. A write that goes over a byte budget evicts,
+    among the least recently used entries, the costliest first.
+
+    ``eviction_policy="tinylfu"`` replaces plain LRU for the count limit
+    with W-TinyLFU admission (see ``src.performance.tinylfu``), which keeps
+    frequently used keys through scans and one-off lookups.
+
+    Entries can carry tags (product ids, brand, tenant, face shape);
+    ``invalidate_tags`` removes every entry with any of the given tags
+    through a per-segment tag index that eviction and expiry keep current.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        default_ttl: Optional[float] = 300,
+        segments: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        expiry_resolution: float = 0.1,
+        max_bytes: Optional[int] = None,
+        namespace_budgets: Optional[Dict[str, int]] = None,
+        sizer: Callable[[Any], int] = estimate_size,
+        eviction_policy: str = "lru",
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if segments < 1:
+            raise ValueError("segments must be at least 1")
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction_policy!r}; expected one of {EVICTION_POLICIES}")
+        segments = min(segments, max_size)
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.eviction_policy = eviction_policy
+        self.max_bytes = max_bytes
+        self.namespace_budgets: Dict[str, int] = dict(namespace_budgets or {})
+        self._sizer = sizer
+        self._clock = clock
+        base, extra = divmod(max_size, segments)
+        now = clock()
+        self._segments: List[_Segment] = []
+        for i in range(segments):
+            capacity = base + (i < extra)
+            policy = WTinyLFUPolicy(capacity) if eviction_policy == "tinylfu" else None
+            self._segments.append(_Segment(capacity, TimerWheel(expiry_resolution, start=now), policy))
+        # Segment the next time-sliced expiry pass starts from
+        self._expiry_cursor = 0
+        self._loading: Dict[Hashable, _PendingLoad] = {}
+        self._loading_lock = threading.Lock()
+        self.loads = self.coalesced_loads = self.load_failures = 0
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    def _segment(self, key: Hashable) -> _Segment:
+        return self._segments[hash(key) % len(self._segments)]
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.default_ttl if ttl is None else ttl
+        return None if ttl is None else self._clock() + ttl
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        key = make_key(key)
+        segment = self._segment(key)
+        with segment.lock:
+            if segment.policy is not None:
+                segment.policy.record(key)
+            entry = segment.entries.get(key)
+            if entry is None:
+                segment.misses += 1
+                return default
+            if entry.expires_at is not None and entry.expires_at <= self._clock():
+                segment.remove(key)
+                segment.expirations += 1
+                segment.misses += 1
+                return default
+            segment.touch(key, entry)
+            segment.hits += 1
+            return entry.value
+
+    def peek(self, key: Any, default: Any = None) -> Any:
+        """Unexpired value for ``key`` without touching LRU order, policy or stats."""
+        key = make_key(key)
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.get(key)
+            if entry is None or (entry.expires_at is not None and entry.expires_at <= self._clock()):
+                return default
+            return entry.value
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Store ``value``; returns False if it is larger than its byte budget."""
+        namespace = namespace or namespace_of(key)
+        key = make_key(key)
+        position = hash(key) % len(self._segments)
+        segment = self._segments[position]
+        entry = CacheEntry(
+            value, self._expires_at(ttl), self._sizer(value), namespace, tuple(set(tags)) if tags else ()
+        )
+        budget = self.namespace_budgets.get(namespace)
+        if (self.max_bytes is not None and entry.size > self.max_bytes) or (
+            budget is not None and entry.size > budget
+        ):
+            with segment.lock:
+                segment.remove(key)
+            return False
+        with segment.lock:
+            segment.insert(key, entry)
+            segment.sets += 1
+        if self.max_bytes is not None or budget is not None:
+            self._enforce_budgets(namespace, budget, position, key)
+        return True
+
+    def get_or_load(
+        self,
+        key: Any,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """Cached value for ``key``, calling ``loader`` once for concurrent misses.
+
+        Threads that miss while another thread loads the same key wait for
+        its result instead of calling ``loader`` themselves. A failed load
+        is raised in every waiting thread and nothing is cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        hashed = make_key(key)
+        with self._loading_lock:
+            existing = self._loading.get(hashed)
+            if existing is None:
+                pending = self._loading[hashed] = _PendingLoad()
+                self.loads += 1
+            else:
+                pending = existing
+                self.coalesced_loads += 1
+        if existing is not None:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+        try:
+            value = loader()
+        except BaseException as e:
+            pending.error = e
+            with self._loading_lock:
+                self.load_failures += 1
+            raise
+        else:
+            self.set(key, value, ttl, namespace, tags)
+            pending.value = value
+            return value
+        finally:
+            with self._loading_lock:
+                del self._loading[hashed]
+            pending.done.set()
+
+    def _enforce_budgets(self, namespace: str, budget: Optional[int], position: int, keep: Hashable) -> None:
+        """Evict until the byte budgets hold, starting in the writer's segment.
+
+        Totals are read without the other segments' locks, so concurrent
+        writers can leave a budget briefly and slightly exceeded.
+        """
+        namespace_excess = self.namespace_bytes(namespace) - budget if budget is not None else 0
+        total_excess = self.bytes() - self.max_bytes if self.max_bytes is not None else 0
+        count = len(self._segments)
+        for step in range(count):
+            if namespace_excess <= 0 and total_excess <= 0:
+                return
+            segment = self._segments[(position + step) % count]
+            with segment.lock:
+                while namespace_excess > 0 or total_excess > 0:
+                    victim = None
+                    if namespace_excess > 0:
+                        victim = segment.victim(segment.by_namespace.get(namespace, ()), keep)
+                    if victim is None and total_excess > 0:
+                        victim = segment.victim(segment.entries, keep)
+                    if victim is None:
+                        break
+                    evicted = segment.evict(victim)
+                    if evicted is None:
+                        break
+                    total_excess -= evicted.size
+                    if evicted.namespace == namespace:
+                        namespace_excess -= evicted.size
+
+    def delete(self, key: Any) -> bool:
+        key = make_key(key)
+        segment = self._segment(key)
+        with segment.lock:
+            return segment.remove(key) is not None
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying any of ``tags``; returns how many were removed."""
+        tag_set = tags if isinstance(tags, set) else set(tags)
+        removed = 0
+        for segment in self._segments:
+            with segment.lock:
+                removed += segment.invalidate_tags(tag_set)
+        return removed
+
+    def tagged(self, tag: str) -> List[Hashable]:
+        """Keys currently carrying ``tag``."""
+        keys: List[Hashable] = []
+        for segment in self._segments:
+            with segment.lock:
+                keys.extend(segment.by_tag.get(tag, ()))
+        return keys
+
+    def __contains__(self, key: Any) -> bool:
+        key = make_key(key)
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.get(key)
+            return entry is not None and (entry.expires_at is None or entry.expires_at > self._clock())
+
+    def __len__(self) -> int:
+        # Read without the segment locks: approximate while writers are active
+        return sum(len(segment.entries) for segment in self._segments)
+
+    def bytes(self) -> int:
+        """Approximate bytes held by all entries."""
+        return sum(segment.bytes for segment in self._segments)
+
+    def namespace_bytes(self, namespace: str) -> int:
+        return sum(segment.namespace_bytes.get(namespace, 0) for segment in self._segments)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        for segment in self._segments:
+            with segment.lock:
+                segment.clear()
+
+    def expire(self, time_budget: Optional[float] = None, batch: int = EXPIRY_BATCH) -> Tuple[int, bool]:
+        """Remove entries whose TTL has passed.
+
+        Each segment lock is held for at most ``batch`` keys at a time. With
+        a ``time_budget`` (seconds) the pass stops once it is used up and
+        the next pass resumes at the segment it stopped in. Returns the
+        number removed and whether everything due has been removed.
+        """
+        removed = 0
+        now = self._clock()
+        started = time.perf_counter()
+        count = len(self._segments)
+        for step in range(count):
+            position = (self._expiry_cursor + step) % count
+            segment = self._segments[position]
+            while True:
+                with segment.lock:
+                    keys = segment.wheel.expire(now, batch)
+                    for key in keys:
+                        entry = segment.entries.get(key)
+                        if entry is None or entry.expires_at is None:
+                            continue
+                        if entry.expires_at > now:
+                            # Not due after all; keep a timer so it still expires
+                            segment.wheel.schedule(key, entry.expires_at)
+                            continue
+                        segment.remove(key)
+                        segment.expirations += 1
+                        removed += 1
+                    more = segment.wheel.has_due(now)
+                if time_budget is not None and time.perf_counter() - started >= time_budget:
+                    self._expiry_cursor = position if more else (position + 1) % count
+                    finished = not more and all(
+                        not other.wheel.has_due(now) for other in self._segments
+                    )
+                    return removed, finished
+                if not more:
+                    break
+        return removed, True
+
+    def cleanup_expired(self) -> int:
+        """Remove all expired entries; returns how many were removed."""
+        return self.expire()[0]
+
+    def scheduled_expiries(self) -> int:
+        return sum(len(segment.wheel) for segment in self._segments)
+
+    def get_stats(self) -> CacheStats:
+        hits = misses = sets = evictions = expirations = rejections = invalidations = 0
+        tags: Set[str] = set()
+        usage: Dict[str, Tuple[int, int]] = {}
+        for segment in self._segments:
+            hits += segment.hits
+            misses += segment.misses
+            sets += segment.sets
+            evictions += segment.evictions
+            expirations += segment.expirations
+            invalidations += segment.invalidations
+            if segment.policy is not None:
+                rejections += segment.policy.rejections
+            with segment.lock:
+                tags.update(segment.by_tag)
+                for namespace, order in segment.by_namespace.items():
+                    entries, size = usage.get(namespace, (0, 0))
+                    usage[namespace] = (entries + len(order), size + segment.namespace_bytes[namespace])
+        namespaces = {
+            namespace: {"entries": entries, "bytes": size, "budget": self.namespace_budgets.get(namespace)}
+            for namespace, (entries, size) in usage.items()
+        }
+        lookups = hits + misses
+        return CacheStats(
+            size=len(self),
+            max_size=self.max_size,
+            bytes=self.bytes(),
+            max_bytes=self.max_bytes,
+            namespaces=namespaces,
+            segments=len(self._segments),
+            eviction_policy=self.eviction_policy,
+            hits=hits,
+            misses=misses,
+            sets=sets,
+            evictions=evictions,
+            expirations=expirations,
+            admission_rejections=rejections,
+            tag_invalidations=invalidations,
+            tags=len(tags),
+            hit_rate=hits / lookups if lookups else 0.0,
+            loads=self.loads,
+            coalesced_loads=self.coalesced_loads,
+            load_failures=self.load_failures,
+        )
+
+
+class CacheManager:
+    """Async front end to a ``MemoryCache`` with periodic expiry cleanup."""
+
+    def __init__(
+        self,
+        memory_cache_size: int = 1000,
+        default_ttl: Optional[float] = 300,
+        cleanup_interval: float = 1.0,
+        segments: int = 1,
+        expiry_slice: float = 0.002,
+        max_bytes: Optional[int] = None,
+        namespace_budgets: Optional[Dict[str, int]] = None,
+        sizer: Callable[[Any], int] = estimate_size,
+        eviction_policy: str = "lru",
+        redis_client=None,
+        redis_prefix: str = "cache",
+        l1_ttl: float = 5.0,
+        refresh_concurrency: int = 4,
+        refresh_queue_size: int = 1000,
+        refresh_beta: float = 1.0,
+    ):
+        self.memory_cache = MemoryCache(
+            memory_cache_size,
+            default_ttl,
+            segments=segments,
+            max_bytes=max_bytes,
+            namespace_budgets=namespace_budgets,
+            sizer=sizer,
+            eviction_policy=eviction_policy,
+        )
+        self.default_ttl = default_ttl
+        self.cleanup_interval = cleanup_interval
+        # Longest a single expiry slice may run before yielding the event loop
+        self.expiry_slice = expiry_slice
+        self._cleanup_task: Optional[asyncio.Task] = None
+        # Loads in flight, shared by every coroutine that misses the same key
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.loads = self.coalesced_loads = self.load_failures = 0
+        # Background refreshes of stale entries; at most refresh_concurrency run loaders at once
+        self.refresh_concurrency = refresh_concurrency
+        self.refresh_queue_size = refresh_queue_size
+        self.refresh_beta = refresh_beta
+        self._refresh_slots = asyncio.Semaphore(refresh_concurrency)
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.stale_hits = self.early_refreshes = self.refreshes = self.refreshes_dropped = 0
+        self.layered: Optional[LayeredCache] = None
+        if redis_client is not None:
+            self.layered = LayeredCache(
+                redis_client, self.memory_cache, prefix=redis_prefix, l1_ttl=l1_ttl, default_ttl=default_ttl
+            )
+
+    async def start(self) -> None:
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.ensure_future(self._cleanup_loop())
+            if self.layered is not None:
+                await self.layered.start()
+
+    async def stop(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            await asyncio.gather(self._cleanup_task, return_exceptions=True)
+            self._cleanup_task = None
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        if self.layered is not None:
+            await self.layered.stop()
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            removed = 0
+            try:
+                finished = False
+                while not finished:
+                    count, finished = self.memory_cache.expire(time_budget=self.expiry_slice)
+                    removed += count
+                    if not finished:
+                        await asyncio.sleep(0)
+            except Exception as e:
+                logger.warning(f"Cache cleanup failed: {e}")
+            if removed:
+                logger.debug(f"Removed {removed} expired cache entries")
+
+    def _cleanup_cache(self) -> int:
+        return self.memory_cache.cleanup_expired()
+
+    async def _force_cleanup(self) -> int:
+        return self._cleanup_cache()
+
+    async def get(self, key: Any, default: Any = None) -> Any:
+        if self.layered is not None:
+            return await self.layered.get(str(make_key(key)), default)
+        return self.memory_cache.get(key, default)
+
+    async def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        if self.layered is not None:
+            await self.layered.set(str(make_key(key)), value, ttl, namespace, tags)
+            return True
+        return self.memory_cache.set(key, value, ttl, namespace, tags)
+
+    async def delete(self, key: Any) -> bool:
+        if self.layered is not None:
+            return await self.layered.delete(str(make_key(key)))
+        return self.memory_cache.delete(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying any of ``tags`` (e.g. ``product:<id>``)."""
+        if self.layered is not None:
+            return await self.layered.invalidate_tags(tags)
+        return self.memory_cache.invalidate_tags(tags)
+
+    async def clear(self) -> None:
+        """Drop the in-process entries; a shared Redis tier is left alone."""
+        self.memory_cache.clear()
+
+    async def get_or_set(self, key: Any, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Cached value for ``key``, calling ``factory`` (sync or async) on a miss."""
+        value = await self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = factory()
+        if inspect.isawaitable(value):
+            value = await value
+        await self.set(key, value, ttl)
+        return value
+
+    async def get_or_load(
+        self,
+        key: Any,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        soft_ttl: Optional[float] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """Cached value for ``key``, running ``loader`` (sync or async) once per miss.
+
+        Coroutines that miss while a load of the same key is in flight await
+        that load instead of starting their own. If it fails, every waiter
+        gets the exception and nothing is cached.
+
+        With ``soft_ttl`` the entry goes stale after ``soft_ttl`` seconds but
+        is kept until ``ttl``. Stale values are returned at once while the
+        loader runs in the background. Reads shortly before the soft expiry
+        may also start an early refresh, with a probability that rises as
+        the expiry gets closer and as the loader gets slower (XFetch). Keys
+        loaded with ``soft_ttl`` must always be read this way, and
+        ``soft_ttl`` must be shorter than the entry's TTL.
+        """
+        if soft_ttl is not None:
+            hard_ttl = self.default_ttl if ttl is None else ttl
+            if hard_ttl is not None and soft_ttl >= hard_ttl:
+                raise ValueError(f"soft_ttl ({soft_ttl}) must be shorter than ttl ({hard_ttl})")
+        cached = await self.get(key, _MISSING)
+        if cached is not _MISSING:
+            if soft_ttl is None:
+                return cached
+            value, refresh_at, load_time = cached
+            now = time.time()
+            if now >= refresh_at:
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader, ttl, namespace, soft_ttl, tags)
+            elif self.refresh_beta > 0 and now - load_time * self.refresh_beta * math.log(
+                random.random() or sys.float_info.min
+            ) >= refresh_at:
+                self.early_refreshes += 1
+                self._schedule_refresh(key, loader, ttl, namespace, soft_ttl, tags)
+            return value
+        hashed = make_key(key)
+        future = self._inflight.get(hashed)
+        if future is not None:
+            self.coalesced_loads += 1
+            # Shielded so a cancelled waiter does not cancel the load for the others
+            return await asyncio.shield(future)
+        future = self._inflight[hashed] = asyncio.get_running_loop().create_future()
+        self.loads += 1
+        return await self._load(key, hashed, future, loader, ttl, namespace, soft_ttl, tags)
+
+    async def _load(
+        self,
+        key: Any,
+        hashed: Hashable,
+        future: asyncio.Future,
+        loader: Callable[[], Any],
+        ttl: Optional[float],
+        namespace: Optional[str],
+        soft_ttl: Optional[float],
+        tags: Optional[Iterable[str]],
+    ) -> Any:
+        """Run ``loader`` for the load registered as ``future`` and store the result."""
+        try:
+            started = time.perf_counter()
+            value = loader()
+            if inspect.isawaitable(value):
+                value = await value
+            if soft_ttl is None:
+                await self.set(key, value, ttl, namespace, tags)
+            else:
+                load_time = time.perf_counter() - started
+                await self.set(key, (value, time.time() + soft_ttl, load_time), ttl, namespace, tags)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.load_failures += 1
+            future.set_exception(e)
+            # Mark retrieved: with no waiters the exception only reaches our caller
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[hashed]
+
+    def _schedule_refresh(
+        self,
+        key: Any,
+        loader: Callable[[], Any],
+        ttl: Optional[float],
+        namespace: Optional[str],
+        soft_ttl: Optional[float],
+        tags: Optional[Iterable[str]],
+    ) -> None:
+        hashed = make_key(key)
+        if hashed in self._inflight:
+            return
+        if len(self._refresh_tasks) >= self.refresh_queue_size:
+            # The stale value keeps being served until its hard TTL
+            self.refreshes_dropped += 1
+            return
+        future = self._inflight[hashed] = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(self._refresh(key, hashed, future, loader, ttl, namespace, soft_ttl, tags))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: Any, hashed: Hashable, future: asyncio.Future, *args) -> None:
+        try:
+            async with self._refresh_slots:
+                await self._load(key, hashed, future, *args)
+            self.refreshes += 1
+        except asyncio.CancelledError:
+            if not future.done():
+                # Cancelled while waiting for a slot
+                future.cancel()
+                del self._inflight[hashed]
+            raise
+        except Exception as e:
+            logger.warning(f"Background refresh of cache key {key} failed: {e}")
+
+    def get_stats(self) -> CacheStats:
+        stats = self.memory_cache.get_stats()
+        stats["loads"] += self.loads
+        stats["coalesced_loads"] += self.coalesced_loads
+        stats["load_failures"] += self.load_failures
+        stats.update(
+            stale_hits=self.stale_hits,
+            early_refreshes=self.early_refreshes,
+            refreshes=self.refreshes,
+            refreshes_dropped=self.refreshes_dropped,
+            refreshes_pending=len(self._refresh_tasks),
+        )
+        if self.layered is not None:
+            stats["layered"] = self.layered.get_stats()
+        return stats
+
+    @staticmethod
+    def compatibility_key(face_shape: str, min_compatibility: float, limit: int) -> str:
+        return f"products:compatibility:{face_shape}:{min_compatibility}:{limit}"
+
+    @staticmethod
+    def compatibility_tags(face_shape: str, results: List[Dict[str, Any]]) -> Set[str]:
+        """Tags for a compatibility listing: its face shape and each listed product and brand."""
+        tags = {f"face_shape:{face_shape}"}
+        for product in results:
+            for field, prefix in PRODUCT_TAG_FIELDS:
+                if product.get(field) is not None:
+                    tags.add(f"{prefix}:{product[field]}")
+        return tags
+
+    async def cache_product_compatibility(
+        self,
+        face_shape: str,
+        min_compatibility: float,
+        limit: int,
+        results: List[Dict[str, Any]],
+        ttl: float = COMPATIBILITY_TTL,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Cache a listing, tagged so updating any product in it can invalidate it.
+
+        Extra ``tags`` (e.g. ``tenant:<id>``) are added to the automatic ones.
+        """
+        tags = self.compatibility_tags(face_shape, results).union(tags or ())
+        await self.set(self.compatibility_key(face_shape, min_compatibility, limit), results, ttl, tags=tags)
+
+    async def get_cached_product_compatibility(
+        self, face_shape: str, min_compatibility: float, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        return await self.get(self.compatibility_key(face_shape, min_compatibility, limit))
+
+    async def cache_face_analysis(
+        self, session_id: str, analysis: Dict[str, Any], ttl: float = FACE_ANALYSIS_TTL
+    ) -> None:
+        await self.set(f"face_analysis:{session_id}", analysis, ttl)
+
+    async def get_cached_face_analysis(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self.get(f"face_analysis:{session_id}")
+
+
+class CacheContext:
+    """``async with CacheContext() as cache_manager``: a started manager, stopped on exit."""
+
+    def __init__(self, **kwargs):
+        self.cache_manager = CacheManager(**kwargs)
+
+    async def __aenter__(self) -> CacheManager:
+        await self.cache_manager.start()
+        return self.cache_manager
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.cache_manager.stop()
+
+
+_caches: Dict[str, MemoryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str = "default", max_size: int = 1000, default_ttl: Optional[float] = 300) -> MemoryCache:
+    """The named process-wide cache, created on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = MemoryCache(max_size, default_ttl)
+        return cache
+
+
+def create_ultra_high_performance_cache(
+    name: str,
+    max_size: int = 50000,
+    default_ttl: Optional[float] = 3600,
+    segments: int = DEFAULT_SEGMENTS,
+) -> MemoryCache:
+    """Create and register a lock-striped cache for many concurrent threads."""
+    cache = MemoryCache(max_size, default_ttl, segments=segments)
+    with _caches_lock:
+        _caches[name] = cache
+    return cache
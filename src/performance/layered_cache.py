@@ -0,0 +1,474 @@
+"""
+Two-tier cache: a process-local ``MemoryCache`` (L1) in front of Redis (L2).
+
+Every instance reads through its own L1 and falls back to the shared L2,
+so a value computed by one Cloud Run instance is served to all of them.
+Values are stored in Redis in a compact binary form: MessagePack when
+available (JSON otherwise) behind a one-byte format header, zlib-compressed
+above a size threshold. ``datetime``, ``date``, ``Decimal``, ``set`` and
+``frozenset`` are tagged on the way in and restored on the way out, so they
+read back from Redis as the type that was stored. Other types the
+serializer writes natively come back in their JSON form (tuples as lists);
+a value it cannot encode at all is kept in L1 only.
+
+Writes and deletes go through a Lua script that bumps a global version
+counter, updates the entry and publishes ``<version>:<key>`` on the
+invalidation channel in one step. Subscribers drop L1 copies older than
+the published version; a read that raced with an invalidation does not
+refill L1 with the older value. L1 entries live only ``l1_ttl`` seconds, which
+bounds staleness if a message is lost, and L1 is cleared whenever the
+subscription is re-established.
+
+Tagged entries are also added to a Redis set per tag; overwrites and
+deletes take the key out of the sets it no longer belongs to, and writes
+prune a few expired members from the sets they touch. Invalidating tags
+deletes their entries and publishes an invalidation for each key, all in
+one script. Those scripts touch keys they are not passed, so the Redis tier
+needs a single node (or all ``prefix`` keys in one cluster slot).
+
+The Redis client must be created with ``decode_responses=False``.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from redis.exceptions import NoScriptError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None  # type: ignore[assignment]
+    HAS_MSGPACK = False
+    logger.info("msgpack not installed, the Redis cache tier will store JSON")
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    HAS_ORJSON = False
+
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+FLAG_ZLIB = 0x80
+# The body contains tagged values that decode() must restore
+FLAG_TAGGED = 0x40
+
+SET_SCRIPT = """
+local version = redis.call('INCR', KEYS[2])
+local ttl = tonumber(ARGV[2])
+local tags = {}
+for i = 8, #ARGV do
+    tags[ARGV[i]] = true
+end
+-- An overwrite drops the key from the tag sets it no longer carries
+local previous = redis.call('HGET', KEYS[1], 't')
+if previous then
+    for tag in string.gmatch(previous, '[^\\n]+') do
+        if not tags[tag] then
+            redis.call('SREM', ARGV[5] .. tag, ARGV[4])
+        end
+    end
+end
+redis.call('HSET', KEYS[1], 'v', version, 'd', ARGV[1], 't', ARGV[6])
+if ttl > 0 then
+    redis.call('PEXPIRE', KEYS[1], ttl)
+else
+    redis.call('PERSIST', KEYS[1])
+end
+for i = 8, #ARGV do
+    local tag_key = ARGV[5] .. ARGV[i]
+    local fresh = redis.call('EXISTS', tag_key) == 0
+    redis.call('SADD', tag_key, ARGV[4])
+    -- Expired entries stay in their tag sets; prune a few members per write
+    for _, member in ipairs(redis.call('SRANDMEMBER', tag_key, 2)) do
+        if redis.call('EXISTS', ARGV[7] .. member) == 0 then
+            redis.call('SREM', tag_key, member)
+        end
+    end
+    -- A tag set lives as long as its longest-lived entry
+    if ttl <= 0 then
+        redis.call('PERSIST', tag_key)
+    elseif fresh then
+        redis.call('PEXPIRE', tag_key, ttl)
+    else
+        local current = redis.call('PTTL', tag_key)
+        if current >= 0 and current < ttl then
+            redis.call('PEXPIRE', tag_key, ttl)
+        end
+    end
+end
+redis.call('PUBLISH', ARGV[3], version .. ':' .. ARGV[4])
+return version
+"""
+
+DELETE_SCRIPT = """
+local version = redis.call('INCR', KEYS[2])
+local tags = redis.call('HGET', KEYS[1], 't')
+if tags then
+    for tag in string.gmatch(tags, '[^\\n]+') do
+        redis.call('SREM', ARGV[3] .. tag, ARGV[2])
+    end
+end
+local deleted = redis.call('DEL', KEYS[1])
+redis.call('PUBLISH', ARGV[1], version .. ':' .. ARGV[2])
+return {version, deleted}
+"""
+
+INVALIDATE_TAGS_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+local removed = 0
+for i = 4, #ARGV do
+    local tag_key = ARGV[3] .. ARGV[i]
+    for _, key in ipairs(redis.call('SMEMBERS', tag_key)) do
+        removed = removed + redis.call('DEL', ARGV[2] .. key)
+        redis.call('PUBLISH', ARGV[1], version .. ':' .. key)
+    end
+    redis.call('DEL', tag_key)
+end
+return {version, removed}
+"""
+
+# Tags per INVALIDATE_TAGS_SCRIPT call, so one call cannot block Redis for long
+TAG_BATCH = 1000
+
+_MISSING = object()
+
+
+# Key of the single-entry map standing in for a tagged value
+TYPE_TAG = "\x00cache:type"
+
+# name -> (type, to a serializable value, back from it)
+_TAGGED_TYPES: Dict[str, Tuple[type, Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "datetime": (datetime, datetime.isoformat, datetime.fromisoformat),
+    "date": (date, date.isoformat, date.fromisoformat),
+    "decimal": (Decimal, str, Decimal),
+    "set": (set, list, set),
+    "frozenset": (frozenset, list, frozenset),
+}
+
+
+class _Tagger:
+    """``default`` hook tagging the types in ``_TAGGED_TYPES``."""
+
+    def __init__(self):
+        self.used = False
+
+    def __call__(self, obj: Any) -> Any:
+        # Exact types only, so a subclass is not silently read back as its base
+        for name, (cls, dump, _) in _TAGGED_TYPES.items():
+            if type(obj) is cls:
+                self.used = True
+                return {TYPE_TAG: [name, dump(obj)]}
+        raise TypeError(f"Object of type {type(obj).__name__} cannot be cached in Redis")
+
+
+def _untag(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_untag(item) for item in value]
+    if isinstance(value, dict):
+        if len(value) == 1 and TYPE_TAG in value:
+            name, data = value[TYPE_TAG]
+            return _TAGGED_TYPES[name][2](_untag(data))
+        return {key: _untag(item) for key, item in value.items()}
+    return value
+
+
+def encode(value: Any, compress_threshold: int = 1024) -> bytes:
+    """Serialize ``value`` behind a one-byte format header.
+
+    Raises TypeError (or the serializer's own error) for values that cannot
+    be stored.
+    """
+    tagger = _Tagger()
+    if HAS_MSGPACK:
+        body = msgpack.packb(value, use_bin_type=True, default=tagger)
+        fmt = FORMAT_MSGPACK
+    elif HAS_ORJSON:
+        # Route dates and dataclasses through the tagger instead of orjson's own lossy encoding
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        body = orjson.dumps(value, default=tagger, option=option)
+        fmt = FORMAT_JSON
+    else:
+        body = json.dumps(value, default=tagger, separators=(",", ":")).encode()
+        fmt = FORMAT_JSON
+    if tagger.used:
+        fmt |= FLAG_TAGGED
+    if len(body) >= compress_threshold:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            body = compressed
+            fmt |= FLAG_ZLIB
+    return bytes((fmt,)) + body
+
+
+def decode(payload: bytes) -> Any:
+    fmt = payload[0]
+    body = payload[1:]
+    if fmt & FLAG_ZLIB:
+        body = zlib.decompress(body)
+        fmt &= ~FLAG_ZLIB
+    tagged = fmt & FLAG_TAGGED
+    fmt &= ~FLAG_TAGGED
+    if fmt == FORMAT_MSGPACK:
+        if not HAS_MSGPACK:
+            raise ValueError("Cached value is MessagePack but msgpack is not installed")
+        value = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    elif fmt == FORMAT_JSON:
+        value = orjson.loads(body) if HAS_ORJSON else json.loads(body)
+    else:
+        raise ValueError(f"Unknown cache payload format {fmt:#x}")
+    return _untag(value) if tagged else value
+
+
+async def _eval(redis_client, script: str, sha: str, keys: Sequence[str], *args):
+    try:
+        return await redis_client.evalsha(sha, len(keys), *keys, *args)
+    except NoScriptError:
+        return await redis_client.eval(script, len(keys), *keys, *args)
+
+
+class LayeredCache:
+    """L1 ``MemoryCache`` over a shared Redis tier with pub/sub invalidation."""
+
+    def __init__(
+        self,
+        redis_client,
+        l1,
+        prefix: str = "cache",
+        l1_ttl: float = 5.0,
+        default_ttl: Optional[float] = 300,
+        compress_threshold: int = 1024,
+        recent_invalidations: int = 10000,
+    ):
+        self.redis = redis_client
+        self.l1 = l1
+        self.prefix = prefix
+        self.l1_ttl = l1_ttl
+        self.default_ttl = default_ttl
+        self.compress_threshold = compress_threshold
+        self.channel = f"{prefix}:invalidate"
+        self.version_key = f"{prefix}:version"
+        self._set_sha = hashlib.sha1(SET_SCRIPT.encode()).hexdigest()
+        self._delete_sha = hashlib.sha1(DELETE_SCRIPT.encode()).hexdigest()
+        self._tags_sha = hashlib.sha1(INVALIDATE_TAGS_SCRIPT.encode()).hexdigest()
+        # Latest invalidated version per key, so racing reads don't refill L1 with older values
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._recent_invalidations = recent_invalidations
+        self._task: Optional[asyncio.Task] = None
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.l2_errors = 0
+        self.l1_only = 0
+        self.invalidations_received = 0
+        self.stale_fills_skipped = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:entry:{key}"
+
+    @property
+    def _entry_prefix(self) -> str:
+        return f"{self.prefix}:entry:"
+
+    @property
+    def _tag_prefix(self) -> str:
+        return f"{self.prefix}:tag:"
+
+    def _l1_ttl(self, ttl: Optional[float]) -> float:
+        return self.l1_ttl if ttl is None else min(self.l1_ttl, ttl)
+
+    def _fill(
+        self,
+        key: str,
+        version: int,
+        value: Any,
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        if self._invalidated.get(key, 0) > version:
+            self.stale_fills_skipped += 1
+            return
+        self.l1.set(key, (version, value), self._l1_ttl(ttl), namespace, tags)
+
+    def _note_invalidation(self, key: str, version: int) -> None:
+        if self._invalidated.get(key, 0) < version:
+            self._invalidated[key] = version
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self._recent_invalidations:
+            self._invalidated.popitem(last=False)
+
+    def invalidate_local(self, key: str, version: int) -> bool:
+        """Apply an invalidation: drop the L1 copy if it is older than ``version``."""
+        self._note_invalidation(key, version)
+        cached = self.l1.peek(key, _MISSING)
+        if cached is not _MISSING and cached[0] < version:
+            return self.l1.delete(key)
+        return False
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        cached = self.l1.get(key, _MISSING)
+        if cached is not _MISSING:
+            self.l1_hits += 1
+            return cached[1]
+        try:
+            version, payload, tags = await self.redis.hmget(self._redis_key(key), "v", "d", "t")
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Redis cache read failed for {key}: {e}")
+            self.misses += 1
+            return default
+        if payload is None:
+            self.misses += 1
+            return default
+        try:
+            value = decode(payload)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Redis cache entry {key} cannot be decoded: {e}")
+            self.misses += 1
+            return default
+        self.l2_hits += 1
+        self._fill(key, int(version), value, tags=tags.decode().split("\n") if tags else None)
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        namespace: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> int:
+        """Store ``value`` in both tiers; returns its version.
+
+        The version is 0 when the value only went to L1, because Redis
+        failed or the value cannot be encoded.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        tags = sorted(set(tags)) if tags else []
+        try:
+            payload = encode(value, self.compress_threshold)
+        except Exception as e:
+            self.l1_only += 1
+            logger.warning(f"Caching {key} in L1 only, value cannot be encoded: {e}")
+            self._fill(key, 0, value, ttl, namespace, tags)
+            return 0
+        ttl_ms = int(ttl * 1000) if ttl is not None else 0
+        try:
+            version = int(await _eval(
+                self.redis, SET_SCRIPT, self._set_sha,
+                (self._redis_key(key), self.version_key), payload, ttl_ms, self.channel, key,
+                self._tag_prefix, "\n".join(tags), self._entry_prefix, *tags,
+            ))
+        except Exception as e:
+            # Keep serving it locally; any invalidation will replace a version-0 copy
+            self.l2_errors += 1
+            logger.warning(f"Redis cache write failed for {key}: {e}")
+            version = 0
+        self._fill(key, version, value, ttl, namespace, tags)
+        return version
+
+    async def delete(self, key: str) -> bool:
+        local = self.l1.delete(key)
+        try:
+            version, deleted = await _eval(
+                self.redis, DELETE_SCRIPT, self._delete_sha,
+                (self._redis_key(key), self.version_key), self.channel, key, self._tag_prefix,
+            )
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Redis cache delete failed for {key}: {e}")
+            return local
+        self._note_invalidation(key, int(version))
+        return local or bool(int(deleted))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Remove entries carrying any of ``tags`` from Redis and every L1.
+
+        Returns the number of Redis entries removed, or of local ones if
+        Redis is unreachable.
+        """
+        tags = sorted(set(tags))
+        local = self.l1.invalidate_tags(tags)
+        removed = 0
+        for start in range(0, len(tags), TAG_BATCH):
+            batch = tags[start:start + TAG_BATCH]
+            try:
+                _, count = await _eval(
+                    self.redis, INVALIDATE_TAGS_SCRIPT, self._tags_sha, (self.version_key,),
+                    self.channel, self._entry_prefix, self._tag_prefix, *batch,
+                )
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning(f"Redis tag invalidation failed: {e}")
+                return local
+            removed += int(count)
+        return removed
+
+    def _handle_message(self, data: Any) -> None:
+        if isinstance(data, bytes):
+            data = data.decode()
+        version, _, key = data.partition(":")
+        try:
+            version = int(version)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation: {data!r}")
+            return
+        self.invalidations_received += 1
+        self.invalidate_local(key, version)
+
+    async def _subscribe(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Messages may have been missed while unsubscribed
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscription lost, retrying: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+    async def start(self) -> None:
+        """Follow invalidations published by other instances."""
+        await self.stop()
+        self._task = asyncio.ensure_future(self._subscribe())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "l2_errors": self.l2_errors,
+            "l1_only": self.l1_only,
+            "invalidations_received": self.invalidations_received,
+            "stale_fills_skipped": self.stale_fills_skipped,
+        }
@@ -0,0 +1,152 @@
+"""
+Hierarchical timing wheel for cache entry expiry.
+
+Deadlines are rounded up to ticks and hashed into one of ``levels`` wheels
+of ``slots`` buckets each: level 0 holds deadlines less than ``slots`` ticks
+away, level 1 less than ``slots ** 2`` and so on. When the current tick
+crosses a boundary of a higher level, that level's bucket is cascaded into
+the lower ones. Advancing the wheel jumps straight to the next occupied
+bucket, so it costs one step per non-empty bucket drained or cascaded plus
+the keys that actually fall due (each key cascades at most ``levels - 1``
+times), independent of both the elapsed time and how many keys are
+scheduled.
+Deadlines beyond the full span are parked in the farthest bucket and
+placed again when it comes up, so no key is handed out before its deadline.
+
+The wheel is not thread-safe; callers hold their own lock.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional
+
+
+class TimerWheel:
+    """Schedules keys by deadline and hands them back once due."""
+
+    def __init__(self, tick: float = 0.1, slots: int = 64, levels: int = 4, start: float = 0.0):
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("TimerWheel needs tick > 0, slots >= 2 and levels >= 1")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        # Ticks covered by one bucket of each level, plus the full span
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[Optional[Dict[Hashable, float]]]] = [[None] * slots for _ in range(levels)]
+        # Key -> the bucket currently holding it, for O(1) cancel
+        self._where: Dict[Hashable, Dict[Hashable, float]] = {}
+        # Buckets whose tick has passed, drained by expire()
+        self._due: Deque[Dict[Hashable, float]] = deque()
+        # Next tick to process
+        self._current = int(start // tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """(Re)schedule ``key`` to fall due at ``deadline``."""
+        self.cancel(key)
+        self._place(key, deadline)
+
+    def cancel(self, key: Hashable) -> bool:
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        del bucket[key]
+        return True
+
+    def clear(self) -> None:
+        for wheel in self._wheels:
+            wheel[:] = [None] * self.slots
+        self._where.clear()
+        self._due.clear()
+
+    def _place(self, key: Hashable, deadline: float) -> None:
+        due_tick = max(-int(-deadline // self.tick), self._current)
+        delta = due_tick - self._current
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                break
+        else:
+            # Beyond the wheel: park in the farthest bucket, re-placed when cascaded
+            due_tick = self._current + self._spans[self.levels] - 1
+        wheel = self._wheels[level]
+        index = (due_tick // self._spans[level]) % self.slots
+        bucket = wheel[index]
+        if bucket is None:
+            bucket = wheel[index] = {}
+        bucket[key] = deadline
+        self._where[key] = bucket
+
+    def _cascade(self, level: int) -> None:
+        wheel = self._wheels[level]
+        index = (self._current // self._spans[level]) % self.slots
+        bucket = wheel[index]
+        if bucket is None:
+            return
+        wheel[index] = None
+        for key, deadline in bucket.items():
+            self._place(key, deadline)
+
+    def _next_event(self, target: int) -> Optional[int]:
+        """First tick in ``[_current, target]`` with a non-empty bucket to drain or cascade."""
+        best = None
+        for level in range(self.levels):
+            span = self._spans[level]
+            wheel = self._wheels[level]
+            tick = -(-self._current // span) * span
+            # Every bucket of a level comes up within ``slots`` of its boundaries
+            for _ in range(self.slots):
+                if tick > target or (best is not None and tick >= best):
+                    break
+                if wheel[(tick // span) % self.slots]:
+                    best = tick
+                    break
+                tick += span
+        return best
+
+    def advance(self, now: float) -> None:
+        """Move every bucket whose tick is at or before ``now`` to the due queue."""
+        target = int(now // self.tick)
+        while self._where and self._current <= target:
+            # Jump over ticks with nothing to drain or cascade
+            tick = self._next_event(target)
+            if tick is None:
+                break
+            self._current = tick
+            # Highest level first, so keys it cascades into lower buckets that
+            # are themselves cascaded at this tick are not left behind
+            for level in range(self.levels - 1, 0, -1):
+                if self._current % self._spans[level] == 0:
+                    self._cascade(level)
+            index = self._current % self.slots
+            bucket = self._wheels[0][index]
+            if bucket:
+                self._due.append(bucket)
+                self._wheels[0][index] = None
+            self._current += 1
+        self._current = max(self._current, target + 1)
+
+    def expire(self, now: float, limit: Optional[int] = None) -> List[Hashable]:
+        """Remove and return up to ``limit`` keys whose deadline has passed."""
+        self.advance(now)
+        expired: List[Hashable] = []
+        while self._due and (limit is None or len(expired) < limit):
+            bucket = self._due[0]
+            while bucket and (limit is None or len(expired) < limit):
+                key, deadline = bucket.popitem()
+                del self._where[key]
+                if deadline > now:
+                    # Parked beyond a single-level wheel's span; not due yet
+                    self._place(key, deadline)
+                    continue
+                expired.append(key)
+            if not bucket:
+                self._due.popleft()
+        return expired
+
+    def has_due(self, now: float) -> bool:
+        """Whether keys may be due at ``now``: due buckets or unprocessed ticks."""
+        return any(self._due) or (bool(self._where) and self._current <= int(now // self.tick))
@@ -0,0 +1,148 @@
+"""
+W-TinyLFU admission and eviction for ``MemoryCache``.
+
+New keys enter a small window LRU (about 1% of capacity). A key pushed out
+of the window only gets into the main region if a count-min sketch says it
+is used more often than the main region's eviction victim; otherwise the
+newcomer itself is dropped. The main region is a segmented LRU: keys start
+in probation and move to the protected part on their next hit.
+
+Scans and one-off lookups therefore pass through the window without
+flushing the frequently used keys. The sketch counters are halved every
+``10 * capacity`` increments, so past popularity fades.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Odd 64-bit multipliers, one per sketch row
+_S0, _S1, _S2, _S3 = 0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93
+_ROWS = 4
+_MASK64 = (1 << 64) - 1
+_MAX_COUNT = 15
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class CountMinSketch:
+    """Four rows of counters saturating at 15, halved periodically."""
+
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity:
+            width <<= 1
+        self.width = width
+        self._shift = 64 - (width.bit_length() - 1)
+        self._table = bytearray(width * _ROWS)
+        self.sample_size = 10 * max(capacity, 1)
+        self.additions = 0
+
+    def _indexes(self, key: Hashable):
+        # Unrolled: this runs on every lookup
+        h = hash(key) & _MASK64
+        width = self.width
+        shift = self._shift
+        return (
+            ((h * _S0) & _MASK64) >> shift,
+            width + (((h * _S1) & _MASK64) >> shift),
+            2 * width + (((h * _S2) & _MASK64) >> shift),
+            3 * width + (((h * _S3) & _MASK64) >> shift),
+        )
+
+    def increment(self, key: Hashable) -> None:
+        table = self._table
+        a, b, c, d = self._indexes(key)
+        added = False
+        for index in (a, b, c, d):
+            if table[index] < _MAX_COUNT:
+                table[index] += 1
+                added = True
+        if added:
+            self.additions += 1
+            if self.additions >= self.sample_size:
+                self.age()
+
+    def frequency(self, key: Hashable) -> int:
+        table = self._table
+        a, b, c, d = self._indexes(key)
+        return min(table[a], table[b], table[c], table[d])
+
+    def age(self) -> None:
+        """Halve every counter."""
+        self._table = bytearray(self._table.translate(_HALVE))
+        self.additions //= 2
+
+    def clear(self) -> None:
+        self._table = bytearray(len(self._table))
+        self.additions = 0
+
+
+class WTinyLFUPolicy:
+    """Tracks which region each key of one cache segment lives in."""
+
+    WINDOW_SHARE = 0.01
+    PROTECTED_SHARE = 0.8
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.window_capacity = max(1, int(capacity * self.WINDOW_SHARE))
+        self.main_capacity = capacity - self.window_capacity
+        self.protected_capacity = max(1, int(self.main_capacity * self.PROTECTED_SHARE))
+        self.sketch = CountMinSketch(capacity)
+        self.window: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.probation: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.protected: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.rejections = 0
+
+    def __len__(self) -> int:
+        return len(self.window) + len(self.probation) + len(self.protected)
+
+    def record(self, key: Hashable) -> None:
+        """Count a lookup of ``key``, hit or miss."""
+        self.sketch.increment(key)
+
+    def hit(self, key: Hashable) -> None:
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_capacity:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+
+    def add(self, key: Hashable) -> Optional[Hashable]:
+        """Place a new key; returns the key the segment must evict, if any."""
+        self.sketch.increment(key)
+        self.window[key] = None
+        if len(self.window) <= self.window_capacity:
+            return None
+        candidate, _ = self.window.popitem(last=False)
+        if len(self.probation) + len(self.protected) < self.main_capacity:
+            self.probation[candidate] = None
+            return None
+        victims = self.probation or self.protected
+        if not victims:
+            return candidate
+        victim = next(iter(victims))
+        if self.sketch.frequency(candidate) > self.sketch.frequency(victim):
+            del victims[victim]
+            self.probation[candidate] = None
+            return victim
+        self.rejections += 1
+        return candidate
+
+    def discard(self, key: Hashable) -> None:
+        """Forget a key removed from the segment for any other reason."""
+        for region in (self.window, self.probation, self.protected):
+            if key in region:
+                del region[key]
+                return
+
+    def clear(self) -> None:
+        self.window.clear()
+        self.probation.clear()
+        self.protected.clear()
+        self.sketch.clear()
+        self.rejections = 0
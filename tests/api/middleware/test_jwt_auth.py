@@ -134,6 +134,27 @@ class TestJWTAuthMiddleware:
         response = client.get("/protected", headers={"Authorization": "Bearer invalid_jwt_token"})
         assert response.status_code == 401
     
+    def test_repeat_token_served_from_cache(self, client, token_validator, rbac_manager, secret_key):
+        """A token seen before skips validation and RBAC resolution."""
+        user_context = UserContext(
+            user_id="test_user",
+            roles=[Role.CLIENT_USER],
+            tenant_id="test_tenant"
+        )
+        token_validator.validate_token.return_value = (True, user_context, None)
+        token = jwt.encode(
+            {"sub": "test_user", "exp": datetime.utcnow() + timedelta(minutes=5)},
+            secret_key,
+            algorithm="HS256",
+        )
+        
+        for _ in range(3):
+            response = client.get("/protected", headers={"Authorization": f"Bearer {token}"})
+            assert response.json() == {"user_id": "test_user"}
+        
+        assert token_validator.validate_token.call_count == 1
+        assert rbac_manager.get_user_permissions.call_count == 1
+    
     def test_api_key_authentication_success(self, client, token_validator, api_key_manager):
         """Test successful API key authentication."""
         # Mock failed JWT validation (so it falls back to API key)
@@ -0,0 +1,153 @@
+"""Tests for the request latency instrumentation middleware."""
+
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.api.middleware.metrics import (
+    LatencyHistogram,
+    RequestMetrics,
+    RequestMetricsMiddleware,
+    OTHER_TENANT,
+    UNMATCHED_ROUTE,
+)
+
+
+class TestLatencyHistogram:
+    """Test bucket accounting and quantile estimation."""
+
+    def test_observe_counts_into_buckets(self):
+        """Values land in the first bucket whose bound is >= the value."""
+        histogram = LatencyHistogram(bounds=(0.01, 0.1, 1.0))
+        histogram.observe(0.005)
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5.0)
+
+        assert histogram.counts == [1, 2, 0, 1]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(5.155)
+
+    def test_quantiles(self):
+        """Quantiles are interpolated within the matching bucket."""
+        histogram = LatencyHistogram(bounds=(0.01, 0.02, 0.05, 0.1))
+        for _ in range(90):
+            histogram.observe(0.015)
+        for _ in range(10):
+            histogram.observe(0.08)
+
+        assert 0.01 <= histogram.quantile(0.5) <= 0.02
+        assert 0.05 <= histogram.quantile(0.95) <= 0.1
+        assert histogram.quantile(0.99) <= 0.1
+
+    def test_empty_quantile(self):
+        """An empty histogram reports zero."""
+        assert LatencyHistogram().quantile(0.99) == 0.0
+
+
+class TestRequestMetrics:
+    """Test series keying and exposition."""
+
+    def test_tenant_cardinality_capped(self):
+        """Tenants beyond the cap share a single series."""
+        metrics = RequestMetrics(max_tenants=2)
+        for tenant in ("a", "b", "c", "d"):
+            metrics.observe("GET", "/frames", 200, tenant, 0.01)
+
+        tenants = {key[3] for key in metrics._series}
+        assert tenants == {"a", "b", OTHER_TENANT}
+
+    def test_prometheus_output(self):
+        """The exposition includes buckets, quantiles and in-flight gauges."""
+        metrics = RequestMetrics(buckets=(0.01, 0.1))
+        metrics.observe("GET", "/frames/{frame_id}", 200, "acme", 0.005)
+        metrics.observe("GET", "/frames/{frame_id}", 200, "acme", 0.05)
+
+        output = metrics.render_prometheus()
+
+        labels = 'method="GET",route="/frames/{frame_id}",status="200",tenant="acme"'
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.01"}} 1' in output
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in output
+        assert f"http_request_duration_seconds_count{{{labels}}} 2" in output
+        assert 'quantile="0.99"' in output
+        assert "http_requests_in_flight 0" in output
+
+    def test_observe_overhead(self):
+        """Recording a request stays well under 50 microseconds."""
+        metrics = RequestMetrics()
+        iterations = 20000
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            metrics.observe("GET", "/api/v1/frames", 200, f"tenant-{i % 50}", 0.012)
+        per_call = (time.perf_counter() - start) / iterations
+
+        assert per_call < 50e-6
+
+
+class TestRequestMetricsMiddleware:
+    """Test the middleware against a FastAPI app."""
+
+    @pytest.fixture
+    def app_with_metrics(self):
+        metrics = RequestMetrics()
+        app = FastAPI()
+
+        @app.get("/frames/{frame_id}")
+        async def get_frame(frame_id: int):
+            if frame_id == 0:
+                raise HTTPException(status_code=404, detail="Frame not found")
+            return {"id": frame_id}
+
+        app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+        return app, metrics
+
+    def test_records_route_template(self, app_with_metrics):
+        """Raw URLs are collapsed into their route template."""
+        app, metrics = app_with_metrics
+        client = TestClient(app)
+
+        for frame_id in (1, 2, 3):
+            client.get(f"/frames/{frame_id}", headers={"X-Tenant-ID": "acme"})
+
+        assert list(metrics._series) == [("GET", "/frames/{frame_id}", 200, "acme")]
+        assert metrics._series[("GET", "/frames/{frame_id}", 200, "acme")].count == 3
+
+    def test_records_status_and_unmatched(self, app_with_metrics):
+        """Status codes are separate series; unknown paths share one label."""
+        app, metrics = app_with_metrics
+        client = TestClient(app)
+
+        client.get("/frames/0")
+        client.get("/does-not-exist/123")
+
+        keys = set(metrics._series)
+        assert ("GET", "/frames/{frame_id}", 404, "-") in keys
+        assert ("GET", UNMATCHED_ROUTE, 404, "-") in keys
+
+    def test_in_flight_returns_to_zero(self, app_with_metrics):
+        """The in-flight gauge is decremented after each request."""
+        app, metrics = app_with_metrics
+        client = TestClient(app)
+
+        client.get("/frames/1")
+
+        assert metrics.in_flight == 0
+        assert metrics.max_in_flight >= 1
+
+    def test_snapshot_percentiles(self, app_with_metrics):
+        """The snapshot exposes p50/p95/p99 per route."""
+        app, metrics = app_with_metrics
+        client = TestClient(app)
+
+        client.get("/frames/1")
+        route = metrics.snapshot()["routes"][0]
+
+        assert route["route"] == "/frames/{frame_id}"
+        assert {"p50_ms", "p95_ms", "p99_ms"} <= set(route)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
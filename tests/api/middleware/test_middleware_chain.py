@@ -0,0 +1,83 @@
+"""Tests for the authentication, rate limiting and metrics middleware together."""
+
+import fakeredis
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.api.middleware.jwt_auth import JWTAuthMiddleware
+from src.api.middleware.metrics import RequestMetrics, RequestMetricsMiddleware
+from src.api.middleware.rate_limiting import RateLimitConfig, RateLimitMiddleware
+from src.auth.rbac import Role, UserContext
+
+
+class StaticTokenValidator:
+    def __init__(self, user_context: UserContext):
+        self.user_context = user_context
+
+    def validate_token(self, token):
+        if token != "good-token":
+            return False, None, "Invalid token"
+        return True, self.user_context, None
+
+
+class TestAuthenticatedChain:
+    """The middleware stack in the order main.py registers it."""
+
+    @pytest.fixture
+    def chain(self):
+        user = UserContext(user_id="u1", roles=[Role.ANALYST], tenant_id="acme", tier="enterprise")
+        config = RateLimitConfig()
+        limiter = RateLimitMiddleware(config=config, redis_client=fakeredis.aioredis.FakeRedis())
+        metrics = RequestMetrics()
+        app = FastAPI()
+
+        @app.get("/api/v1/frames")
+        async def frames(request: Request):
+            user = request.state.user
+            return {"tenant_id": request.state.tenant_id, "user_id": user.user_id if user else None}
+
+        # add_middleware wraps, so the last one added runs first
+        app.middleware("http")(limiter)
+        app.add_middleware(JWTAuthMiddleware, token_validator=StaticTokenValidator(user))
+        app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+        return TestClient(app), config, metrics
+
+    def test_user_context_reaches_every_layer(self, chain):
+        """The tenant and tier of the token drive the limit, the key and the labels."""
+        client, config, metrics = chain
+
+        response = client.get(
+            "/api/v1/frames",
+            headers={"Authorization": "Bearer good-token", "X-Tenant-ID": "spoofed"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"tenant_id": "acme", "user_id": "u1"}
+        assert response.headers["X-RateLimit-Limit"] == str(config.user_type_limits["enterprise"])
+        assert response.headers["X-RateLimit-Remaining"] == str(config.user_type_limits["enterprise"] - 1)
+        assert {key[3] for key in metrics._series} == {"acme"}
+
+    def test_requests_are_counted_per_user(self, chain):
+        """Authenticated requests share one bucket keyed by user, not by address."""
+        client, config, _ = chain
+        headers = {"Authorization": "Bearer good-token"}
+        client.get("/api/v1/frames", headers=headers)
+
+        response = client.get("/api/v1/frames", headers={**headers, "X-Forwarded-For": "203.0.113.9"})
+
+        assert response.headers["X-RateLimit-Remaining"] == str(config.user_type_limits["enterprise"] - 2)
+
+    def test_anonymous_requests_use_the_default_limit(self, chain):
+        """Without a token the header tenant labels metrics but grants nothing."""
+        client, config, metrics = chain
+
+        response = client.get("/api/v1/frames", headers={"X-Tenant-ID": "acme"})
+
+        assert response.json() == {"tenant_id": None, "user_id": None}
+        assert response.headers["X-RateLimit-Limit"] == str(config.default_limit)
+        assert {key[3] for key in metrics._series} == {"acme"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
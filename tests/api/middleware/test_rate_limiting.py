@@ -3,14 +3,17 @@
 import pytest
 import time
 import asyncio
+import threading
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import FastAPI, Request, Response
 from fastapi.testclient import TestClient
 import redis.asyncio as redis
 
 from src.api.middleware.rate_limiting import (
+    LocalLeaseLimiter,
     RateLimitMiddleware,
     RateLimitConfig,
+    ShardedLocalLimiter,
     create_rate_limit_middleware
 )
 
@@ -156,9 +159,8 @@ class TestRateLimitMiddleware:
     async def test_sliding_window_check_allowed(self, middleware, mock_redis):
         """Test sliding window check when request is allowed."""
         current_time = int(time.time())
-        # Mock Redis responses for allowed request
-        mock_redis.execute.return_value = [None, 5, None, None]  # 5 current requests
-        mock_redis.zrange.return_value = [(b"req1", current_time - 30)]
+        # Script result for an allowed request: 5 existing + 1 new
+        mock_redis.evalsha = AsyncMock(return_value=[1, 6, (current_time + 30) * 1000])
         
         is_allowed, count, reset_time = await middleware._sliding_window_check(
             mock_redis, "test_key", 10, 60
@@ -167,14 +169,15 @@ class TestRateLimitMiddleware:
         assert is_allowed is True
         assert count == 6  # 5 existing + 1 new
         assert reset_time >= current_time
+        mock_redis.evalsha.assert_awaited_once()
+        mock_redis.execute.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_sliding_window_check_denied(self, middleware, mock_redis):
         """Test sliding window check when request is denied."""
         current_time = int(time.time())
-        # Mock Redis responses for denied request
-        mock_redis.execute.return_value = [None, 10, None, None]  # 10 current requests
-        mock_redis.zrange.return_value = [(b"req1", current_time - 30)]
+        # Script result for a denied request: nothing recorded
+        mock_redis.evalsha = AsyncMock(return_value=[0, 10, (current_time + 30) * 1000])
         
         is_allowed, count, reset_time = await middleware._sliding_window_check(
             mock_redis, "test_key", 10, 60
@@ -183,11 +186,25 @@ class TestRateLimitMiddleware:
         assert is_allowed is False
         assert count == 10  # No increment for denied request
         assert reset_time >= current_time
+        mock_redis.zrem.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_sliding_window_check_loads_script(self, middleware, mock_redis):
+        """The script is sent with EVAL when the server does not have it cached."""
+        from redis.exceptions import NoScriptError
+        mock_redis.evalsha = AsyncMock(side_effect=NoScriptError("NOSCRIPT"))
+        mock_redis.eval = AsyncMock(return_value=[1, 1, int(time.time() + 60) * 1000])
+        
+        is_allowed, count, _ = await middleware._sliding_window_check(mock_redis, "test_key", 10, 60)
+        
+        assert is_allowed is True
+        assert count == 1
+        mock_redis.eval.assert_awaited_once()
     
     @pytest.mark.asyncio
     async def test_sliding_window_check_redis_error(self, middleware, mock_redis):
         """Test sliding window check when Redis fails."""
-        mock_redis.execute.side_effect = Exception("Redis error")
+        mock_redis.evalsha = AsyncMock(side_effect=Exception("Redis error"))
         
         is_allowed, count, reset_time = await middleware._sliding_window_check(
             mock_redis, "test_key", 10, 60
@@ -224,6 +241,408 @@ class TestRateLimitMiddleware:
         assert info["retry_after"] > 0
 
 
+class TestRateLimitScripts:
+    """Run the Lua scripts against fakeredis."""
+    
+    @pytest.fixture
+    def fake_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+    
+    def make_middleware(self, fake_redis, algorithm):
+        config = RateLimitConfig()
+        config.algorithm = algorithm
+        return RateLimitMiddleware(config=config, redis_client=fake_redis)
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", ["sliding_log", "sliding_counter", "gcra"])
+    async def test_limit_enforced(self, fake_redis, algorithm):
+        """Exactly ``limit`` requests pass in a burst and the rest are denied."""
+        middleware = self.make_middleware(fake_redis, algorithm)
+        
+        results = [await middleware._sliding_window_check(fake_redis, "k", 5, 60) for _ in range(8)]
+        
+        assert [r[0] for r in results] == [True] * 5 + [False] * 3
+        assert [r[1] for r in results[:5]] == [1, 2, 3, 4, 5]
+        assert all(r[2] > time.time() for r in results)
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", ["sliding_log", "sliding_counter", "gcra"])
+    async def test_concurrent_burst_not_racy(self, fake_redis, algorithm):
+        """Concurrent checks never admit more than the limit."""
+        middleware = self.make_middleware(fake_redis, algorithm)
+        
+        results = await asyncio.gather(
+            *(middleware._sliding_window_check(fake_redis, "burst", 10, 60) for _ in range(40))
+        )
+        
+        assert sum(1 for allowed, _, _ in results if allowed) == 10
+    
+    @pytest.mark.asyncio
+    async def test_compact_state(self, fake_redis):
+        """Counter and GCRA modes keep O(1) state per key."""
+        for algorithm in ("sliding_counter", "gcra"):
+            middleware = self.make_middleware(fake_redis, algorithm)
+            for _ in range(50):
+                await middleware._sliding_window_check(fake_redis, algorithm, 100, 60)
+        
+        assert await fake_redis.hlen("sliding_counter") == 3
+        assert await fake_redis.type("gcra") == "string"
+    
+    @pytest.mark.asyncio
+    async def test_sliding_log_scores_are_seconds(self, fake_redis):
+        """Sliding-log members are scored in Unix seconds, as rate limit info reads them."""
+        middleware = self.make_middleware(fake_redis, "sliding_log")
+        for _ in range(3):
+            await middleware._sliding_window_check(fake_redis, "log", 3, 60)
+        
+        [(_, score)] = await fake_redis.zrange("log", 0, 0, withscores=True)
+        info = await middleware._get_rate_limit_info(fake_redis, "log", 3)
+        
+        assert abs(score - time.time()) < 5
+        assert info["remaining"] == 0
+        assert 0 < info["retry_after"] <= 60
+    
+    @pytest.mark.asyncio
+    async def test_gcra_spaces_requests(self, fake_redis):
+        """After a burst GCRA admits one request per emission interval."""
+        middleware = self.make_middleware(fake_redis, "gcra")
+        now = 1_700_000_000.0
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=now):
+            for _ in range(6):
+                await middleware._sliding_window_check(fake_redis, "g", 6, 60)
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=now + 5):
+            denied = await middleware._sliding_window_check(fake_redis, "g", 6, 60)
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=now + 10):
+            allowed = await middleware._sliding_window_check(fake_redis, "g", 6, 60)
+        
+        assert denied[0] is False
+        assert denied[2] == int(now + 10)
+        assert allowed[0] is True
+    
+    @pytest.mark.asyncio
+    async def test_one_round_trip_per_request(self, fake_redis):
+        """The middleware issues a single script call per request."""
+        app = FastAPI()
+        middleware = self.make_middleware(fake_redis, "sliding_log")
+        app.middleware("http")(middleware)
+        
+        @app.get("/test")
+        async def test_endpoint():
+            return {"ok": True}
+        
+        calls = []
+        original = fake_redis.evalsha
+        
+        async def counting_evalsha(*args, **kwargs):
+            calls.append(args[0])
+            return await original(*args, **kwargs)
+        
+        fake_redis.evalsha = counting_evalsha
+        from httpx import ASGITransport, AsyncClient
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await client.get("/test") for _ in range(3)]
+        
+        assert len(calls) == 3
+        assert [r.headers["X-RateLimit-Remaining"] for r in responses] == ["59", "58", "57"]
+
+
+class TestLocalLeaseLimiter:
+    """Local token leases reconciled against fakeredis."""
+    
+    @pytest.fixture
+    def fake_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+    
+    @pytest.fixture(autouse=True)
+    def fixed_window(self):
+        # Stay inside one window regardless of when the test runs
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=1_700_000_010.0):
+            yield
+    
+    @staticmethod
+    def count_calls(fake_redis):
+        calls = []
+        original = fake_redis.evalsha
+        
+        async def counting_evalsha(*args, **kwargs):
+            calls.append(args)
+            return await original(*args, **kwargs)
+        
+        fake_redis.evalsha = counting_evalsha
+        return calls
+    
+    @pytest.mark.asyncio
+    async def test_far_from_limit_served_locally(self, fake_redis):
+        """A client with headroom costs one round trip per lease."""
+        limiter = LocalLeaseLimiter(lease_size=20)
+        calls = self.count_calls(fake_redis)
+        
+        results = [await limiter.acquire(fake_redis, "client", 1000, 60) for _ in range(100)]
+        await limiter.stop()
+        
+        assert all(allowed for allowed, _, _ in results)
+        assert len(calls) == 5
+        assert results[-1][1] == 100
+        assert int(await fake_redis.get("client:28333333")) == 100
+    
+    @pytest.mark.asyncio
+    async def test_close_to_limit_checks_every_request(self, fake_redis):
+        """Small limits reserve one request at a time and are exact."""
+        limiter = LocalLeaseLimiter(lease_size=20)
+        calls = self.count_calls(fake_redis)
+        
+        results = [await limiter.acquire(fake_redis, "login", 5, 60) for _ in range(8)]
+        await limiter.stop()
+        
+        assert [r[0] for r in results] == [True] * 5 + [False] * 3
+        # One reservation per allowed request; the first denial is then cached
+        assert len(calls) == 6
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("tolerance,ceiling", [(0.0, 100), (0.1, 110)])
+    async def test_overshoot_bounded_across_workers(self, fake_redis, tolerance, ceiling):
+        """Workers sharing a limit never admit more than the tolerance allows."""
+        workers = [LocalLeaseLimiter(lease_size=15, overshoot_tolerance=tolerance) for _ in range(3)]
+        
+        allowed = 0
+        for i in range(400):
+            result = await workers[i % 3].acquire(fake_redis, "shared", 100, 60)
+            allowed += result[0]
+        for worker in workers:
+            await worker.stop()
+        
+        assert 100 <= allowed <= ceiling
+    
+    @pytest.mark.asyncio
+    async def test_reconcile_releases_idle_reservations(self, fake_redis):
+        """Unused tokens of idle clients go back to Redis in one batch."""
+        limiter = LocalLeaseLimiter(lease_size=20)
+        await limiter.acquire(fake_redis, "a", 1000, 60)
+        await limiter.acquire(fake_redis, "b", 1000, 60)
+        await limiter.stop()
+        
+        assert await limiter.reconcile(fake_redis) == 0  # still active
+        assert await limiter.reconcile(fake_redis) == 38
+        assert int(await fake_redis.get("a:28333333")) == 1
+        assert int(await fake_redis.get("b:28333333")) == 1
+    
+    @pytest.mark.asyncio
+    async def test_middleware_uses_leases(self, fake_redis):
+        """With a lease size configured the middleware skips Redis for most requests."""
+        config = RateLimitConfig()
+        config.lease_size = 10
+        middleware = RateLimitMiddleware(config=config, redis_client=fake_redis)
+        app = FastAPI()
+        app.middleware("http")(middleware)
+        
+        @app.get("/test")
+        async def test_endpoint():
+            return {"ok": True}
+        
+        calls = self.count_calls(fake_redis)
+        from httpx import ASGITransport, AsyncClient
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await client.get("/test") for _ in range(10)]
+        await middleware.stop()
+        
+        assert len(calls) == 1
+        assert all(r.status_code == 200 for r in responses)
+        assert responses[-1].headers["X-RateLimit-Remaining"] == str(config.default_limit - 10)
+    
+    @pytest.mark.asyncio
+    async def test_lease_redis_error_uses_fallback(self):
+        """Redis errors while leasing follow the fallback policy."""
+        config = RateLimitConfig()
+        config.lease_size = 10
+        broken = AsyncMock()
+        broken.evalsha = AsyncMock(side_effect=Exception("Redis error"))
+        middleware = RateLimitMiddleware(config=config, fallback_policy="deny")
+        
+        allowed, _, _ = await middleware._leased_check(middleware.leases, broken, "k", 10, 60)
+        await middleware.stop()
+        
+        assert allowed is False
+
+
+class TestShardedLocalLimiter:
+    """In-process fallback limiter."""
+    
+    def test_enforces_limit_per_key(self):
+        limiter = ShardedLocalLimiter(max_keys=64, shards=4)
+        
+        a = [limiter.check("a", 3, 60)[0] for _ in range(5)]
+        b = limiter.check("b", 3, 60)
+        
+        assert a == [True, True, True, False, False]
+        assert b[0] is True
+        assert b[2] > time.time()
+    
+    def test_previous_window_counts(self):
+        """The previous window's requests decay across the current one."""
+        limiter = ShardedLocalLimiter(max_keys=16, shards=1)
+        start = 1_700_000_040.0  # multiple of 60
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=start + 30):
+            for _ in range(10):
+                limiter.check("k", 10, 60)
+        with patch("src.api.middleware.rate_limiting.time.time", return_value=start + 60 + 15):
+            # 10 * 0.75 from the previous window leaves room for 2
+            results = [limiter.check("k", 10, 60) for _ in range(3)]
+        
+        assert [r[0] for r in results] == [True, True, False]
+        assert results[-1][2] == int(start + 60 + 18)
+    
+    def test_memory_bounded_with_lru_eviction(self):
+        limiter = ShardedLocalLimiter(max_keys=8, shards=1)
+        for i in range(8):
+            limiter.check(f"k{i}", 2, 60)
+        limiter.check("k0", 2, 60)  # k0 becomes most recent
+        limiter.check("new", 2, 60)
+        
+        assert len(limiter) == 8
+        assert limiter.evictions == 1
+        # k0 kept its count; k1 was evicted and starts over
+        assert limiter.check("k0", 2, 60)[0] is False
+        assert limiter.check("k1", 2, 60)[0] is True
+    
+    def test_thread_safe(self):
+        limiter = ShardedLocalLimiter(max_keys=64, shards=4)
+        allowed = []
+        
+        def worker():
+            allowed.extend(limiter.check("shared", 100, 60)[0] for _ in range(50))
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sum(allowed) == 100
+
+
+class TestLocalFallback:
+    """Falling back to the in-process limiter and handing back to Redis."""
+    
+    @pytest.fixture
+    def app_and_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        fake_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        config = RateLimitConfig()
+        config.endpoint_limits = {"/limited": 3}
+        middleware = RateLimitMiddleware(config=config, redis_client=fake_redis, fallback_policy="local")
+        app = FastAPI()
+        app.middleware("http")(middleware)
+        
+        @app.get("/limited")
+        async def limited():
+            return {"ok": True}
+        
+        return app, fake_redis, middleware
+    
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            RateLimitMiddleware(fallback_policy="ignore")
+    
+    def test_enforces_limits_when_redis_fails(self, app_and_redis):
+        app, fake_redis, middleware = app_and_redis
+        fake_redis.evalsha = AsyncMock(side_effect=ConnectionError("Redis down"))
+        client = TestClient(app)
+        
+        responses = [client.get("/limited") for _ in range(5)]
+        
+        assert [r.status_code for r in responses] == [200, 200, 200, 429, 429]
+        assert responses[0].headers["X-RateLimit-Status"] == "local"
+        assert "Retry-After" in responses[-1].headers
+        # Redis is not retried on every request while it is failing
+        assert fake_redis.evalsha.await_count == 1
+    
+    def test_hands_back_to_redis(self, app_and_redis):
+        app, fake_redis, middleware = app_and_redis
+        working_evalsha = fake_redis.evalsha
+        fake_redis.evalsha = AsyncMock(side_effect=ConnectionError("Redis down"))
+        client = TestClient(app)
+        for _ in range(3):
+            client.get("/limited")
+        assert len(middleware.local) == 1
+        
+        fake_redis.evalsha = working_evalsha
+        middleware._redis_retry_at = 0.0  # retry interval elapsed
+        response = client.get("/limited")
+        
+        assert response.status_code == 200
+        assert "X-RateLimit-Status" not in response.headers
+        assert response.headers["X-RateLimit-Remaining"] == "2"
+        assert len(middleware.local) == 0
+    
+    def test_no_redis_client_uses_local(self):
+        config = RateLimitConfig()
+        config.redis_url = "redis://127.0.0.1:1/0"
+        middleware = RateLimitMiddleware(config=config, fallback_policy="local")
+        app = FastAPI()
+        app.middleware("http")(middleware)
+        
+        @app.get("/test")
+        async def test_endpoint():
+            return {"ok": True}
+        
+        with patch("src.api.middleware.rate_limiting.redis.from_url") as from_url:
+            from_url.side_effect = Exception("Redis connection failed")
+            response = TestClient(app).get("/test")
+        
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Status"] == "local"
+        assert response.headers["X-RateLimit-Remaining"] == str(config.default_limit - 1)
+
+
+class TestRedisReconnect:
+    """Connecting to Redis off the request path."""
+    
+    @pytest.fixture
+    def request_without_app_redis(self):
+        request = MagicMock()
+        request.app.state.redis = None
+        return request
+    
+    @pytest.mark.asyncio
+    async def test_connects_in_background(self, request_without_app_redis):
+        """The request that triggers a connection does not wait for it."""
+        fakeredis = pytest.importorskip("fakeredis")
+        fake_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        middleware = RateLimitMiddleware(fallback_policy="local")
+        
+        with patch("src.api.middleware.rate_limiting.redis.from_url", return_value=fake_redis):
+            assert await middleware._get_redis(request_without_app_redis) is None
+            await middleware._connect_task
+        
+        assert await middleware._get_redis(request_without_app_redis) is fake_redis
+    
+    @pytest.mark.asyncio
+    async def test_connect_attempt_times_out(self, request_without_app_redis, monkeypatch):
+        """A server that never answers is given up on and retried later."""
+        async def hang():
+            await asyncio.sleep(10)
+        
+        client = MagicMock()
+        client.ping = hang
+        middleware = RateLimitMiddleware(fallback_policy="local")
+        monkeypatch.setattr(middleware, "CONNECT_TIMEOUT", 0.01)
+        
+        with patch("src.api.middleware.rate_limiting.redis.from_url", return_value=client):
+            await middleware._get_redis(request_without_app_redis)
+            await asyncio.wait_for(middleware._connect_task, 1)
+            # Within the reconnect interval no new attempt starts
+            first_attempt = middleware._connect_task
+            assert await middleware._get_redis(request_without_app_redis) is None
+        
+        assert middleware.redis is None
+        assert middleware._connect_task is first_attempt
+
+
 class TestRateLimitMiddlewareIntegration:
     """Integration tests for rate limiting middleware."""
     
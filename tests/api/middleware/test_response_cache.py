@@ -0,0 +1,262 @@
+"""Tests for the tenant-aware response cache middleware."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from src.api.middleware.response_cache import (
+    CachePolicy,
+    CachedResponse,
+    InMemoryResponseStore,
+    RedisResponseStore,
+    ResponseCache,
+    ResponseCacheMiddleware,
+    compute_etag,
+)
+from src.auth.rbac import Role, UserContext
+
+
+@pytest.fixture
+def cached_app():
+    """App with a cached frames route and an uncached orders route."""
+    calls = {"frames": 0, "orders": 0}
+    cache = ResponseCache(policies={
+        "/api/v1/frames": CachePolicy(ttl=60, tags=("products",)),
+        "/api/v1/frames/private": CachePolicy(ttl=60),
+    })
+    app = FastAPI()
+
+    @app.get("/api/v1/frames")
+    async def list_frames(brand: str = "all", page: int = 1):
+        calls["frames"] += 1
+        return {"brand": brand, "page": page, "calls": calls["frames"]}
+
+    @app.get("/api/v1/frames/private")
+    async def private_frames(response: Response):
+        response.headers["Cache-Control"] = "no-store"
+        return {"private": True}
+
+    @app.get("/api/v1/orders")
+    async def list_orders():
+        calls["orders"] += 1
+        return {"calls": calls["orders"]}
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    return app, cache, calls
+
+
+class TestResponseCacheMiddleware:
+    """Test caching, ETags and conditional GETs."""
+
+    def test_repeat_request_served_from_cache(self, cached_app):
+        """The handler runs once for repeated identical requests."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        first = client.get("/api/v1/frames")
+        second = client.get("/api/v1/frames")
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert calls["frames"] == 1
+
+    def test_query_normalized(self, cached_app):
+        """Parameter order does not create separate entries."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames?brand=ray&page=2")
+        client.get("/api/v1/frames?page=2&brand=ray")
+        client.get("/api/v1/frames?page=3&brand=ray")
+
+        assert calls["frames"] == 2
+
+    def test_tenants_isolated(self, cached_app):
+        """Different tenants never share entries."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames", headers={"X-Tenant-ID": "acme"})
+        client.get("/api/v1/frames", headers={"X-Tenant-ID": "globex"})
+
+        assert calls["frames"] == 2
+
+    def test_header_tenant_scoped_to_credentials(self, cached_app):
+        """A client cannot read another client's entry by spoofing the tenant header."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames", headers={"X-Tenant-ID": "acme", "Authorization": "Bearer a"})
+        client.get("/api/v1/frames", headers={"X-Tenant-ID": "acme", "Authorization": "Bearer b"})
+
+        assert calls["frames"] == 2
+
+    def test_conditional_get_returns_304_without_handler(self, cached_app):
+        """A matching If-None-Match is answered from the cache."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        etag = client.get("/api/v1/frames").headers["etag"]
+        response = client.get("/api/v1/frames", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert calls["frames"] == 1
+
+    def test_stale_etag_gets_full_response(self, cached_app):
+        """A non-matching ETag gets the cached body."""
+        app, _, _ = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames")
+        response = client.get("/api/v1/frames", headers={"If-None-Match": '"outdated"'})
+
+        assert response.status_code == 200
+        assert response.json()["calls"] == 1
+
+    def test_etag_is_strong_and_content_derived(self, cached_app):
+        """The ETag is a strong validator of the body."""
+        app, _, _ = cached_app
+        client = TestClient(app)
+
+        response = client.get("/api/v1/frames")
+
+        assert response.headers["etag"] == compute_etag(response.content)
+        assert not response.headers["etag"].startswith("W/")
+
+    def test_tag_invalidation(self, cached_app):
+        """Invalidating a tag forces the next request to the handler."""
+        app, cache, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames")
+        removed = asyncio.run(cache.invalidate_tags("products"))
+        client.get("/api/v1/frames")
+
+        assert removed == 1
+        assert calls["frames"] == 2
+
+    def test_uncached_routes_untouched(self, cached_app):
+        """Routes without a policy always reach the handler."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/orders")
+        response = client.get("/api/v1/orders")
+
+        assert calls["orders"] == 2
+        assert "x-cache" not in response.headers
+
+    def test_no_store_not_cached(self, cached_app):
+        """Responses marked no-store are not cached."""
+        app, cache, _ = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames/private")
+
+        assert len(cache.store) == 0
+
+    def test_no_cache_request_bypasses_lookup(self, cached_app):
+        """Cache-Control: no-cache on the request forces a refresh."""
+        app, _, calls = cached_app
+        client = TestClient(app)
+
+        client.get("/api/v1/frames")
+        client.get("/api/v1/frames", headers={"Cache-Control": "no-cache"})
+
+        assert calls["frames"] == 2
+
+    def test_store_read_failure_is_a_miss(self, cached_app):
+        """A store outage serves the handler's response instead of a 500."""
+        app, cache, calls = cached_app
+        client = TestClient(app)
+
+        class BrokenStore(InMemoryResponseStore):
+            async def get(self, key):
+                raise ConnectionError("redis down")
+
+        cache.store = BrokenStore()
+        response = client.get("/api/v1/frames")
+
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == "MISS"
+        assert calls["frames"] == 1
+        assert cache.stats()["errors"] == 1
+
+    def test_authenticated_tenant_scoped_to_principal(self, cached_app):
+        """Users of one tenant do not share entries, and a role change misses."""
+        app, _, calls = cached_app
+
+        def authenticate(user):
+            async def middleware(scope, receive, send):
+                scope.setdefault("state", {}).update(tenant_id="acme", user=user)
+                await app(scope, receive, send)
+            return middleware
+
+        admin = UserContext(user_id="u1", roles=[Role.TENANT_ADMIN], tenant_id="acme")
+        viewer = UserContext(user_id="u2", roles=[Role.ANALYST], tenant_id="acme")
+        TestClient(authenticate(admin)).get("/api/v1/frames")
+        TestClient(authenticate(admin)).get("/api/v1/frames")
+        TestClient(authenticate(viewer)).get("/api/v1/frames")
+        assert calls["frames"] == 2
+
+        admin.roles = [Role.ANALYST]
+        admin.refresh_permissions()
+        TestClient(authenticate(admin)).get("/api/v1/frames")
+        assert calls["frames"] == 3
+
+
+class TestInMemoryResponseStore:
+    """Test the in-process store."""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_cleans_tag_index(self):
+        """Evicted entries are removed from the tag index."""
+        store = InMemoryResponseStore(max_entries=2)
+        response = CachedResponse(status=200, headers=[], body=b"{}", etag='"x"')
+
+        await store.set("a", response, 60, ["products"])
+        await store.set("b", response, 60, ["products"])
+        await store.set("c", response, 60, ["billing"])
+
+        assert await store.get("a") is None
+        assert store._tag_index["products"] == {"b"}
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_not_returned(self):
+        """Entries past their TTL are dropped on read."""
+        store = InMemoryResponseStore()
+        response = CachedResponse(status=200, headers=[], body=b"{}", etag='"x"')
+
+        await store.set("a", response, -1, ["products"])
+
+        assert await store.get("a") is None
+        assert "products" not in store._tag_index
+
+
+class TestRedisResponseStore:
+    """Test the shared Redis store."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_and_invalidation(self):
+        """Entries survive serialization and are removed by tag."""
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisResponseStore(fakeredis.FakeAsyncRedis(decode_responses=True))
+        response = CachedResponse(status=200, headers=[("content-type", "application/json")],
+                                  body=b'{"a": 1}', etag='"abc"')
+
+        await store.set("key1", response, 60, ["tenant:acme", "products"])
+        loaded = await store.get("key1")
+
+        assert loaded.body == b'{"a": 1}'
+        assert loaded.headers == [("content-type", "application/json")]
+        assert await store.invalidate_tags(["products"]) == 1
+        assert await store.get("key1") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,182 @@
+"""Tests for the verified-token cache."""
+
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.middleware.jwt_auth import JWTAuthMiddleware
+from src.api.middleware.token_cache import DenylistVersion, VerifiedTokenCache, unverified_expiry
+
+
+def make_token(exp=None, sub="user-1"):
+    """An unsigned JWT-shaped token; the cache never checks signatures."""
+    def segment(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    claims = {"sub": sub}
+    if exp is not None:
+        claims["exp"] = exp
+    return f"{segment({'alg': 'HS256'})}.{segment(claims)}.signature"
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVerifiedTokenCache:
+    """Lookups, expiry and bounds."""
+
+    def test_expiry_read_from_token(self):
+        assert unverified_expiry(make_token(exp=1234)) == 1234.0
+        assert unverified_expiry(make_token()) is None
+        assert unverified_expiry("not-a-jwt") is None
+
+    def test_hit_after_put(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        token = make_token(exp=clock.now + 60)
+
+        assert cache.get(token) is None
+        assert cache.put(token, {"user_id": "user-1"}, {"permissions": {"read"}})
+        entry = cache.get(token)
+
+        assert entry.user_context == {"user_id": "user-1"}
+        assert entry.claims["permissions"] == {"read"}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_entries_expire_with_token(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        token = make_token(exp=clock.now + 60)
+        cache.put(token, "ctx")
+
+        clock.now += 61
+
+        assert cache.get(token) is None
+        assert cache.stats()["expired"] == 1
+        assert len(cache) == 0
+
+    def test_tokens_without_expiry_not_cached(self):
+        cache = VerifiedTokenCache(clock=FakeClock())
+
+        assert cache.put(make_token(), "ctx") is False
+        assert cache.put(make_token(exp=1.0), "ctx") is False  # already expired
+        assert len(cache) == 0
+
+    def test_max_ttl_caps_lifetime(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock, max_ttl=30)
+        token = make_token(exp=clock.now + 3600)
+        cache.put(token, "ctx")
+
+        clock.now += 31
+
+        assert cache.get(token) is None
+
+    def test_bounded_lru(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(max_entries=2, clock=clock)
+        tokens = [make_token(exp=clock.now + 60, sub=f"u{i}") for i in range(3)]
+        cache.put(tokens[0], "a")
+        cache.put(tokens[1], "b")
+        cache.get(tokens[0])
+        cache.put(tokens[2], "c")
+
+        assert cache.get(tokens[1]) is None
+        assert cache.get(tokens[0]).user_context == "a"
+        assert cache.stats()["evictions"] == 1
+
+    def test_prometheus_output(self):
+        cache = VerifiedTokenCache(clock=FakeClock())
+        cache.get(make_token(exp=2_000_000))
+
+        text = cache.render_prometheus()
+
+        assert 'auth_token_cache_requests_total{result="miss"} 1' in text
+        assert "auth_token_cache_hit_ratio 0.000000" in text
+
+
+class TestRevocation:
+    """Denylist version invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_revoke_invalidates_everything_cached(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        first, second = make_token(exp=clock.now + 60, sub="a"), make_token(exp=clock.now + 60, sub="b")
+        cache.put(first, "a")
+        cache.put(second, "b")
+
+        await cache.revoke(first)
+
+        assert cache.get(first) is None
+        assert cache.get(second) is None
+        assert cache.stats()["revoked"] == 1
+
+    def test_put_with_older_version_not_cached(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        token = make_token(exp=clock.now + 60)
+        version = cache.denylist.version
+        cache.denylist.version += 1
+
+        assert cache.put(token, "ctx", version=version) is False
+        assert cache.get(token) is None
+
+    @pytest.mark.asyncio
+    async def test_revocation_during_validation_not_cached(self):
+        """A token validated across a revocation is re-validated on its next use."""
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        token = make_token(exp=clock.now + 60)
+        calls = []
+
+        class Validator:
+            async def validate_token(self, value):
+                calls.append(value)
+                if len(calls) == 1:
+                    # Revoked while this validation was in flight
+                    await cache.revoke()
+                return True, SimpleNamespace(tenant_id="acme"), None
+
+        middleware = JWTAuthMiddleware(app=None, token_validator=Validator(), token_cache=cache)
+
+        assert await middleware._authenticate_jwt(token, SimpleNamespace()) is None
+        assert cache.get(token) is None
+        assert await middleware._authenticate_jwt(token, SimpleNamespace()) is None
+        assert len(calls) == 2
+        assert cache.get(token) is not None
+
+    @pytest.mark.asyncio
+    async def test_revocation_shared_between_workers(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        clock = FakeClock()
+        caches = []
+        for _ in range(2):
+            denylist = DenylistVersion(check_interval=60)
+            await denylist.start(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+            caches.append(VerifiedTokenCache(denylist=denylist, clock=clock))
+        token = make_token(exp=clock.now + 60)
+        for cache in caches:
+            cache.put(token, "ctx")
+
+        await caches[0].revoke()
+        assert await caches[1].denylist.refresh() is True
+
+        assert caches[1].get(token) is None
+        # Entries cached after the revocation are served again
+        caches[1].put(token, "ctx")
+        assert caches[1].get(token) is not None
+        for cache in caches:
+            await cache.denylist.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
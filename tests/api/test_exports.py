@@ -0,0 +1,276 @@
+"""Tests for the streaming export engine and the admin export endpoints."""
+
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.api.routers.admin as admin
+from src.api.services.exports import (
+    ExportSource,
+    build_export_stream,
+    export_job_handler,
+    parse_range_header,
+)
+from src.api.services.jobs import InMemoryJobStore, JobRunner
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def make_source(rows: int, page_size: int = 100):
+    """Source with one row per minute ending at NOW, recording every page fetched."""
+    data = [
+        {"id": f"r{i:05d}", "timestamp": NOW - timedelta(minutes=i), "tenant_id": f"t{i % 3}", "calls": i}
+        for i in range(rows)
+    ]
+    pages = []
+
+    async def fetch_page(start, end, after, limit):
+        page = sorted(
+            (r for r in data if start <= r["timestamp"] < end),
+            key=lambda r: (r["timestamp"], r["id"]),
+        )
+        if after is not None:
+            page = [r for r in page if (r["timestamp"], r["id"]) > after]
+        pages.append(len(page[:limit]))
+        return page[:limit]
+
+    async def count(start, end):
+        return sum(1 for r in data if start <= r["timestamp"] < end)
+
+    source = ExportSource("usage", ["id", "timestamp", "tenant_id", "calls"], fetch_page,
+                          count=count, page_size=page_size)
+    return source, pages
+
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+class TestPipeline:
+    """Test the encode/compress pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_csv_pages_through_source(self):
+        """Rows are fetched page by page and written once each."""
+        source, pages = make_source(250)
+
+        body = await collect(build_export_stream(source, "csv", NOW - timedelta(days=1), NOW + timedelta(1)))
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+
+        assert len(rows) == 250
+        assert len({r["id"] for r in rows}) == 250
+        assert pages == [100, 100, 50]
+        assert rows[0]["timestamp"] == (NOW - timedelta(minutes=249)).isoformat()
+
+    @pytest.mark.asyncio
+    async def test_ndjson_and_json(self):
+        """NDJSON is one object per line; JSON is a single array."""
+        source, _ = make_source(5)
+        start, end = NOW - timedelta(days=1), NOW + timedelta(1)
+
+        lines = (await collect(build_export_stream(source, "ndjson", start, end))).splitlines()
+        array = json.loads(await collect(build_export_stream(source, "json", start, end)))
+
+        assert [json.loads(line)["calls"] for line in lines] == [4, 3, 2, 1, 0]
+        assert len(array) == 5
+
+    @pytest.mark.asyncio
+    async def test_gzip(self):
+        """Compressed output decompresses to the plain export."""
+        source, _ = make_source(300)
+        start, end = NOW - timedelta(days=1), NOW + timedelta(1)
+
+        plain = await collect(build_export_stream(source, "csv", start, end))
+        compressed = await collect(build_export_stream(source, "csv", start, end, compress=True))
+
+        assert gzip.decompress(compressed) == plain
+
+    def test_unknown_format(self):
+        source, _ = make_source(1)
+        with pytest.raises(ValueError):
+            build_export_stream(source, "pdf", NOW, NOW)
+
+
+class TestRangeHeader:
+    """Test byte-range parsing."""
+
+    def test_ranges(self):
+        assert parse_range_header(None, 100) is None
+        assert parse_range_header("bytes=0-9", 100) == (0, 9)
+        assert parse_range_header("bytes=90-", 100) == (90, 99)
+        assert parse_range_header("bytes=-10", 100) == (90, 99)
+        assert parse_range_header("bytes=50-500", 100) == (50, 99)
+
+    @pytest.mark.parametrize(
+        "header", ["bytes=100-", "bytes=5-1", "items=0-1", "bytes=0-1,5-6", "bytes=-0", "bytes=--5", "bytes=+1-2", "bytes=1--2"],
+    )
+    def test_unsatisfiable(self, header):
+        with pytest.raises(ValueError):
+            parse_range_header(header, 100)
+
+    def test_suffix_on_empty_file(self):
+        with pytest.raises(ValueError):
+            parse_range_header("bytes=-5", 0)
+
+
+def export_runner(sources, directory, **kwargs) -> JobRunner:
+    runner = JobRunner(InMemoryJobStore(), poll_interval=0.01, **kwargs)
+    runner.register("export", export_job_handler(sources, directory=directory, clock=lambda: NOW + timedelta(minutes=1)))
+    return runner
+
+
+def export_params(fmt: str, date_range: str = "7d", compress: bool = False) -> dict:
+    return {"source": "usage", "format": fmt, "date_range": date_range, "compress": compress}
+
+
+class TestExportJobs:
+    """Test background export jobs on the job runner."""
+
+    @pytest.mark.asyncio
+    async def test_job_writes_file_with_progress(self, tmp_path):
+        source, _ = make_source(2500, page_size=500)
+        runner = export_runner({"usage": source}, str(tmp_path))
+        reported = []
+        store_update = runner.store.update
+
+        async def update(job, owner=None):
+            reported.append(job.progress)
+            return await store_update(job, owner=owner)
+
+        runner.store.update = update
+
+        job, _ = await runner.submit("export", export_params("ndjson"))
+        job = await runner.wait(job.id)
+        await runner.stop()
+
+        assert job.status == "completed"
+        assert job.progress == 100.0
+        assert reported[:2] == [40.0, 80.0]
+        with open(job.result_path, "rb") as f:
+            assert len(f.read().splitlines()) == 2500
+        assert job.result_size == (tmp_path / job.result_path.rsplit("/", 1)[-1]).stat().st_size
+
+    @pytest.mark.asyncio
+    async def test_failed_job_reports_error(self, tmp_path):
+        async def fetch_page(start, end, after, limit):
+            raise RuntimeError("database unavailable")
+
+        runner = export_runner({"usage": ExportSource("usage", ["id"], fetch_page)}, str(tmp_path))
+        job, _ = await runner.submit("export", export_params("csv", "30d"))
+        job = await runner.wait(job.id)
+        await runner.stop()
+
+        assert job.status == "failed"
+        assert job.error == "database unavailable"
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_expired_jobs_purged(self, tmp_path):
+        source, _ = make_source(10)
+        runner = export_runner({"usage": source}, str(tmp_path), result_ttl=0)
+
+        job, _ = await runner.submit("export", export_params("csv"))
+        await runner.wait(job.id)
+        await runner.maintain()
+        await runner.stop()
+
+        assert await runner.store.get(job.id) is None
+        assert list(tmp_path.iterdir()) == []
+
+
+@pytest.fixture
+def admin_client(tmp_path, monkeypatch):
+    runner = JobRunner(InMemoryJobStore(), poll_interval=0.01)
+    runner.register("export", export_job_handler(admin.EXPORT_SOURCES, directory=str(tmp_path)))
+    monkeypatch.setattr(admin, "admin_jobs", runner)
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        yield client
+
+
+def wait_for_job(client, status_url: str) -> dict:
+    for _ in range(200):
+        data = client.get(status_url).json()["data"]
+        if data["status"] in ("completed", "failed"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError("export job did not finish")
+
+
+class TestAdminExportEndpoints:
+    """Test the admin export endpoints end to end."""
+
+    def test_small_range_streams_directly(self, admin_client):
+        response = admin_client.get("/api/v1/admin/security/export?format=csv&date_range=7d")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == len(admin.MOCK_SECURITY_EVENTS)
+
+    def test_compressed_export(self, admin_client):
+        response = admin_client.get("/api/v1/admin/analytics/export?format=ndjson&date_range=7d&compress=true")
+
+        assert response.headers["content-type"] == "application/gzip"
+        lines = gzip.decompress(response.content).splitlines()
+        assert len(lines) == 7 * 4
+
+    def test_year_runs_as_job_and_resumes(self, admin_client):
+        """A 1y export is queued, polled, then downloaded in two ranges."""
+        queued = admin_client.get("/api/v1/admin/analytics/export?format=csv&date_range=1y")
+        assert queued.status_code == 202
+        body = queued.json()
+
+        status = wait_for_job(admin_client, body["status_url"])
+        assert status["status"] == "completed"
+        assert status["message"] == f"{365 * 4} rows written"
+
+        full = admin_client.get(body["download_url"])
+        assert full.status_code == 200
+        assert full.headers["accept-ranges"] == "bytes"
+
+        first = admin_client.get(body["download_url"], headers={"Range": "bytes=0-999"})
+        rest = admin_client.get(body["download_url"], headers={"Range": "bytes=1000-", "If-Range": full.headers["etag"]})
+        assert first.status_code == 206
+        assert rest.headers["content-range"] == f"bytes 1000-{len(full.content) - 1}/{len(full.content)}"
+        assert first.content + rest.content == full.content
+
+    def test_unsatisfiable_range(self, admin_client):
+        queued = admin_client.get("/api/v1/admin/billing/export?date_range=1y").json()
+        wait_for_job(admin_client, queued["status_url"])
+
+        response = admin_client.get(queued["download_url"], headers={"Range": "bytes=999999-"})
+
+        assert response.status_code == 416
+
+    def test_unknown_job(self, admin_client):
+        assert admin_client.get("/api/v1/admin/exports/missing").status_code == 404
+
+    def test_other_process_serves_download(self, tmp_path, admin_client, monkeypatch):
+        """Status and file live in the shared store and directory, not in the worker that ran the job."""
+        path = str(tmp_path / "jobs.db")
+        worker = JobRunner(admin.SQLiteJobStore(path), poll_interval=0.01)
+        worker.register("export", export_job_handler(admin.EXPORT_SOURCES, directory=str(tmp_path)))
+        monkeypatch.setattr(admin, "admin_jobs", worker)
+        queued = admin_client.get("/api/v1/admin/analytics/export?date_range=1y").json()
+        wait_for_job(admin_client, queued["status_url"])
+        expected = admin_client.get(queued["download_url"]).content
+
+        monkeypatch.setattr(admin, "admin_jobs", JobRunner(admin.SQLiteJobStore(path)))
+        response = admin_client.get(queued["download_url"])
+
+        assert response.status_code == 200
+        assert response.content == expected
+        assert len(expected.splitlines()) == 365 * 4 + 1
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,278 @@
+"""Tests for the background job runner and compliance report endpoints."""
+
+import asyncio
+import io
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.api.routers.admin as admin
+from src.api.services.jobs import (
+    InMemoryJobStore,
+    Job,
+    JobResult,
+    JobRunner,
+    SQLiteJobStore,
+    dedupe_key_for,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryJobStore()
+    else:
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        yield store
+        store.close()
+
+
+def make_runner(store, **kwargs):
+    runner = JobRunner(store, poll_interval=0.01, **kwargs)
+
+    @runner.handler("echo")
+    async def echo(params, ctx):
+        await ctx.report(50, "halfway")
+        if params.get("fail"):
+            raise RuntimeError("boom")
+        await asyncio.sleep(params.get("sleep", 0))
+        return JobResult(data=params["text"].encode(), content_type="text/plain", filename="echo.txt")
+
+    return runner
+
+
+class TestJobRunner:
+    """Test queueing, execution and results against both stores."""
+
+    @pytest.mark.asyncio
+    async def test_job_completes_with_result(self, store):
+        runner = make_runner(store)
+
+        job, created = await runner.submit("echo", {"text": "hello"})
+        finished = await runner.wait(job.id)
+        await runner.stop()
+
+        assert created
+        assert finished.status == "completed"
+        assert finished.progress == 100.0
+        assert finished.filename == "echo.txt"
+        assert await store.load_result(job.id) == b"hello"
+
+    @pytest.mark.asyncio
+    async def test_identical_pending_requests_deduplicated(self, store):
+        runner = make_runner(store)
+
+        first, _ = await runner.submit("echo", {"text": "a", "sleep": 0.05})
+        second, created = await runner.submit("echo", {"sleep": 0.05, "text": "a"})
+        other, other_created = await runner.submit("echo", {"text": "b"})
+        await runner.wait(first.id)
+        again, again_created = await runner.submit("echo", {"text": "a", "sleep": 0.05})
+        await runner.stop()
+
+        assert second.id == first.id and not created
+        assert other.id != first.id and other_created
+        assert again.id != first.id and again_created
+
+    @pytest.mark.asyncio
+    async def test_failure_recorded(self, store):
+        runner = make_runner(store)
+
+        job, _ = await runner.submit("echo", {"text": "x", "fail": True})
+        finished = await runner.wait(job.id)
+        await runner.stop()
+
+        assert finished.status == "failed"
+        assert finished.error == "boom"
+        assert finished.message == "halfway"
+        assert await store.load_result(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, store):
+        runner = JobRunner(store, concurrency=2, poll_interval=0.01)
+        active = {"now": 0, "max": 0}
+
+        @runner.handler("slow")
+        async def slow(params, ctx):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+            return JobResult(b"", "text/plain", "slow.txt")
+
+        jobs = [(await runner.submit("slow", {"n": n}))[0] for n in range(6)]
+        for job in jobs:
+            await runner.wait(job.id)
+        await runner.stop()
+
+        assert active["max"] == 2
+
+    @pytest.mark.asyncio
+    async def test_interrupted_jobs_requeued(self, store):
+        job = Job(id="stuck", kind="echo", params={"text": "resumed"}, dedupe_key=dedupe_key_for("echo", {}))
+        await store.create_or_get_active(job)
+        assert (await store.claim_next()).id == "stuck"
+
+        runner = make_runner(store)
+        await runner.start()
+        finished = await runner.wait("stuck")
+        await runner.stop()
+
+        assert finished.status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_live_lease_not_taken_over(self, store):
+        """A job another runner is still renewing stays with that runner."""
+        job = Job(id="leased", kind="echo", params={"text": "x"}, dedupe_key=dedupe_key_for("echo", {}))
+        await store.create_or_get_active(job)
+        await store.claim_next("other-runner", datetime.now() + timedelta(minutes=1))
+
+        assert await store.requeue_expired(datetime.now()) == 0
+        assert await store.requeue_expired(datetime.now() + timedelta(minutes=2)) == 1
+        assert (await store.get("leased")).status == "queued"
+
+    @pytest.mark.asyncio
+    async def test_lease_renewed_while_running(self, store):
+        runner = make_runner(store, lease_seconds=0.06)
+
+        job, _ = await runner.submit("echo", {"text": "slow", "sleep": 0.15})
+        await asyncio.sleep(0.1)
+        # Past the original lease, but the heartbeat extended it
+        assert await store.requeue_expired(datetime.now()) == 0
+        finished = await runner.wait(job.id)
+        await runner.stop()
+
+        assert finished.status == "completed"
+        assert finished.owner is None
+
+    @pytest.mark.asyncio
+    async def test_late_completion_after_takeover_discarded(self, store):
+        """A runner whose lease was taken over cannot overwrite the new owner's result."""
+        release = asyncio.Event()
+        first = JobRunner(store, concurrency=1, poll_interval=0.01)
+
+        @first.handler("echo")
+        async def stale(params, ctx):
+            await release.wait()
+            return JobResult(data=b"stale", content_type="text/plain", filename="stale.txt")
+
+        job, _ = await first.submit("echo", {"text": "x"})
+        while (await store.get(job.id)).status != "running":
+            await asyncio.sleep(0.01)
+        # The first runner looks dead: its lease runs out and a second runner takes over
+        assert await store.requeue_expired(datetime.now() + timedelta(minutes=2)) == 1
+        second = make_runner(store)
+        await second.start()
+        assert (await second.wait(job.id)).status == "completed"
+
+        release.set()
+        await asyncio.sleep(0.05)
+        await first.stop()
+        await second.stop()
+
+        assert await store.load_result(job.id) == b"x"
+        finished = await store.get(job.id)
+        assert (finished.status, finished.filename) == ("completed", "echo.txt")
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_cancels_handler(self, store):
+        cancelled = asyncio.Event()
+        first = JobRunner(store, concurrency=1, poll_interval=0.01, lease_seconds=0.06)
+
+        @first.handler("echo")
+        async def slow(params, ctx):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        job, _ = await first.submit("echo", {"text": "x"})
+        while (await store.get(job.id)).status != "running":
+            await asyncio.sleep(0.01)
+        await store.requeue_expired(datetime.now() + timedelta(minutes=2))
+        assert (await store.claim_next("other-runner", datetime.now() + timedelta(minutes=1))).id == job.id
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0.01)
+        await first.stop()
+
+        current = await store.get(job.id)
+        assert (current.status, current.owner) == ("running", "other-runner")
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self, store):
+        runner = make_runner(store, result_ttl=60)
+        job, _ = await runner.submit("echo", {"text": "old"})
+        await runner.wait(job.id)
+        await runner.stop()
+
+        assert await store.purge_finished(datetime.now() - timedelta(seconds=60)) == []
+        assert [j.id for j in await store.purge_finished(datetime.now() + timedelta(seconds=1))] == [job.id]
+        assert await store.get(job.id) is None
+        assert await store.load_result(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_unknown_kind(self, store):
+        with pytest.raises(ValueError):
+            await make_runner(store).submit("missing", {})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    runner = JobRunner(InMemoryJobStore(), poll_interval=0.01)
+    runner._handlers = admin.admin_jobs._handlers
+    monkeypatch.setattr(admin, "admin_jobs", runner)
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        yield client
+
+
+def wait_for_report(client, status_url):
+    for _ in range(200):
+        data = client.get(status_url).json()["data"]
+        if data["status"] in ("completed", "failed"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError("report did not finish")
+
+
+class TestComplianceEndpoints:
+    """Test enqueue, poll and download."""
+
+    @pytest.mark.parametrize("fmt", ["pdf", "docx"])
+    def test_enqueue_poll_download(self, client, fmt):
+        queued = client.post(f"/api/v1/admin/compliance/generate-report?report_type=all&format={fmt}")
+        assert queued.status_code == 202
+        body = queued.json()
+
+        status = wait_for_report(client, body["status_url"])
+        download = client.get(body["download_url"])
+
+        assert status["status"] == "completed"
+        assert download.status_code == 200
+        assert download.headers["content-disposition"].endswith(f'.{fmt}"')
+        if fmt == "pdf":
+            assert download.content.startswith(b"%PDF-1.4")
+            assert b"HIPAA" in download.content
+        else:
+            document = zipfile.ZipFile(io.BytesIO(download.content)).read("word/document.xml")
+            assert b"Audit Log" in document
+
+    def test_default_format_is_pdf(self, client):
+        queued = client.post("/api/v1/admin/compliance/generate-report?report_type=soc2")
+        status = wait_for_report(client, queued.json()["status_url"])
+
+        assert status["filename"].endswith(".pdf")
+
+    def test_unknown_report(self, client):
+        assert client.get("/api/v1/admin/compliance/download/missing").status_code == 404
+        assert client.get("/api/v1/admin/compliance/reports/missing").status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,170 @@
+"""Tests for keyset pagination and indexed filtering."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.api.routers.admin as admin
+from src.api.services.pagination import IndexedCollection, decode_cursor, encode_cursor
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def make_rows(count):
+    return [
+        {
+            "id": i,
+            # Pairs of rows share a timestamp so the id tie-breaker matters
+            "timestamp": NOW - timedelta(minutes=i // 2),
+            "event_type": ["Suspicious Login", "Rate Limit Exceeded", "Unusual API Access"][i % 3],
+            "status": "Blocked" if i % 2 else "Monitored",
+        }
+        for i in range(count)
+    ]
+
+
+class TestCursor:
+    """Test cursor encoding."""
+
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor((NOW, 42))) == (NOW, 42)
+        assert decode_cursor(encode_cursor(("2025-01-20", 3))) == ("2025-01-20", 3)
+
+    @pytest.mark.parametrize("cursor", ["garbage", "e30", "!!!"])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    @pytest.mark.parametrize("key", [([1], 2), ({"a": 1}, 2), (3, None), (3, True), (3, [1])])
+    def test_non_scalar_parts_rejected(self, key):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(key))
+
+
+class TestIndexedCollection:
+    """Test keyset and offset pages."""
+
+    def test_keyset_walk_visits_every_row_once(self):
+        index = IndexedCollection(make_rows(101), indexes=("event_type", "status"))
+        seen, cursor = [], None
+
+        while True:
+            page, cursor = index.page_after(cursor, 10)
+            seen.extend(row["id"] for row in page)
+            if cursor is None:
+                break
+
+        assert sorted(seen) == list(range(101))
+        keys = [(r["timestamp"], r["id"]) for r in (index._rows[k] for k in index._keys)]
+        assert [k[1] for k in sorted(keys, reverse=True)] == seen
+
+    def test_filters_use_index(self):
+        index = IndexedCollection(make_rows(90), indexes=("event_type", "status"))
+
+        page, cursor = index.page_after(None, 100, {"event_type": "rate limit exceeded", "status": "Blocked"})
+
+        assert cursor is None
+        assert {r["id"] % 6 for r in page} == {1}
+        assert len(page) == 15
+
+    def test_unindexed_filter_rejected(self):
+        index = IndexedCollection(make_rows(3), indexes=("status",))
+        with pytest.raises(KeyError):
+            index.page_after(None, 10, {"event_type": "x"})
+
+    def test_offset_matches_keyset(self):
+        index = IndexedCollection(make_rows(50), indexes=("status",))
+
+        offset_page, total = index.page_offset(20, 10, {"status": "blocked"})
+        first, cursor = index.page_after(None, 20, {"status": "blocked"})
+        keyset_page, _ = index.page_after(cursor, 10, {"status": "blocked"})
+
+        assert total == 25
+        assert offset_page == keyset_page
+
+    @pytest.mark.parametrize("key", [
+        (1717243200, 5),
+        (NOW.replace(tzinfo=timezone.utc), 5),
+        (NOW, "5"),
+    ])
+    def test_mismatched_cursor_key_rejected(self, key):
+        """Keys that cannot be ordered against the collection are a ValueError, not a TypeError."""
+        index = IndexedCollection(make_rows(10))
+
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            index.page_after(encode_cursor(key), 5)
+
+    def test_update_reindexes(self):
+        rows = make_rows(4)
+        index = IndexedCollection(rows, indexes=("status",))
+
+        rows[0]["status"] = "Blocked"
+        index.update(rows[0])
+
+        assert "monitored" in index.values("status")
+        assert len(index.page_after(None, 10, {"status": "blocked"})[0]) == 3
+        assert len(index) == 4
+
+    def test_ascending(self):
+        index = IndexedCollection(make_rows(5), descending=False)
+        page, cursor = index.page_after(None, 2)
+        assert [r["id"] for r in page] == [4, 2]
+        assert [r["id"] for r in index.page_after(cursor, 10)[0]] == [3, 0, 1]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    return TestClient(app)
+
+
+class TestAdminListEndpoints:
+    """Test offset and cursor modes on the admin lists."""
+
+    def test_offset_mode_unchanged(self, client):
+        data = client.get("/api/v1/admin/security/events?page=1&limit=2").json()["data"]
+
+        assert [e["id"] for e in data["events"]] == [1, 2]
+        assert data["pagination"]["total"] == 3
+        assert data["pagination"]["pages"] == 2
+        assert data["pagination"]["next_cursor"]
+
+    def test_cursor_mode(self, client):
+        first = client.get("/api/v1/admin/security/events?limit=2&cursor=").json()["data"]
+        second = client.get(
+            "/api/v1/admin/security/events", params={"limit": 2, "cursor": first["pagination"]["next_cursor"]}
+        ).json()["data"]
+
+        assert [e["id"] for e in first["events"] + second["events"]] == [1, 2, 3]
+        assert second["pagination"]["next_cursor"] is None
+
+    def test_event_type_exact_and_partial(self, client):
+        exact = client.get("/api/v1/admin/security/events?event_type=rate limit exceeded").json()["data"]
+        partial = client.get("/api/v1/admin/security/events?event_type=login").json()["data"]
+
+        assert [e["id"] for e in exact["events"]] == [2]
+        assert [e["id"] for e in partial["events"]] == [1]
+
+    def test_bad_cursor(self, client):
+        assert client.get("/api/v1/admin/billing/invoices?cursor=nope").status_code == 400
+
+    def test_cursor_from_other_list(self, client):
+        """A security-events cursor holds a datetime; invoices are keyed by date strings."""
+        cursor = encode_cursor((NOW, 1))
+        assert client.get(f"/api/v1/admin/billing/invoices?cursor={cursor}").status_code == 400
+
+    def test_invoices_and_customers(self, client):
+        invoices = client.get("/api/v1/admin/billing/invoices?status=paid").json()["data"]
+        customers = client.get("/api/v1/admin/customers?plan=enterprise").json()["data"]
+        searched = client.get("/api/v1/admin/customers?search=optical").json()["data"]
+
+        assert [i["id"] for i in invoices["invoices"]] == [1, 2]
+        assert [c["id"] for c in customers["customers"]] == [2]
+        assert [c["id"] for c in searched["customers"]] == [3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
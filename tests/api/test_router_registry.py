@@ -0,0 +1,221 @@
+"""Tests for lazy router loading and the import-time profiler."""
+
+import asyncio
+import dataclasses
+import sys
+import threading
+import time
+import types
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.core.router_registry import (
+    LazyRouterMiddleware,
+    RouterImportBudgetExceeded,
+    RouterRegistry,
+    RouterSpec,
+)
+
+
+def _install_router_module(name, prefix, path="/items"):
+    """Register a fake router module in sys.modules."""
+    module = types.ModuleType(name)
+    router = APIRouter(prefix=prefix)
+
+    @router.get(path)
+    async def list_items():
+        return {"router": prefix}
+
+    module.router = router
+    sys.modules[name] = module
+    return module
+
+
+@pytest.fixture
+def router_modules():
+    names = ["tests_fake_routers.frames", "tests_fake_routers.admin"]
+    _install_router_module(names[0], "/frames")
+    _install_router_module(names[1], "/admin")
+    yield names
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def app_with_registry(router_modules):
+    app = FastAPI()
+    registry = RouterRegistry(app)
+    registry.register(RouterSpec("frames", router_modules[0], prefix="/api/v1"))
+    registry.register(RouterSpec(
+        "admin", router_modules[1], prefix="/api/v1", paths=("/api/v1/admin",)
+    ))
+    app.add_middleware(LazyRouterMiddleware, registry=registry)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app, registry
+
+
+class TestRouterRegistry:
+    """Test deferred router imports."""
+
+    def test_routers_not_loaded_at_registration(self, app_with_registry):
+        """Lazy routers are not imported while the app is built."""
+        _, registry = app_with_registry
+        assert registry.pending == ["frames", "admin"]
+
+    def test_known_prefix_loads_only_its_router(self, app_with_registry):
+        """A request to a declared prefix loads just that router."""
+        app, registry = app_with_registry
+        client = TestClient(app)
+
+        response = client.get("/api/v1/admin/items")
+
+        assert response.status_code == 200
+        assert response.json() == {"router": "/admin"}
+        assert registry.is_loaded("admin")
+        assert registry.pending == ["frames"]
+
+    @pytest.mark.asyncio
+    async def test_unmatched_path_loads_nothing(self, app_with_registry):
+        """A path matching no lazy prefix waits for the warm-up instead of importing."""
+        app, registry = app_with_registry
+
+        assert TestClient(app).get("/api/v1/frames/items").status_code == 404
+        assert registry.pending == ["frames", "admin"]
+
+        await registry.warm_up()
+        assert TestClient(app).get("/api/v1/frames/items").status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_import_one_router_at_a_time(self, app_with_registry, monkeypatch):
+        """Overlapping requests never import two routers at once."""
+        _, registry = app_with_registry
+        import_router = registry._import_router
+        active, overlaps = [0], []
+        guard = threading.Lock()
+
+        def slow_import(spec):
+            with guard:
+                active[0] += 1
+                overlaps.append(active[0])
+            time.sleep(0.02)
+            try:
+                return import_router(spec)
+            finally:
+                with guard:
+                    active[0] -= 1
+
+        monkeypatch.setattr(registry, "_import_router", slow_import)
+
+        await asyncio.gather(registry.load_async("frames"), registry.load_async("admin"))
+
+        assert registry.pending == []
+        assert max(overlaps) == 1
+
+    def test_matched_path_does_not_load(self, app_with_registry):
+        """Requests to mounted routes never trigger imports."""
+        app, registry = app_with_registry
+        client = TestClient(app)
+
+        assert client.get("/health").status_code == 200
+        assert registry.pending == ["frames", "admin"]
+
+    def test_failed_import_is_reported_once(self):
+        """A missing module is recorded as failed and not retried."""
+        app = FastAPI()
+        registry = RouterRegistry(app)
+        registry.register(RouterSpec("missing", "tests_fake_routers.does_not_exist"))
+
+        assert registry.load("missing") is False
+        assert registry.pending == []
+        report = registry.report()
+        assert report["routers"][0]["status"] == "failed"
+        assert "ModuleNotFoundError" in report["routers"][0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_everything(self, app_with_registry):
+        """The background warm-up mounts all pending routers."""
+        _, registry = app_with_registry
+
+        await registry.warm_up()
+
+        assert registry.pending == []
+        assert all(r["trigger"] == "warmup" for r in registry.report()["routers"])
+
+    def test_eager_registration(self, router_modules):
+        """Non-lazy routers are mounted immediately."""
+        app = FastAPI()
+        registry = RouterRegistry(app)
+        registry.register(RouterSpec("frames", router_modules[0], lazy=False))
+
+        assert registry.is_loaded("frames")
+        assert TestClient(app).get("/frames/items").status_code == 200
+
+
+class TestApplicationRouters:
+    """Test the router specs registered by the application."""
+
+    @pytest.fixture
+    def router_specs(self):
+        from src.api.main import ROUTER_SPECS
+        return [dataclasses.replace(spec, lazy=True) for spec in ROUTER_SPECS]
+
+    def test_every_router_declares_paths(self, router_specs):
+        """No router has to wait for the warm-up before it can serve requests."""
+        assert [spec.name for spec in router_specs if not spec.paths] == []
+
+    def test_first_request_loads_non_admin_router(self, router_specs):
+        """A request to a lazy router's prefix mounts it before warm-up runs."""
+        module = _install_router_module("src.api.routers.frames", "/frames", path="")
+        try:
+            app = FastAPI()
+            registry = RouterRegistry(app)
+            for spec in router_specs:
+                registry.register(spec)
+            app.add_middleware(LazyRouterMiddleware, registry=registry)
+
+            response = TestClient(app).get("/api/v1/frames")
+
+            assert response.status_code == 200
+            assert response.json() == {"router": "/frames"}
+            assert registry.is_loaded("frames")
+            assert "recommendations" in registry.pending
+        finally:
+            if sys.modules.get("src.api.routers.frames") is module:
+                del sys.modules["src.api.routers.frames"]
+
+
+class TestRouterImportProfile:
+    """Test the import-time profiler mode."""
+
+    def test_profile_reports_each_router(self, app_with_registry):
+        """Profiling imports all routers and reports their cost."""
+        _, registry = app_with_registry
+
+        results = registry.profile()
+
+        assert {r.name for r in results} == {"frames", "admin"}
+        assert all(r.trigger == "profile" for r in results)
+
+    def test_profile_budget_exceeded(self, app_with_registry):
+        """An exceeded budget fails the boot."""
+        _, registry = app_with_registry
+
+        with pytest.raises(RouterImportBudgetExceeded):
+            registry.profile(budget_ms=-1)
+
+    def test_profile_per_router_budget_exceeded(self, app_with_registry):
+        """A single slow router fails the per-router budget."""
+        _, registry = app_with_registry
+
+        with pytest.raises(RouterImportBudgetExceeded, match="frames"):
+            registry.profile(per_router_budget_ms=-1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,190 @@
+"""Tests for the fast JSON serialization path."""
+
+import json
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+from uuid import UUID
+
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, Field
+
+import src.api.core.serialization as serialization
+from src.api.core.serialization import (
+    FastJSONResponse,
+    StreamingJSONResponse,
+    dumps,
+    iter_json_array,
+)
+
+
+class FaceShape(str, Enum):
+    OVAL = "oval"
+    ROUND = "round"
+
+
+class Specs(BaseModel):
+    width_mm: float
+    material: str
+
+
+class Frame(BaseModel):
+    product_id: UUID
+    name: str
+    price: Decimal
+    face_shape: FaceShape
+    specs: Specs
+    tags: List[str]
+    created_at: datetime
+    brand_name: Optional[str] = Field(default=None, alias="brandName")
+
+
+def make_frame(i: int) -> Frame:
+    return Frame(
+        product_id=UUID(int=i),
+        name=f"Frame {i}",
+        price=Decimal("129.50"),
+        face_shape=FaceShape.OVAL,
+        specs=Specs(width_mm=138.0, material="acetate"),
+        tags=["new", "featured"],
+        created_at=datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc),
+        brandName="Persol",
+    )
+
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+class TestDumps:
+    """Test the encoder against FastAPI's default output."""
+
+    def test_matches_jsonable_encoder(self):
+        """Parsed output equals what jsonable_encoder would produce."""
+        payload = {"success": True, "data": [make_frame(i) for i in range(3)]}
+
+        assert json.loads(dumps(payload)) == jsonable_encoder(payload)
+
+    def test_aliases_used(self):
+        """Model aliases are applied like the default encoder does."""
+        data = json.loads(dumps(make_frame(1)))
+        assert data["brandName"] == "Persol"
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """Without orjson the stdlib encoder handles the same types."""
+        monkeypatch.setattr(serialization, "HAS_ORJSON", False)
+        payload = {"data": [make_frame(1)], "ids": {1, 2}}
+
+        result = json.loads(dumps(payload))
+
+        assert result["data"] == jsonable_encoder([make_frame(1)])
+        assert sorted(result["ids"]) == [1, 2]
+
+    @pytest.mark.parametrize("orjson_available", [True, False])
+    def test_decimals_match_jsonable_encoder(self, monkeypatch, orjson_available):
+        """Integral decimals are written as integers, the rest as floats."""
+        monkeypatch.setattr(serialization, "HAS_ORJSON", orjson_available)
+        payload = {"count": Decimal("3"), "hundred": Decimal("1E+2"), "price": Decimal("129.50")}
+
+        result = json.loads(dumps(payload))
+
+        assert result == jsonable_encoder(payload)
+        assert isinstance(result["count"], int) and isinstance(result["price"], float)
+
+    def test_unsupported_type(self):
+        """Unknown objects raise TypeError instead of serializing garbage."""
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+
+class TestStreaming:
+    """Test chunked JSON arrays."""
+
+    @pytest.mark.asyncio
+    async def test_plain_array(self):
+        """Items are streamed as one valid JSON array."""
+        body = await collect(iter_json_array(range(1234), chunk_size=100))
+        assert json.loads(body) == list(range(1234))
+
+    @pytest.mark.asyncio
+    async def test_envelope(self):
+        """The array is embedded under the key in the envelope."""
+        body = await collect(iter_json_array(
+            [make_frame(i) for i in range(5)], envelope={"success": True, "total": 5}, key="frames", chunk_size=2
+        ))
+        data = json.loads(body)
+        assert data["success"] is True
+        assert data["total"] == 5
+        assert len(data["frames"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_empty_envelope_and_items(self):
+        """Empty envelopes and empty iterables still produce valid JSON."""
+        assert json.loads(await collect(iter_json_array([], envelope={}))) == {"data": []}
+        assert json.loads(await collect(iter_json_array([]))) == []
+
+    @pytest.mark.asyncio
+    async def test_async_iterable(self):
+        """Async generators are consumed lazily."""
+        async def rows():
+            for i in range(10):
+                yield {"row": i}
+
+        body = await collect(iter_json_array(rows(), chunk_size=3))
+        assert json.loads(body) == [{"row": i} for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_sync_iterables_are_consumed_off_the_event_loop(self):
+        """A blocking generator runs in a worker thread, not on the loop."""
+        loop_thread = threading.get_ident()
+        threads = set()
+
+        def rows():
+            for i in range(7):
+                threads.add(threading.get_ident())
+                yield {"row": i}
+
+        body = await collect(iter_json_array(rows(), chunk_size=3))
+
+        assert json.loads(body) == [{"row": i} for i in range(7)]
+        assert threads and loop_thread not in threads
+
+    @pytest.mark.asyncio
+    async def test_envelope_key_conflict(self):
+        """The streamed key cannot also be in the envelope."""
+        with pytest.raises(ValueError):
+            await collect(iter_json_array([], envelope={"data": 1}))
+
+
+class TestResponses:
+    """Test the response classes in an app."""
+
+    def test_fast_and_streaming_responses(self):
+        app = FastAPI()
+
+        @app.get("/frames")
+        async def frames():
+            return FastJSONResponse({"data": [make_frame(i) for i in range(2)]})
+
+        @app.get("/frames/stream")
+        async def frames_stream():
+            return StreamingJSONResponse((make_frame(i) for i in range(3)), envelope={"success": True})
+
+        client = TestClient(app)
+
+        response = client.get("/frames")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["data"][0]["price"] == "129.50"
+
+        streamed = client.get("/frames/stream")
+        assert streamed.headers["content-type"] == "application/json"
+        assert len(streamed.json()["data"]) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,145 @@
+"""Tests for the dependency-aware startup orchestrator."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.api.core.startup import (
+    StartupOrchestrator,
+    STATUS_OK,
+    STATUS_FAILED,
+    STATUS_TIMEOUT,
+    STATUS_SKIPPED,
+)
+
+
+class TestStartupOrchestrator:
+    """Test concurrent, dependency-ordered initialization."""
+
+    @pytest.mark.asyncio
+    async def test_independent_components_run_concurrently(self):
+        """Independent components should overlap instead of adding up."""
+        orchestrator = StartupOrchestrator()
+
+        for name in ("redis", "mongodb", "auth"):
+            @orchestrator.component(name)
+            async def init():
+                await asyncio.sleep(0.1)
+
+        start = time.perf_counter()
+        results = await orchestrator.run()
+        elapsed = time.perf_counter() - start
+
+        assert all(r.status == STATUS_OK for r in results)
+        assert elapsed < 0.25
+
+    @pytest.mark.asyncio
+    async def test_dependencies_run_in_order(self):
+        """A component starts only after its dependencies finished."""
+        orchestrator = StartupOrchestrator()
+        order = []
+
+        @orchestrator.component("repositories", depends_on=("mongodb",))
+        async def init_repositories():
+            order.append("repositories")
+
+        @orchestrator.component("mongodb")
+        async def init_mongodb():
+            await asyncio.sleep(0.05)
+            order.append("mongodb")
+
+        await orchestrator.run()
+
+        assert order == ["mongodb", "repositories"]
+
+    @pytest.mark.asyncio
+    async def test_failed_dependency_skips_dependents(self):
+        """Hard dependents are skipped, soft dependents still run."""
+        orchestrator = StartupOrchestrator()
+
+        @orchestrator.component("redis")
+        async def init_redis():
+            raise ConnectionError("Redis unavailable")
+
+        @orchestrator.component("cache", depends_on=("redis",))
+        async def init_cache():
+            pass
+
+        @orchestrator.component("service_discovery", after=("redis",))
+        async def init_discovery():
+            pass
+
+        await orchestrator.run()
+        statuses = {r.name: r.status for r in orchestrator.results}
+
+        assert statuses["redis"] == STATUS_FAILED
+        assert statuses["cache"] == STATUS_SKIPPED
+        assert statuses["service_discovery"] == STATUS_OK
+
+    @pytest.mark.asyncio
+    async def test_component_timeout(self):
+        """Slow components are cut off at their own timeout."""
+        orchestrator = StartupOrchestrator(default_timeout=5.0)
+
+        @orchestrator.component("mongodb", timeout=0.05)
+        async def init_mongodb():
+            await asyncio.sleep(1)
+
+        results = await orchestrator.run()
+
+        assert results[0].status == STATUS_TIMEOUT
+        assert results[0].duration_ms < 500
+
+    def test_unknown_dependency_rejected(self):
+        """Unknown dependencies are reported before anything runs."""
+        orchestrator = StartupOrchestrator()
+
+        @orchestrator.component("repositories", depends_on=("postgres",))
+        async def init_repositories():
+            pass
+
+        with pytest.raises(ValueError, match="unknown component"):
+            asyncio.run(orchestrator.run())
+
+    def test_dependency_cycle_rejected(self):
+        """Dependency cycles are reported before anything runs."""
+        orchestrator = StartupOrchestrator()
+
+        @orchestrator.component("a", depends_on=("b",))
+        async def init_a():
+            pass
+
+        @orchestrator.component("b", depends_on=("a",))
+        async def init_b():
+            pass
+
+        with pytest.raises(ValueError, match="cycle"):
+            asyncio.run(orchestrator.run())
+
+    @pytest.mark.asyncio
+    async def test_timeline(self):
+        """The timeline reports per-component duration and outcome."""
+        orchestrator = StartupOrchestrator()
+
+        @orchestrator.component("redis")
+        async def init_redis():
+            await asyncio.sleep(0.01)
+
+        @orchestrator.component("mongodb")
+        async def init_mongodb():
+            raise RuntimeError("boom")
+
+        await orchestrator.run()
+        timeline = orchestrator.timeline()
+
+        assert timeline["total_ms"] > 0
+        assert timeline["failed"] == ["mongodb"]
+        components = {c["name"]: c for c in timeline["components"]}
+        assert components["redis"]["status"] == STATUS_OK
+        assert components["redis"]["duration_ms"] >= 10
+        assert components["mongodb"]["error"] == "boom"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
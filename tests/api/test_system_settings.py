@@ -0,0 +1,164 @@
+"""Tests for versioned system settings and maintenance mode."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.middleware.maintenance import MaintenanceModeMiddleware
+from src.api.services.system_settings import (
+    DEFAULT_SYSTEM_SETTINGS,
+    SettingsService,
+    SettingsSnapshot,
+)
+
+
+async def eventually(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+class TestSettingsSnapshot:
+    """Test the in-memory snapshot."""
+
+    def test_attribute_reads_and_immutability(self):
+        snapshot = SettingsSnapshot(3, DEFAULT_SYSTEM_SETTINGS)
+
+        assert snapshot.maintenance_mode is False
+        assert snapshot.version == 3
+        with pytest.raises(AttributeError):
+            snapshot.maintenance_mode = True
+
+
+class TestLocalSettings:
+    """Test the service without Redis."""
+
+    @pytest.mark.asyncio
+    async def test_update_bumps_version_and_notifies(self):
+        service = SettingsService(DEFAULT_SYSTEM_SETTINGS)
+        changes = []
+        service.on_change(lambda old, new: changes.append((old.version, new.version)))
+
+        current = await service.update({"debug_logging": True})
+
+        assert current.debug_logging is True
+        assert current.version == 1
+        assert changes == [(0, 1)]
+
+    @pytest.mark.asyncio
+    async def test_unknown_setting_rejected(self):
+        with pytest.raises(KeyError):
+            await SettingsService(DEFAULT_SYSTEM_SETTINGS).update({"turbo": True})
+
+    @pytest.mark.asyncio
+    async def test_older_versions_ignored(self):
+        service = SettingsService(DEFAULT_SYSTEM_SETTINGS)
+        service._apply(5, {"maintenance_mode": True})
+
+        assert service._apply(4, {"maintenance_mode": False}) is False
+        assert service.current.maintenance_mode is True
+
+
+class TestRedisPropagation:
+    """Test propagation between workers sharing one Redis."""
+
+    @pytest.fixture
+    def workers(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+
+        def worker():
+            service = SettingsService(DEFAULT_SYSTEM_SETTINGS, check_interval=0.05)
+            return service, fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+        return worker
+
+    @pytest.mark.asyncio
+    async def test_update_reaches_other_worker(self, workers):
+        (a, redis_a), (b, redis_b) = workers(), workers()
+        await a.start(redis_a)
+        await b.start(redis_b)
+        try:
+            await asyncio.sleep(0.05)
+            await a.update({"maintenance_mode": True})
+            await eventually(lambda: b.current.maintenance_mode)
+
+            assert b.current.version == a.current.version == 1
+        finally:
+            await a.stop()
+            await b.stop()
+
+    @pytest.mark.asyncio
+    async def test_new_worker_loads_stored_snapshot(self, workers):
+        (a, redis_a), (b, redis_b) = workers(), workers()
+        a.redis = redis_a
+        await a.update({"debug_logging": True})
+        await a.update({"auto_scaling": False})
+
+        await b.start(redis_b)
+        try:
+            assert b.current.version == 2
+            assert b.current.debug_logging is True
+            assert b.current.auto_scaling is False
+        finally:
+            await b.stop()
+
+    @pytest.mark.asyncio
+    async def test_missed_message_recovered_by_version_check(self, workers):
+        (a, redis_a), (b, redis_b) = workers(), workers()
+        await b.start(redis_b)
+        try:
+            # Write without publishing, as if the message was lost
+            await redis_a.set(a.values_key, '{"maintenance_mode": true}')
+            await redis_a.set(a.version_key, 7)
+
+            await eventually(lambda: b.current.version == 7)
+            assert b.current.maintenance_mode is True
+        finally:
+            await b.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_merge(self, workers):
+        (a, redis_a), (b, redis_b) = workers(), workers()
+        a.redis, b.redis = redis_a, redis_b
+
+        await asyncio.gather(a.update({"debug_logging": True}), b.update({"auto_scaling": False}))
+        await a.refresh()
+
+        assert a.current.version == 2
+        assert a.current.debug_logging is True
+        assert a.current.auto_scaling is False
+
+
+class TestMaintenanceMode:
+    """Test the maintenance gate."""
+
+    def test_gate(self):
+        service = SettingsService(DEFAULT_SYSTEM_SETTINGS)
+        app = FastAPI()
+
+        @app.get("/api/v1/frames")
+        async def frames():
+            return {"ok": True}
+
+        @app.get("/api/v1/admin/settings/system")
+        async def admin_settings():
+            return {"ok": True}
+
+        app.add_middleware(MaintenanceModeMiddleware, settings=service)
+        client = TestClient(app)
+
+        assert client.get("/api/v1/frames").status_code == 200
+        service._apply(1, {"maintenance_mode": True})
+        blocked = client.get("/api/v1/frames")
+        assert blocked.status_code == 503
+        assert blocked.headers["retry-after"] == "120"
+        assert client.get("/api/v1/admin/settings/system").status_code == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,126 @@
+"""Tests for the warm-up pipeline and readiness gating."""
+
+import asyncio
+import sys
+import types
+
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from src.api.core.router_registry import RouterRegistry, RouterSpec
+from src.api.core.warmup import WarmupPipeline
+
+
+class TestWarmupPipeline:
+    """Test readiness state transitions."""
+
+    @pytest.mark.asyncio
+    async def test_not_ready_until_steps_finish(self):
+        """Readiness flips only after every step has completed."""
+        pipeline = WarmupPipeline(deadline=5.0)
+        release = asyncio.Event()
+
+        @pipeline.step("prime_cache")
+        async def prime_cache():
+            await release.wait()
+
+        task = pipeline.start()
+        await asyncio.sleep(0.01)
+        assert pipeline.ready is False
+        assert pipeline.status()["state"] == "warming"
+
+        release.set()
+        await task
+        assert pipeline.ready is True
+        assert pipeline.reason == "completed"
+
+    @pytest.mark.asyncio
+    async def test_ready_at_deadline(self):
+        """A slow step does not hold readiness past the deadline."""
+        pipeline = WarmupPipeline(deadline=0.05)
+        finished = []
+
+        @pipeline.step("load_models")
+        async def load_models():
+            await asyncio.sleep(0.2)
+            finished.append("load_models")
+
+        task = pipeline.start()
+        await asyncio.sleep(0.1)
+        assert pipeline.ready is True
+        assert pipeline.reason == "deadline"
+        assert finished == []
+
+        # The step keeps running in the background
+        await task
+        assert finished == ["load_models"]
+
+    @pytest.mark.asyncio
+    async def test_failed_step_does_not_block_readiness(self):
+        """Step failures are recorded but do not keep the service unready."""
+        pipeline = WarmupPipeline(deadline=5.0)
+
+        @pipeline.step("mongodb_pool")
+        async def mongodb_pool():
+            raise ConnectionError("MongoDB unavailable")
+
+        @pipeline.step("redis_pool", timeout=0.01)
+        async def redis_pool():
+            await asyncio.sleep(1)
+
+        await pipeline.run()
+
+        assert pipeline.ready is True
+        steps = {s["name"]: s for s in pipeline.status()["steps"]}
+        assert steps["mongodb_pool"]["status"] == "failed"
+        assert steps["redis_pool"]["status"] == "timeout"
+
+    @pytest.mark.asyncio
+    async def test_no_steps_ready_immediately(self):
+        """An empty pipeline is ready as soon as it runs."""
+        pipeline = WarmupPipeline()
+        await pipeline.run()
+        assert pipeline.ready is True
+
+    def test_steps_cannot_be_added_after_start(self):
+        """Steps must be registered before the pipeline starts."""
+        pipeline = WarmupPipeline()
+        asyncio.run(pipeline.run())
+
+        with pytest.raises(RuntimeError):
+            pipeline.add_step("late", lambda: asyncio.sleep(0))
+
+
+class TestRouterWarmupHooks:
+    """Test router warm-up hooks run by the registry."""
+
+    @pytest.mark.asyncio
+    async def test_warmup_hook_called_once(self):
+        """A router's warm-up hook runs once after the router is mounted."""
+        module = types.ModuleType("tests_fake_routers.recommendations")
+        module.router = APIRouter(prefix="/recommendations")
+        calls = []
+
+        async def warm_up(app):
+            calls.append(app)
+
+        module.warm_up = warm_up
+        sys.modules[module.__name__] = module
+        try:
+            app = FastAPI()
+            registry = RouterRegistry(app)
+            registry.register(RouterSpec(
+                "recommendations", module.__name__, warmup_hook="warm_up"
+            ))
+
+            await registry.warm_up()
+            await registry.warm_up()
+
+            assert registry.is_loaded("recommendations")
+            assert calls == [app]
+        finally:
+            sys.modules.pop(module.__name__, None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
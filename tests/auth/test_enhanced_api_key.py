@@ -1,5 +1,7 @@
 """Tests for enhanced API key functionality."""
 
+import hashlib
+
 import pytest
 from unittest.mock import Mock, patch
 from fastapi import Request, HTTPException
@@ -373,6 +375,98 @@ class TestApiKeyManagerIntegration:
         # Should not verify revoked key
         verified_key = api_key_manager.verify_api_key(key_string)
         assert verified_key is None
+    
+    def test_key_format_and_stored_hash(self, api_key_manager):
+        """Keys are prefix.secret and only a keyed hash of the secret is stored."""
+        api_key, key_string = api_key_manager.create_api_key(
+            tenant_id="test_tenant",
+            name="Format Key",
+            scopes=[ApiKeyScope.READ_ONLY],
+            created_by="test_user"
+        )
+        prefix, secret = key_string.split(".", 1)
+        
+        assert prefix == api_key.prefix
+        assert secret not in api_key.key_hash
+        assert api_key.key_hash == api_key_manager.hash_secret(secret)
+    
+    def test_wrong_secret_or_unknown_prefix(self, api_key_manager):
+        """Verification fails for a bad secret, an unknown prefix or no secret."""
+        api_key, key_string = api_key_manager.create_api_key(
+            tenant_id="test_tenant",
+            name="Key",
+            scopes=[ApiKeyScope.READ_ONLY],
+            created_by="test_user"
+        )
+        
+        assert api_key_manager.verify_api_key(f"{api_key.prefix}.wrong") is None
+        assert api_key_manager.verify_api_key("000000000000." + key_string.split(".", 1)[1]) is None
+        assert api_key_manager.verify_api_key(api_key.prefix) is None
+    
+    def test_one_hash_per_lookup_regardless_of_key_count(self, api_key_manager):
+        """Validation hashes once, not once per stored key."""
+        keys = [
+            api_key_manager.create_api_key(
+                tenant_id=f"tenant_{i}", name=f"Key {i}", scopes=[ApiKeyScope.READ_ONLY], created_by="u"
+            )[1]
+            for i in range(200)
+        ]
+        
+        with patch.object(api_key_manager, "hash_secret", wraps=api_key_manager.hash_secret) as hashed:
+            assert api_key_manager.verify_api_key(keys[150]) is not None
+            assert hashed.call_count == 1
+            # Served from the verified-key cache afterwards
+            assert api_key_manager.verify_api_key(keys[150]) is not None
+            assert hashed.call_count == 1
+        
+        assert api_key_manager.cache_stats()["hits"] == 1
+    
+    def test_cache_miss_digests_the_key_once(self, api_key_manager):
+        """A miss computes the cache digest once for the lookup and the insert."""
+        _, key_string = api_key_manager.create_api_key(
+            tenant_id="test_tenant", name="Key", scopes=[ApiKeyScope.READ_ONLY], created_by="u"
+        )
+        
+        with patch("src.auth.api_key.hashlib.sha256", wraps=hashlib.sha256) as sha256:
+            assert api_key_manager.verify_api_key(key_string) is not None
+            digests = [c for c in sha256.call_args_list if c.args == (key_string.encode(),)]
+            assert len(digests) == 1
+        
+        assert api_key_manager.verify_api_key(key_string) is not None
+        assert api_key_manager.cache_stats()["hits"] == 1
+    
+    def test_revocation_invalidates_cache_and_calls_hooks(self, api_key_manager):
+        """Revoking a cached key takes effect immediately and notifies hooks."""
+        revoked = []
+        api_key_manager.on_revoke(revoked.append)
+        api_key, key_string = api_key_manager.create_api_key(
+            tenant_id="test_tenant",
+            name="Cached Key",
+            scopes=[ApiKeyScope.READ_ONLY],
+            created_by="test_user"
+        )
+        assert api_key_manager.verify_api_key(key_string) is not None
+        
+        api_key_manager.revoke_api_key(api_key.id, revoked_by="admin")
+        
+        assert api_key_manager.cache_stats()["size"] == 0
+        assert api_key_manager.verify_api_key(key_string) is None
+        assert revoked == [api_key]
+    
+    def test_cached_key_expires(self, api_key_manager):
+        """A cached verification does not outlive the key's expiry."""
+        api_key, key_string = api_key_manager.create_api_key(
+            tenant_id="test_tenant",
+            name="Short Key",
+            scopes=[ApiKeyScope.READ_ONLY],
+            created_by="test_user",
+            expires_in_days=1
+        )
+        assert api_key_manager.verify_api_key(key_string) is not None
+        
+        api_key.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        
+        assert api_key_manager.verify_api_key(key_string) is None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+"""Tests for compiled RBAC permission masks."""
+
+import pytest
+
+from src.auth.rbac import (
+    PERMISSION_BITS,
+    CompiledPolicy,
+    Permission,
+    RBACManager,
+    Role,
+    UserContext,
+    permissions_from_mask,
+)
+
+
+class TestCompiledPolicy:
+    """Role inheritance and tier gates."""
+
+    def test_each_permission_has_its_own_bit(self):
+        bits = list(PERMISSION_BITS.values())
+        assert len(set(bits)) == len(Permission)
+        assert all(bit & (bit - 1) == 0 for bit in bits)
+
+    def test_inheritance_is_transitive(self):
+        policy = CompiledPolicy()
+        super_admin = permissions_from_mask(policy.role_masks[Role.SUPER_ADMIN])
+
+        assert super_admin == set(Permission)
+        assert Permission.VIEW_PRODUCTS in permissions_from_mask(policy.role_masks[Role.ANALYST])
+
+    def test_cycle_rejected(self):
+        with pytest.raises(ValueError, match="cycle"):
+            CompiledPolicy(inheritance={Role.ANALYST: (Role.CLIENT_USER,), Role.CLIENT_USER: (Role.ANALYST,)})
+
+    def test_tier_gates_features(self):
+        policy = CompiledPolicy()
+        roles = frozenset({Role.TENANT_ADMIN})
+
+        free = permissions_from_mask(policy.mask_for(roles, "free"))
+        enterprise = permissions_from_mask(policy.mask_for(roles, "enterprise"))
+
+        assert Permission.BULK_OPERATIONS not in free
+        assert Permission.MANAGE_USERS in free  # ungated
+        assert {Permission.BULK_OPERATIONS, Permission.WHITE_LABEL_ACCESS} <= enterprise
+
+    def test_tenant_features_unlock_within_roles_only(self):
+        policy = CompiledPolicy()
+
+        user = permissions_from_mask(
+            policy.mask_for(frozenset({Role.CLIENT_USER}), "free", frozenset({Permission.BULK_OPERATIONS}))
+        )
+        admin = permissions_from_mask(
+            policy.mask_for(frozenset({Role.CLIENT_ADMIN}), "free", frozenset({Permission.BULK_OPERATIONS}))
+        )
+
+        assert Permission.BULK_OPERATIONS not in user
+        assert Permission.BULK_OPERATIONS in admin
+
+
+class TestRBACManager:
+    """Checks through user contexts."""
+
+    def test_context_carries_mask(self):
+        user = UserContext(user_id="u", roles=[Role.CLIENT_USER], tenant_id="t")
+
+        assert user.has_permission(Permission.VIEW_PRODUCTS)
+        assert not user.has_permission(Permission.MANAGE_PRODUCTS)
+
+    def test_refresh_after_role_change(self):
+        user = UserContext(user_id="u", roles=[Role.CLIENT_USER], tenant_id="t")
+        user.roles.append(Role.CLIENT_ADMIN)
+        user.refresh_permissions()
+
+        assert RBACManager().has_permission(user, Permission.MANAGE_PRODUCTS)
+
+    def test_all_and_any(self):
+        manager = RBACManager()
+        analyst = UserContext(user_id="u", roles=[Role.ANALYST], tenant_id="t", tier="professional")
+
+        assert manager.has_all_permissions(analyst, [Permission.VIEW_ANALYTICS, Permission.EXPORT_DATA])
+        assert not manager.has_all_permissions(analyst, [Permission.VIEW_ANALYTICS, Permission.MANAGE_USERS])
+        assert manager.has_any_permission(analyst, [Permission.MANAGE_USERS, Permission.EXPORT_DATA])
+
+    def test_custom_policy(self):
+        policy = CompiledPolicy(role_permissions={Role.CLIENT_USER: {Permission.EXPORT_DATA}}, inheritance={})
+        user = UserContext(user_id="u", roles=[Role.CLIENT_USER], tenant_id="t")
+
+        assert RBACManager(policy).has_permission(user, Permission.EXPORT_DATA)
+        assert not RBACManager().has_permission(user, Permission.EXPORT_DATA)
+
+    def test_tenant_access(self):
+        manager = RBACManager()
+        user = UserContext(user_id="u", roles=[Role.TENANT_ADMIN], tenant_id="t1")
+        root = UserContext(user_id="r", roles=[Role.SUPER_ADMIN], tenant_id="t1")
+
+        assert manager.can_access_tenant(user, "t1")
+        assert not manager.can_access_tenant(user, "t2")
+        assert manager.can_access_tenant(root, "t2")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
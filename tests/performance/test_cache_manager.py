@@ -0,0 +1,502 @@
+"""Tests for the lock-striped MemoryCache and CacheManager."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.performance import cache_manager
+from src.performance.cache_manager import (
+    CacheManager,
+    MemoryCache,
+    create_ultra_high_performance_cache,
+    estimate_size,
+    get_cache,
+    make_key,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestShardedMemoryCache:
+    """Segments, per-segment LRU and global accounting."""
+
+    def test_segment_capacities_add_up_to_max_size(self):
+        cache = MemoryCache(max_size=100, segments=16)
+
+        assert cache.segments == 16
+        assert sum(segment.capacity for segment in cache._segments) == 100
+
+    def test_segments_never_exceed_max_size(self):
+        cache = MemoryCache(max_size=3, segments=16)
+
+        assert cache.segments == 3
+
+    def test_size_stays_bounded_and_evictions_are_counted(self):
+        cache = MemoryCache(max_size=64, segments=8)
+        for i in range(1000):
+            cache.set(f"key_{i}", i)
+
+        stats = cache.get_stats()
+        assert stats["size"] <= 64
+        assert stats["sets"] == 1000
+        assert stats["evictions"] == 1000 - stats["size"]
+
+    def test_each_segment_evicts_its_own_least_recently_used(self):
+        cache = MemoryCache(max_size=32, segments=4)
+        keys = [f"key_{i}" for i in range(200)]
+        by_segment = {}
+        for key in keys:
+            by_segment.setdefault(id(cache._segment(key)), []).append(key)
+        first, *rest = next(iter(by_segment.values()))
+        capacity = cache._segment(first).capacity
+
+        cache.set(first, "hot")
+        for key in rest[:capacity - 1]:
+            cache.set(key, "cold")
+        cache.get(first)
+        cache.set(rest[capacity - 1], "new")
+
+        assert cache.get(first) == "hot"
+        assert rest[0] not in cache
+
+    def test_expiry_and_stats_as_attributes(self):
+        clock = FakeClock()
+        cache = MemoryCache(max_size=100, default_ttl=10, segments=4, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        clock.now += 30
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.expirations) == (1, 1, 1)
+
+    def test_concurrent_threads_keep_counts_consistent(self):
+        cache = MemoryCache(max_size=500, segments=16)
+        per_thread = 2000
+
+        def worker(worker_id: int):
+            for i in range(per_thread):
+                key = f"{worker_id}_{i % 300}"
+                cache.set(key, i)
+                cache.get(key)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.get_stats()
+        assert stats["sets"] == 8 * per_thread
+        assert stats["hits"] + stats["misses"] == 8 * per_thread
+        assert len(cache) <= 500
+
+
+class TestTimedExpiry:
+    """Wheel-driven, time-sliced expiry."""
+
+    def test_expire_removes_only_expired_entries(self):
+        clock = FakeClock()
+        cache = MemoryCache(max_size=1000, default_ttl=10, segments=4, clock=clock)
+        for i in range(100):
+            cache.set(f"short_{i}", i)
+            cache.set(f"long_{i}", i, ttl=100)
+        clock.now += 20
+
+        removed, finished = cache.expire()
+
+        assert (removed, finished) == (100, True)
+        assert len(cache) == 100
+        assert cache.scheduled_expiries() == 100
+
+    def test_entry_handed_out_early_is_rescheduled(self):
+        clock = FakeClock()
+        cache = MemoryCache(max_size=10, default_ttl=10, clock=clock)
+        cache.set("a", 1)
+        segment = cache._segments[0]
+        # A timer that fires before the entry's TTL, as an out-of-step wheel would
+        segment.wheel.schedule(make_key("a"), clock.now + 1)
+        clock.now += 5
+
+        assert cache.expire() == (0, True)
+        assert cache.scheduled_expiries() == 1
+        clock.now += 10
+        assert cache.expire() == (1, True)
+        assert len(cache) == 0
+
+    def test_deleted_and_evicted_entries_leave_no_timers(self):
+        cache = MemoryCache(max_size=10, default_ttl=60)
+        for i in range(50):
+            cache.set(f"key_{i}", i)
+        cache.delete("key_49")
+
+        assert len(cache) == 9
+        assert cache.scheduled_expiries() == 9
+
+    def test_time_budget_resumes_where_it_stopped(self):
+        clock = FakeClock()
+        cache = MemoryCache(max_size=5000, default_ttl=1, segments=4, clock=clock)
+        for i in range(5000):
+            cache.set(i, i)
+        clock.now += 2
+
+        removed, finished = cache.expire(time_budget=0, batch=100)
+        assert removed == 100
+        assert not finished
+        while not finished:
+            count, finished = cache.expire(time_budget=0, batch=100)
+            removed += count
+        assert removed == 5000
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_background_task_expires_entries(self):
+        manager = CacheManager(memory_cache_size=100, default_ttl=0.05, cleanup_interval=0.05)
+        await manager.start()
+        for i in range(20):
+            await manager.set(f"key_{i}", i)
+        await asyncio.sleep(0.3)
+        await manager.stop()
+
+        assert len(manager.memory_cache) == 0
+        assert manager.get_stats()["expirations"] == 20
+
+
+class TestByteBudgets:
+    """Byte-cost accounting, budgets and cost-weighted eviction."""
+
+    def test_estimate_grows_with_value_size(self):
+        small = estimate_size({"sku": "ABC-123", "compatibility": 0.8})
+        listing = estimate_size([{"sku": f"P{i}", "data": "x" * 1000} for i in range(200)])
+
+        assert 0 < small < 1000
+        assert 200 * 1000 < listing < 200 * 2000
+
+    def test_stats_report_bytes_per_namespace(self):
+        cache = MemoryCache(max_size=100, sizer=len)
+        cache.set("products:oval", "x" * 300)
+        cache.set("products:round", "x" * 200)
+        cache.set("face_analysis:s1", "x" * 50)
+        cache.set("plain", "x" * 10)
+
+        stats = cache.get_stats()
+        assert stats["bytes"] == 560
+        assert stats["namespaces"]["products"] == {"entries": 2, "bytes": 500, "budget": None}
+        assert stats["namespaces"]["face_analysis"]["bytes"] == 50
+        assert stats["namespaces"]["default"]["bytes"] == 10
+
+    def test_global_budget_evicts_costliest_of_the_oldest(self):
+        cache = MemoryCache(max_size=100, max_bytes=1000, sizer=len)
+        cache.set("a", "x" * 100)
+        cache.set("b", "x" * 500)
+        cache.set("c", "x" * 100)
+        cache.set("d", "x" * 400)
+
+        assert "b" not in cache
+        assert all(key in cache for key in ("a", "c", "d"))
+        assert cache.bytes() == 600
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_namespace_budget_only_evicts_its_namespace(self):
+        cache = MemoryCache(max_size=100, namespace_budgets={"products": 400}, sizer=len)
+        cache.set("face_analysis:s1", "x" * 1000)
+        for i in range(10):
+            cache.set(f"products:{i}", "x" * 100)
+
+        assert cache.namespace_bytes("products") <= 400
+        assert "face_analysis:s1" in cache
+        assert "products:9" in cache
+
+    def test_oversized_value_is_not_cached(self):
+        cache = MemoryCache(max_size=100, max_bytes=1000, sizer=len)
+        cache.set("listing", "small")
+
+        assert cache.set("listing", "x" * 5000) is False
+        assert cache.get("listing") is None
+        assert cache.bytes() == 0
+
+    def test_budgets_hold_across_segments(self):
+        cache = MemoryCache(max_size=10000, segments=8, max_bytes=50000, sizer=len)
+        for i in range(2000):
+            cache.set(f"products:{i}", "x" * (10 + i % 500))
+
+        assert cache.bytes() <= 50000
+        assert cache.bytes() == sum(len(cache.get(key) or "") for key in list(_keys(cache)))
+
+
+def _keys(cache):
+    for segment in cache._segments:
+        yield from list(segment.entries)
+
+
+class TestLoadCoalescing:
+    """get_or_load shares one load between concurrent misses."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        manager = CacheManager()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"face_shape": "oval", "products": [1, 2, 3]}
+
+        results = await asyncio.gather(*(manager.get_or_load("products_oval", load) for _ in range(1000)))
+
+        assert calls == 1
+        assert all(result == results[0] for result in results)
+        stats = manager.get_stats()
+        assert (stats["loads"], stats["coalesced_loads"]) == (1, 999)
+        assert await manager.get_or_load("products_oval", load) == results[0]
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_waiter_and_is_not_cached(self):
+        manager = CacheManager()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("mongodb unavailable")
+
+        results = await asyncio.gather(
+            *(manager.get_or_load("products_oval", load) for _ in range(10)), return_exceptions=True
+        )
+
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert manager.get_stats()["load_failures"] == 1
+        assert await manager.get_or_load("products_oval", lambda: "recovered") == "recovered"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_the_load(self):
+        manager = CacheManager()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        leader = asyncio.ensure_future(manager.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(manager.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        assert await leader == "value"
+
+    def test_threads_share_one_load(self):
+        cache = MemoryCache(max_size=100)
+        calls = 0
+
+        def load():
+            nonlocal calls
+            calls += 1
+            threading.Event().wait(0.05)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("key", load)))
+                   for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == 1
+        assert results == ["value"] * 16
+        assert cache.get_stats()["coalesced_loads"] + cache.get_stats()["hits"] == 15
+
+    def test_thread_failures_propagate(self):
+        cache = MemoryCache(max_size=100)
+
+        def load():
+            raise KeyError("missing")
+
+        with pytest.raises(KeyError):
+            cache.get_or_load("key", load)
+        assert "key" not in cache
+        assert cache.get_stats()["load_failures"] == 1
+
+
+class TestStaleWhileRevalidate:
+    """Soft TTLs, background refresh and early refresh."""
+
+    @pytest.mark.asyncio
+    async def test_stale_value_is_served_while_refreshing(self):
+        manager = CacheManager(refresh_beta=0)
+        versions = iter(["v1", "v2"])
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return next(versions)
+
+        assert await manager.get_or_load("products_oval", load, ttl=60, soft_ttl=0.05) == "v1"
+        await asyncio.sleep(0.06)
+
+        assert await asyncio.wait_for(manager.get_or_load("products_oval", load, ttl=60, soft_ttl=0.05), 0.01) == "v1"
+        assert await manager.get_or_load("products_oval", load, ttl=60, soft_ttl=0.05) == "v1"
+        await asyncio.sleep(0.05)
+        assert await manager.get_or_load("products_oval", load, ttl=60, soft_ttl=0.05) == "v2"
+        stats = manager.get_stats()
+        assert (stats["stale_hits"], stats["refreshes"]) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_refreshes_run_with_bounded_concurrency(self):
+        manager = CacheManager(refresh_concurrency=3, refresh_beta=0)
+        running = peak = 0
+
+        async def load():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "value"
+
+        keys = [f"products:{i}" for i in range(20)]
+        for key in keys:
+            await manager.get_or_load(key, lambda: "value", ttl=60, soft_ttl=0.01)
+        await asyncio.sleep(0.02)
+        for key in keys:
+            await manager.get_or_load(key, load, ttl=60, soft_ttl=0.01)
+        await asyncio.sleep(0.3)
+
+        assert peak == 3
+        assert manager.get_stats()["refreshes"] == 20
+
+    @pytest.mark.asyncio
+    async def test_full_refresh_queue_drops_refreshes(self):
+        manager = CacheManager(refresh_queue_size=2, refresh_beta=0)
+        for i in range(5):
+            await manager.get_or_load(i, lambda: "old", ttl=60, soft_ttl=0)
+        for i in range(5):
+            assert await manager.get_or_load(i, lambda: asyncio.sleep(0.01, "new"), ttl=60, soft_ttl=0) == "old"
+        await manager.stop()
+
+        stats = manager.get_stats()
+        assert (stats["refreshes_dropped"], stats["refreshes_pending"]) == (3, 0)
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_the_stale_value(self):
+        manager = CacheManager(refresh_beta=0)
+        await manager.get_or_load("key", lambda: "old", ttl=60, soft_ttl=0)
+
+        def fail():
+            raise RuntimeError("mongodb unavailable")
+
+        assert await manager.get_or_load("key", fail, ttl=60, soft_ttl=0) == "old"
+        await asyncio.sleep(0.01)
+        assert await manager.get_or_load("key", fail, ttl=60, soft_ttl=0) == "old"
+        assert manager.get_stats()["load_failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_early_refresh_before_soft_expiry(self, monkeypatch):
+        manager = CacheManager()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return "value"
+
+        await manager.get_or_load("key", load, ttl=60, soft_ttl=5)
+        monkeypatch.setattr(cache_manager.random, "random", lambda: 0.5)
+        await manager.get_or_load("key", load, ttl=60, soft_ttl=5)
+        assert manager.get_stats()["early_refreshes"] == 0
+
+        # A draw this small means "refresh now" even 5 seconds ahead
+        monkeypatch.setattr(cache_manager.random, "random", lambda: 1e-300)
+        await manager.get_or_load("key", load, ttl=60, soft_ttl=5)
+        await manager.stop()
+        assert manager.get_stats()["early_refreshes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_soft_ttl_must_be_shorter_than_ttl(self):
+        manager = CacheManager(default_ttl=30)
+
+        with pytest.raises(ValueError, match="soft_ttl"):
+            await manager.get_or_load("key", lambda: "value", ttl=60, soft_ttl=60)
+        with pytest.raises(ValueError, match="soft_ttl"):
+            await manager.get_or_load("key", lambda: "value", soft_ttl=45)
+        assert manager.get_stats()["loads"] == 0
+
+
+class TestTagInvalidation:
+    """Tag index kept in step with the entries."""
+
+    def test_invalidate_removes_every_tagged_entry(self):
+        cache = MemoryCache(max_size=100, segments=4)
+        cache.set("products:compatibility:oval:0.5:10", [1, 2], tags=["product:1", "product:2", "face_shape:oval"])
+        cache.set("products:compatibility:round:0.5:10", [2, 3], tags=["product:2", "product:3", "face_shape:round"])
+        cache.set("products:compatibility:heart:0.5:10", [4], tags=["product:4"])
+
+        assert cache.invalidate_tags(["product:2"]) == 2
+        assert len(cache) == 1
+        assert cache.tagged("face_shape:oval") == []
+        assert cache.get_stats()["tag_invalidations"] == 2
+
+    def test_index_is_cleaned_on_eviction_expiry_and_delete(self):
+        clock = FakeClock()
+        cache = MemoryCache(max_size=10, default_ttl=10, clock=clock)
+        for i in range(50):
+            cache.set(f"products:{i}", i, tags=[f"product:{i}", "tenant:acme"])
+        cache.delete("products:49")
+        cache.set("products:48", 48, tags=["tenant:other"])
+
+        assert sorted(cache.tagged("tenant:acme")) == [f"products:{i}" for i in range(40, 48)]
+        assert cache.get_stats()["tags"] == 10
+        clock.now += 20
+        cache.expire()
+        assert cache.get_stats()["tags"] == 0
+
+    def test_bulk_invalidation_is_fast(self):
+        cache = MemoryCache(max_size=50000, segments=16)
+        for i in range(20000):
+            cache.set(f"products:compatibility:{i}", i, tags=[f"product:{i}", f"product:{i + 1}", f"brand:{i % 50}"])
+
+        start = time.perf_counter()
+        removed = cache.invalidate_tags(f"product:{i}" for i in range(0, 10000, 2))
+        elapsed = time.perf_counter() - start
+
+        assert removed == 9999
+        assert elapsed < 0.1
+
+    @pytest.mark.asyncio
+    async def test_compatibility_listings_are_tagged_by_product(self):
+        manager = CacheManager()
+        await manager.cache_product_compatibility(
+            "oval", 0.5, 10,
+            [{"sku": "ABC-123", "brand_id": "b1"}, {"sku": "DEF-456", "brand_id": "b2"}],
+            tags=["tenant:acme"],
+        )
+        await manager.cache_product_compatibility("round", 0.5, 10, [{"sku": "GHI-789", "brand_id": "b1"}])
+
+        assert await manager.invalidate_tags(["product:DEF-456"]) == 1
+        assert await manager.get_cached_product_compatibility("oval", 0.5, 10) is None
+        assert await manager.get_cached_product_compatibility("round", 0.5, 10) is not None
+        assert await manager.invalidate_tags(["brand:b1"]) == 1
+
+
+class TestCacheRegistry:
+    """Named process-wide caches."""
+
+    def test_ultra_cache_is_sharded_and_registered(self):
+        cache = create_ultra_high_performance_cache("test_registry", 1000, 60)
+
+        assert cache.segments > 1
+        assert get_cache("test_registry") is cache
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
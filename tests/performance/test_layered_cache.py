@@ -0,0 +1,241 @@
+"""Tests for the two-tier L1 / Redis cache."""
+
+import asyncio
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import fakeredis
+import pytest
+
+from src.performance import layered_cache
+from src.performance.cache_manager import CacheManager, MemoryCache
+from src.performance.layered_cache import FLAG_ZLIB, LayeredCache, decode, encode
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class BrokenRedis:
+    async def hmget(self, *args):
+        raise ConnectionError("redis down")
+
+    async def evalsha(self, *args):
+        raise ConnectionError("redis down")
+
+
+async def _settle(cache: LayeredCache, received: int) -> None:
+    for _ in range(100):
+        if cache.invalidations_received >= received:
+            return
+        await asyncio.sleep(0.01)
+
+
+class TestCodec:
+    """Binary payloads stored in Redis."""
+
+    def test_round_trip(self):
+        value = {"sku": "ABC-123", "scores": [0.9, 0.8], "tags": ["oval"], "stock": None}
+
+        assert decode(encode(value)) == value
+
+    def test_large_payloads_are_compressed(self):
+        value = [{"sku": f"P{i}", "description": "acetate frame " * 20} for i in range(50)]
+        payload = encode(value, compress_threshold=1024)
+
+        assert payload[0] & FLAG_ZLIB
+        assert len(payload) < len(encode(value, compress_threshold=10 ** 9))
+        assert decode(payload) == value
+
+    def test_non_json_types_round_trip(self):
+        value = {
+            "at": datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc),
+            "on": date(2025, 6, 1),
+            "price": Decimal("129.90"),
+            "ids": {1, 2},
+            "sizes": frozenset({"M"}),
+            "history": [{"at": datetime(2025, 5, 1, 9, 0)}],
+        }
+
+        decoded = decode(encode(value))
+
+        assert decoded == value
+        assert type(decoded["price"]) is Decimal and type(decoded["on"]) is date
+
+    def test_untagged_payload_is_not_walked(self):
+        assert not encode({"a": [1, 2]})[0] & layered_cache.FLAG_TAGGED
+        assert encode({"a": Decimal("1")})[0] & layered_cache.FLAG_TAGGED
+
+    def test_unencodable_value_is_rejected(self):
+        with pytest.raises(TypeError):
+            encode({"id": object()})
+
+    def test_unknown_format_is_rejected(self):
+        with pytest.raises(ValueError, match="Unknown cache payload format"):
+            decode(b"\x07{}")
+
+
+class TestLayeredCache:
+    """Read-through, invalidation and failure handling."""
+
+    @pytest.fixture
+    def server(self):
+        return fakeredis.FakeServer()
+
+    def _cache(self, server, clock=None, **kwargs) -> LayeredCache:
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        l1 = MemoryCache(max_size=100, default_ttl=None, clock=clock or FakeClock())
+        return LayeredCache(client, l1, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_second_instance_reads_through_redis(self, server):
+        first, second = self._cache(server), self._cache(server)
+        await first.set("products:1", {"name": "Aviator"})
+
+        assert await second.get("products:1") == {"name": "Aviator"}
+        assert await second.get("products:1") == {"name": "Aviator"}
+        assert (second.l2_hits, second.l1_hits) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_other_instances(self, server):
+        first, second = self._cache(server), self._cache(server)
+        await second.start()
+        await asyncio.sleep(0.05)
+        await first.set("products:1", "old")
+        assert await second.get("products:1") == "old"
+
+        await first.set("products:1", "new")
+        await _settle(second, 2)
+        assert await second.get("products:1") == "new"
+
+        await first.delete("products:1")
+        await _settle(second, 3)
+        assert await second.get("products:1") is None
+        await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_lost_invalidation_is_bounded_by_l1_ttl(self, server):
+        clock = FakeClock()
+        first, second = self._cache(server), self._cache(server, clock=clock, l1_ttl=5)
+        await first.set("products:1", "old")
+        assert await second.get("products:1") == "old"
+
+        # second is not subscribed, so it never hears about this write
+        await first.set("products:1", "new")
+        assert await second.get("products:1") == "old"
+        clock.now += 6
+        assert await second.get("products:1") == "new"
+
+    @pytest.mark.asyncio
+    async def test_tag_invalidation_reaches_other_instances(self, server):
+        first, second = self._cache(server), self._cache(server)
+        await second.start()
+        await asyncio.sleep(0.05)
+        await first.set("listing:oval", [1, 2], ttl=60, tags=["product:1", "product:2"])
+        await first.set("listing:round", [3], ttl=60, tags=["product:3"])
+        assert await second.get("listing:oval") == [1, 2]
+        assert second.l1.tagged("product:2") == ["listing:oval"]
+
+        assert await first.invalidate_tags(["product:2", "product:9"]) == 1
+        await _settle(second, 3)
+
+        assert second.l1.peek("listing:oval") is None
+        assert await second.get("listing:oval") is None
+        assert await second.get("listing:round") == [3]
+        assert not await first.redis.exists("cache:tag:product:2")
+        assert 0 < await first.redis.pttl("cache:tag:product:3") <= 60000
+        await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_overwrite_and_delete_leave_old_tag_sets(self, server):
+        cache = self._cache(server)
+        await cache.set("listing:oval", [1, 2], ttl=60, tags=["product:1", "product:2"])
+        await cache.set("listing:oval", [1], ttl=60, tags=["product:1"])
+
+        assert not await cache.redis.exists("cache:tag:product:2")
+        assert await cache.redis.smembers("cache:tag:product:1") == {b"listing:oval"}
+
+        await cache.delete("listing:oval")
+        assert not await cache.redis.exists("cache:tag:product:1")
+
+    @pytest.mark.asyncio
+    async def test_writes_prune_expired_tag_members(self, server):
+        cache = self._cache(server)
+        await cache.set("listing:oval", [1], ttl=60, tags=["product:1"])
+        # Stands in for an entry that expired while still in the tag set
+        await cache.redis.delete("cache:entry:listing:oval")
+
+        await cache.set("listing:round", [2], ttl=60, tags=["product:1"])
+
+        assert await cache.redis.smembers("cache:tag:product:1") == {b"listing:round"}
+
+    def test_older_version_is_not_refilled_after_invalidation(self, server):
+        cache = self._cache(server)
+        cache.invalidate_local("products:1", 7)
+        cache._fill("products:1", 6, "stale")
+
+        assert cache.l1.get("products:1") is None
+        assert cache.stale_fills_skipped == 1
+
+    def test_invalidation_keeps_newer_local_copy(self, server):
+        cache = self._cache(server)
+        cache._fill("products:1", 9, "current")
+
+        assert cache.invalidate_local("products:1", 8) is False
+        assert cache.l1.get("products:1") == (9, "current")
+
+    @pytest.mark.asyncio
+    async def test_redis_failures_fall_back_to_l1(self):
+        cache = LayeredCache(BrokenRedis(), MemoryCache(max_size=10))
+
+        assert await cache.set("products:1", "local") == 0
+        assert await cache.get("products:1") == "local"
+        assert await cache.get("products:2", "missing") == "missing"
+        assert cache.l2_errors == 2
+
+    @pytest.mark.asyncio
+    async def test_unencodable_values_stay_in_l1(self, server):
+        cache = self._cache(server)
+        value = {"id": object()}
+
+        assert await cache.set("products:1", value) == 0
+        assert await cache.get("products:1") is value
+        assert not await cache.redis.exists("cache:entry:products:1")
+        assert cache.get_stats()["l1_only"] == 1
+
+    @pytest.mark.asyncio
+    async def test_undecodable_payload_is_a_miss(self, server):
+        cache = self._cache(server)
+        await cache.redis.hset("cache:entry:products:1", mapping={"v": 1, "d": b"\xffgarbage"})
+
+        assert await cache.get("products:1", "fallback") == "fallback"
+        assert (cache.l2_errors, cache.misses, cache.l2_hits) == (1, 1, 0)
+
+    def test_msgpack_payloads_need_msgpack(self, monkeypatch):
+        monkeypatch.setattr(layered_cache, "HAS_MSGPACK", False)
+
+        with pytest.raises(ValueError, match="msgpack is not installed"):
+            decode(b"\x02\x90")
+
+
+class TestLayeredCacheManager:
+    """CacheManager configured with a Redis tier."""
+
+    @pytest.mark.asyncio
+    async def test_manager_shares_values_between_instances(self):
+        server = fakeredis.FakeServer()
+        first = CacheManager(redis_client=fakeredis.aioredis.FakeRedis(server=server))
+        second = CacheManager(redis_client=fakeredis.aioredis.FakeRedis(server=server))
+
+        await first.cache_face_analysis("s1", {"face_shape": "oval"})
+
+        assert await second.get_cached_face_analysis("s1") == {"face_shape": "oval"}
+        assert second.get_stats()["layered"]["l2_hits"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,89 @@
+"""Tests for the hierarchical timing wheel used for cache expiry."""
+
+import random
+
+import pytest
+
+from src.performance.timer_wheel import TimerWheel
+
+
+class TestTimerWheel:
+    """Scheduling, cascading and cancellation."""
+
+    def test_keys_fall_due_at_their_deadline(self):
+        wheel = TimerWheel(tick=1.0, slots=4, levels=3)
+        wheel.schedule("soon", 2.5)
+        wheel.schedule("later", 20.0)
+
+        assert wheel.expire(2.0) == []
+        assert wheel.expire(3.0) == ["soon"]
+        assert wheel.expire(19.0) == []
+        assert wheel.expire(20.0) == ["later"]
+        assert len(wheel) == 0
+
+    def test_matches_brute_force_across_levels_and_overflow(self):
+        rng = random.Random(3)
+        wheel = TimerWheel(tick=1.0, slots=4, levels=3)
+        deadlines = {}
+        now = 0.0
+        expired = set()
+        while now < 300:
+            for _ in range(rng.randint(0, 5)):
+                key = f"k{len(deadlines)}"
+                # Up to 200 ticks ahead, beyond the wheel's 64-tick span
+                deadlines[key] = now + rng.uniform(0, 200)
+                wheel.schedule(key, deadlines[key])
+            now += rng.uniform(0, 5)
+            for key in wheel.expire(now):
+                assert deadlines[key] <= now
+                expired.add(key)
+            assert {key for key, when in deadlines.items() if when <= now - 1.0} <= expired
+        assert expired | set(wheel._where) == set(deadlines)
+
+    def test_single_level_wheel_keeps_far_deadlines(self):
+        wheel = TimerWheel(tick=1.0, slots=4, levels=1)
+        wheel.schedule("far", 10.0)
+
+        assert wheel.expire(3.0) == []
+        assert wheel.expire(9.0) == []
+        assert "far" in wheel
+        assert wheel.expire(10.0) == ["far"]
+
+    def test_reschedule_and_cancel(self):
+        wheel = TimerWheel(tick=1.0)
+        wheel.schedule("a", 5.0)
+        wheel.schedule("a", 50.0)
+        wheel.schedule("b", 5.0)
+
+        assert wheel.cancel("b") is True
+        assert wheel.cancel("b") is False
+        assert wheel.expire(10.0) == []
+        assert "a" in wheel
+
+    def test_limit_leaves_the_rest_due(self):
+        wheel = TimerWheel(tick=1.0)
+        for i in range(10):
+            wheel.schedule(i, 1.0)
+
+        first = wheel.expire(5.0, limit=4)
+        assert len(first) == 4
+        assert wheel.has_due(5.0)
+        assert len(wheel.expire(5.0)) == 6
+        assert not wheel.has_due(5.0)
+
+    def test_advance_skips_empty_ticks(self):
+        wheel = TimerWheel(tick=0.1, slots=64, levels=4)
+        wheel.schedule("soon", 1.0)
+        wheel.schedule("later", 3 * 86400.0)
+        steps = []
+        cascade = wheel._cascade
+        wheel._cascade = lambda level: (steps.append(level), cascade(level))
+
+        assert wheel.expire(86400.0) == ["soon"]
+        assert "later" in wheel
+        assert wheel._current == int(86400.0 // 0.1) + 1
+        assert len(steps) < 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,93 @@
+"""Tests for the W-TinyLFU eviction policy."""
+
+import pytest
+
+from src.performance.cache_manager import MemoryCache
+from src.performance.tinylfu import CountMinSketch, WTinyLFUPolicy
+
+
+class TestCountMinSketch:
+    """Frequency estimates and aging."""
+
+    def test_frequency_counts_increments(self):
+        sketch = CountMinSketch(1000)
+        for _ in range(5):
+            sketch.increment("hot")
+        sketch.increment("warm")
+
+        assert sketch.frequency("hot") >= 5
+        assert sketch.frequency("warm") >= 1
+        assert sketch.frequency("cold") <= sketch.frequency("warm")
+
+    def test_counters_saturate_and_age(self):
+        sketch = CountMinSketch(100)
+        for _ in range(40):
+            sketch.increment("hot")
+        assert sketch.frequency("hot") == 15
+
+        sketch.age()
+        assert sketch.frequency("hot") == 7
+
+    def test_ages_after_sample_size_increments(self):
+        sketch = CountMinSketch(16)
+        for _ in range(10):
+            sketch.increment("hot")
+        for i in range(sketch.sample_size):
+            sketch.increment(f"other_{i}")
+
+        assert sketch.frequency("hot") < 10
+
+
+class TestWTinyLFUCache:
+    """Scan resistance and consistency with the cache entries."""
+
+    def _replay(self, cache: MemoryCache, keys) -> int:
+        hits = 0
+        for key in keys:
+            if cache.get(key) is None:
+                cache.set(key, key)
+            else:
+                hits += 1
+        return hits
+
+    def test_hot_set_survives_a_scan(self):
+        hot = [f"products:hot_{i}" for i in range(50)]
+        warmup = hot * 5
+        scan = [f"products:scan_{i}" for i in range(1000)]
+        results = {}
+        for policy in ("lru", "tinylfu"):
+            cache = MemoryCache(max_size=100, default_ttl=None, eviction_policy=policy)
+            self._replay(cache, warmup + scan)
+            results[policy] = self._replay(cache, hot)
+
+        assert results["lru"] == 0
+        assert results["tinylfu"] >= 45
+
+    def test_policy_tracks_exactly_the_cached_keys(self):
+        cache = MemoryCache(max_size=64, default_ttl=None, segments=4, eviction_policy="tinylfu",
+                            max_bytes=5000, sizer=len)
+        for i in range(2000):
+            key = f"k{i % 300}"
+            if cache.get(key) is None:
+                cache.set(key, "x" * (i % 90))
+            if i % 7 == 0:
+                cache.delete(f"k{i % 50}")
+
+        for segment in cache._segments:
+            assert len(segment.policy) == len(segment.entries)
+            assert len(segment.entries) <= segment.capacity
+        assert cache.bytes() <= 5000
+        assert cache.get_stats()["admission_rejections"] > 0
+
+    def test_capacity_of_one(self):
+        policy = WTinyLFUPolicy(1)
+        assert policy.add("a") is None
+        assert policy.add("b") == "a"
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError, match="Unknown eviction policy"):
+            MemoryCache(eviction_policy="fifo")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])